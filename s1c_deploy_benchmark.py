@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Smart-1 Cloud Gateway Deployment Benchmark
+Runs process_gateways against the local simulator (utils/simulator.py) for
+several fleet sizes and execution modes, and compares the results with a
+stored baseline so that slower rollouts are flagged automatically.
+
+Every scenario runs in a fresh process (clean caches, metrics and peak
+memory); the simulator runs in this process.
+
+python s1c_deploy_benchmark.py --sizes 10,100 --save-baseline
+python s1c_deploy_benchmark.py --sizes 10,100          # exits 1 on a regression
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from utils.logger_main import log, configure_logging
+from utils.load_config_file import AuthConfig, GatewayConfig, PolicyPackage, DeployOptions
+from utils.rate_limiter import parse_limit
+from utils.simulator import Simulator, SimulatorConfig, SIM_POLICY_PACKAGE
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak memory is then not reported
+    resource = None
+
+try:
+    import aiohttp
+except ImportError:  # Optional: the async mode is then left out of the defaults
+    aiohttp = None
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_WORKERS = 20
+DEFAULT_BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_TOLERANCE = 0.2  # Relative slowdown accepted before a result counts as a regression
+SCENARIO_TIMEOUT = 3600  # seconds
+
+# Execution modes and the deployment options they run with (workers filled in per run)
+MODES: Dict[str, Dict] = {
+    "sequential": {},
+    "threaded": {"parallel": True},
+    "async": {"parallel": True, "use_async": True},
+    "pipeline": {"parallel": True, "pipeline": True},
+}
+DEFAULT_MODES = ("sequential", "threaded") + (("async",) if aiohttp is not None else ())
+
+# Measurements compared with the baseline (higher is worse for all of them)
+COMPARED_FIELDS = ("wall_seconds", "http_calls_per_gateway", "peak_memory_mb", "sleep_seconds")
+
+
+def scenario_options(mode: str, workers: int, rate_limits: Dict[str, Tuple[float, float]]) -> DeployOptions:
+    """Deployment options of one execution mode"""
+    settings = dict(MODES[mode])
+    concurrency = workers if settings.pop("parallel", False) else 1
+    return DeployOptions(
+        workers=concurrency,
+        physical_workers=concurrency,
+        show_progress=False,
+        rate_limits=rate_limits,
+        settle_time=0,  # Simulated devices apply commands instantly (see --clish-duration)
+        **settings
+    )
+
+
+def _run_scenario(auth_config: Dict, gateways: List[Dict], options: Dict, log_level: int, results) -> None:
+    """Child process: deploy the fleet and send back the measurements"""
+    configure_logging(log_level)
+    # Imported here so that the parent process does not load the orchestrator
+    from s1c_deploy_sparks_gw import process_gateways
+    from utils.metrics import metrics
+
+    started = time.perf_counter()
+    outcome = process_gateways(
+        AuthConfig(**auth_config),
+        [GatewayConfig(**gateway) for gateway in gateways],
+        PolicyPackage(policy_package=SIM_POLICY_PACKAGE, install_delay=0),
+        DeployOptions(**options)
+    )
+    wall = time.perf_counter() - started
+
+    http_attempts = sum(series["count"] for series in metrics.summary()["histograms"].get("http_request_seconds", []))
+    results.send({
+        "wall_seconds": round(wall, 3),
+        "sleep_seconds": round(metrics.total_seconds("wait_seconds"), 3),
+        "client_http_attempts": http_attempts,
+        "peak_memory_mb": _peak_memory_mb(),
+        "succeeded": sum(1 for result in outcome if result.success),
+        "failed": sum(1 for result in outcome if not result.success),
+    })
+
+
+def _peak_memory_mb() -> Optional[float]:
+    """Peak resident set size of this process"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_scenario(mode: str, size: int, workers: int, sim_config: SimulatorConfig,
+                 rate_limits: Dict[str, Tuple[float, float]], log_level: int = logging.WARNING,
+                 timeout: float = SCENARIO_TIMEOUT) -> Dict:
+    """
+    Deploy a simulated fleet in a fresh process and measure it
+
+    Returns:
+        dict: Wall-clock time, HTTP calls per gateway, peak memory, time
+        spent sleeping and the deployment outcome
+    """
+    options = scenario_options(mode, workers, rate_limits)
+    with Simulator(sim_config) as simulator:
+        gateways = [gateway.model_dump() for gateway in simulator.gateway_configs(size)]
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.get_context("spawn").Process(
+            target=_run_scenario,
+            args=(simulator.auth_config().model_dump(), gateways, options.model_dump(), log_level, sender),
+            name=f"benchmark-{mode}-{size}"
+        )
+        process.start()
+        sender.close()
+        measured: Dict = {"mode": mode, "size": size, "workers": options.workers}
+        if receiver.poll(timeout):
+            try:
+                measured.update(receiver.recv())
+            except EOFError:
+                measured["error"] = "scenario process exited without results"
+        else:
+            measured["error"] = "timed out" if process.is_alive() else "scenario process exited without results"
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
+        stats = simulator.stats()
+        measured["http_calls"] = stats["total_requests"]
+        measured["http_calls_per_gateway"] = round(stats["total_requests"] / size, 2)
+        measured["faults"] = stats["faults"]
+    return measured
+
+
+def scenario_key(result: Dict) -> str:
+    return f"{result['mode']}/{result['size']}"
+
+
+def compare(results: List[Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Compare results with the baseline
+
+    Returns:
+        list: One description per regression
+    """
+    regressions = []
+    for result in results:
+        key = scenario_key(result)
+        if result.get("error"):
+            regressions.append(f"{key}: {result['error']}")
+            continue
+        if result.get("failed"):
+            regressions.append(f"{key}: {result['failed']} deployment steps failed")
+        reference = baseline.get(key)
+        if not reference:
+            continue
+        for field in COMPARED_FIELDS:
+            current, previous = result.get(field), reference.get(field)
+            if current is None or not previous:
+                continue
+            if current > previous * (1 + tolerance):
+                regressions.append(f"{key}: {field} {current} vs baseline {previous} "
+                                   f"(+{(current / previous - 1) * 100:.0f}%)")
+    return regressions
+
+
+def load_baseline(baseline_file: str) -> Dict[str, Dict]:
+    """Stored results by scenario (empty when there is no baseline yet)"""
+    path = Path(baseline_file)
+    if not path.exists():
+        log.warning(f"No benchmark baseline at {baseline_file}; run with --save-baseline to store one")
+        return {}
+    try:
+        return json.loads(path.read_text()).get("scenarios", {})
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON in {baseline_file}") from e
+
+
+def save_baseline(baseline_file: str, results: List[Dict], sim_config: SimulatorConfig) -> None:
+    """Store the results as the new baseline, keeping scenarios that were not run"""
+    path = Path(baseline_file)
+    stored = json.loads(path.read_text()) if path.exists() else {}
+    scenarios = stored.get("scenarios", {})
+    scenarios.update({scenario_key(result): result for result in results if not result.get("error")})
+    path.write_text(json.dumps({
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "simulator": sim_config.model_dump(),
+        "scenarios": scenarios,
+    }, indent=2))
+    log.info(f"📌  Baseline with {len(scenarios)} scenarios written to {baseline_file}")
+
+
+def log_results(results: List[Dict], baseline: Dict[str, Dict]) -> None:
+    """One line per scenario with the change against the baseline"""
+    for result in results:
+        if result.get("error"):
+            log.info(f"⏱️  {scenario_key(result):<18} {result['error']}")
+            continue
+        reference = baseline.get(scenario_key(result), {})
+
+        def delta(field: str, result: Dict = result, reference: Dict = reference) -> str:
+            previous = reference.get(field)
+            if not previous or result.get(field) is None:
+                return ""
+            return f" ({(result[field] / previous - 1) * 100:+.0f}%)"
+
+        log.info(
+            f"⏱️  {scenario_key(result):<18} wall {result['wall_seconds']:.1f}s{delta('wall_seconds')}, "
+            f"{result['http_calls_per_gateway']} calls/gw{delta('http_calls_per_gateway')}, "
+            f"peak {result['peak_memory_mb']} MB{delta('peak_memory_mb')}, "
+            f"sleeping {result['sleep_seconds']:.1f}s{delta('sleep_seconds')}, "
+            f"{result['succeeded']}/{result['succeeded'] + result['failed']} steps ok"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the deployment orchestrator against the simulator")
+    parser.add_argument('--sizes', default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help='Comma separated fleet sizes')
+    parser.add_argument('--modes', default=",".join(DEFAULT_MODES),
+                        help=f'Comma separated execution modes ({", ".join(MODES)})')
+    parser.add_argument('-w', '--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Concurrency of the threaded, async and pipeline modes')
+    parser.add_argument('--latency', type=float, default=0.01, help='Simulated seconds per request')
+    parser.add_argument('--task-duration', type=float, default=1.0, help='Simulated publish task seconds')
+    parser.add_argument('--install-duration', type=float, default=5.0, help='Simulated install-policy seconds')
+    parser.add_argument('--rate-limit', action='append', default=[], type=parse_limit,
+                        metavar='CLASS=RATE[:BURST]',
+                        help='Client rate limit override used by every scenario; repeatable')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_FILE, help='Stored baseline results')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store these results as the baseline instead of failing on regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Relative increase over the baseline reported as a regression')
+    parser.add_argument('--timeout', type=float, default=SCENARIO_TIMEOUT, help='Seconds per scenario')
+    parser.add_argument('--output', default=None, help='Write the results as JSON')
+    parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='File log level of the deployments under test')
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    configure_logging(logging.INFO)
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark modes: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    sim_config = SimulatorConfig(
+        latency=args.latency,
+        task_duration=args.task_duration,
+        install_duration=args.install_duration,
+        seed=0
+    )
+    baseline = load_baseline(args.baseline)
+
+    results = []
+    for size in sizes:
+        for mode in modes:
+            log.info(f"🏁  Benchmarking {mode} deployment of {size} gateways")
+            results.append(run_scenario(mode, size, args.workers, sim_config, dict(args.rate_limit),
+                                        getattr(logging, args.log_level), args.timeout))
+
+    log_results(results, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        save_baseline(args.baseline, results, sim_config)
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        log.error(f"📉  Regression: {regression}")
+    if not regressions:
+        log.info("✅  No regressions against the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
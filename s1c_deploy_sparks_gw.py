@@ -1,117 +1,562 @@
 #!/usr/bin/env python3
 """
 Smart-1 Cloud Gateway Deployment Orchestrator
-.venv/Scripts/python.exe s1c_deploy_sparks_gw.py
+.venv/Scripts/python.exe s1c_deploy_sparks_gw.py [--workers N]
 see the readme file for more details
 """
 
-import time, json
-from typing import List
-from utils.logger_main import log
-from utils.load_config_file import read_config_file, AuthConfig, GatewayConfig, PolicyPackage
+import argparse, threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import logging
+from utils.logger_main import log, log_context, configure_logging, LazyJSON
+from utils.load_config_file import (
+    read_auth_config, read_policy_package_config, AuthConfig, GatewayConfig, PolicyPackage, DeployOptions
+)
 from utils.smart1_cloud_api import Smart1CloudAPI
-from utils.smart1_cloud_mgmt_api import ManagementAPI
+from utils.smart1_cloud_mgmt_api import (
+    ManagementAPI, INSTALL_PARALLEL_WAVES, INSTALL_RETRIES, POLICY_TYPES, DEFAULT_POLICY_TYPE
+)
 from utils.sparks_rest_api import SparksGatewayAPI
+from utils.task_monitor import DEFAULT_TASK_TIMEOUT
+from utils.fleet import FleetExecutor, TaskResult, run_parallel, log_summary
+from utils.wait import DEFAULT_READY_TIMEOUT
+from utils.pipeline import StageQueue, collect_wave, iter_batches
+from utils.rate_limiter import shared_rate_limiter, parse_limit
+from utils.metrics import metrics
+from utils.tracing import tracer
+from utils.inventory import Inventory, REGISTER, CONFIGURE, INSTALL, PHYSICAL
+from utils.gateway_loader import iter_gateway_configs
+from utils.journal import (
+    DeploymentJournal, GatewayProgress, NO_JOURNAL, DEFAULT_JOURNAL_FILE, STARTED, COMPLETED, FAILED
+)
+from utils.deploy_stages import (
+    has_physical_credentials, needs_bootstrap, sparks_bootstrap_commands, deploy_stage, skipped_result,
+    current_policy_results, ONBOARDING_PHASE, INSTALL_PHASE, PHYSICAL_PHASE
+)
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+PIPELINE_STATUS_INTERVAL = 30  # seconds between pipeline queue log lines
+INVENTORY_BATCH_SIZE = 1000  # streamed gateways whose tenant state is read at once (pipeline)
+DEFAULT_TRACE_FILE = "logs/deploy_trace.json"
 
-def deploy_s1c_sparks_gw() -> None:
+# Management sessions are stateful (one SID per client), so every worker thread gets its own client
+_thread_state = threading.local()
+
+
+def deploy_s1c_sparks_gw(options: Optional[DeployOptions] = None) -> List[TaskResult]:
     """Main deployment workflow executor"""
+    options = options or DeployOptions()
     try:
-        # Load configurations
-        auth_config: AuthConfig = read_config_file('./config/auth_data.json')
-        policy_config: PolicyPackage = read_config_file('./config/policy_package_data.json')
-        config_data: List[GatewayConfig] = read_config_file('./config/config_data.json')
+        # Load configurations; gateways are validated while they are being read
+        auth_config = read_auth_config(options.auth_file)
+        policy_config = read_policy_package_config(options.policy_file)
+        config_data = iter_gateway_configs(options.gateways_file, options.reject_file)
         
         log.info("Starting gateway deployment process")
-        process_gateways(auth_config, config_data, policy_config)  
+        return process_gateways(auth_config, config_data, policy_config, options)
         
     except Exception as e:
         log.error(f"Critical deployment error: {str(e)}")
         raise
     
 
-def process_gateways(auth_config: AuthConfig, config_data: List[GatewayConfig], policy_config: PolicyPackage) -> None:
-    """Process each gateway configuration with proper sequencing"""
+def process_gateways(auth_config: AuthConfig, config_data: Iterable[GatewayConfig], policy_config: PolicyPackage,
+                     options: Optional[DeployOptions] = None) -> List[TaskResult]:
+    """
+    Process each gateway configuration with proper sequencing
+
+    The pipeline mode starts on the first gateways while config_data is still
+    being read; the phased modes need the whole inventory up front.
+    """
+    options = options or DeployOptions()
+    if options.use_async and (options.pipeline or options.publish_batch or options.bulk):
+        raise ValueError("The asyncio mode supports neither the pipeline nor batched sessions")
+    shared_rate_limiter.configure(options.rate_limits)
+
     # Initialize API clients
     s1c_cloud = Smart1CloudAPI(
         client_id=auth_config.client_id,
         access_key=auth_config.access_key,
-        portal_url=auth_config.portal_url
+        portal_url=auth_config.portal_url,
+        cache_dir=options.cache_dir
     )
     
-    mgmt_api = ManagementAPI(
-        instance=auth_config.instance,
-        context=auth_config.context,
-        api_key=auth_config.api_key
-    )
+    mgmt_api = create_mgmt_api(auth_config, options)
 
-    configured_gateways = []
-    pending_physical_config = []
-
-    # Phase 1: Cloud Registration & Configuration
-    for gateway in config_data:
-        try:
-            log.info(f"🚀  Starting processing for {gateway.gw_name}")
-            
-            # 1. Cloud Registration
-            registration = s1c_cloud.register_gateway(gateway.gw_name)
-            gateway.maas_token = registration['token']
-            log.debug("Cloud registration response: %s", json.dumps(registration, indent=2))
-            time.sleep(25)
-            
-            # 2. Cloud Configuration
-            log.info("⚙️  Configuring Gateway Object settings")
-            configure_gateway(mgmt_api, gateway)
-            configured_gateways.append(gateway.gw_name)
-            
-            # Track gateways needing physical config
-            if all([gateway.gateway_ip, gateway.gateway_username, gateway.gateway_password]):
-                pending_physical_config.append(gateway)
-                log.info("⏳  Queueing for physical configuration")
-            
-            log.info("🕒  Waiting 15 seconds for stabilization")
-            time.sleep(15)
-            
-        except Exception as e:
-            log.error(f"❌  Failed to process {gateway.gw_name}: {str(e)}")
-            continue
-
-    # Phase 2: Policy Installation
+    journal = DeploymentJournal(options.journal)
+    if options.trace_file:
+        tracer.start()
     try:
-        log.info(f"🛡️  Installing policy package '{policy_config.policy_package}'")
-        mgmt_api.install_policy(
-            policy_targets=configured_gateways,
-            policy_package=policy_config.policy_package
+        if not options.pipeline:
+            config_data = list(config_data)
+
+        # Resume from the tenant's current state instead of redoing finished work; a streamed
+        # inventory is not known up front, so the pipeline reads it batch by batch
+        inventory = None if options.pipeline else read_inventory(
+            s1c_cloud, mgmt_api, {gateway.gw_name for gateway in config_data}, policy_config, options
         )
+        progress = journal.replay() if options.resume else {}
+        recover_install_tasks(mgmt_api, journal, progress)
+
+        if options.use_async:
+            # Imported lazily: aiohttp is only needed for the asyncio mode
+            import asyncio
+            from s1c_deploy_sparks_gw_async import process_gateways_async
+            return asyncio.run(process_gateways_async(auth_config, config_data, policy_config,
+                                                      options, inventory, progress, journal))
+
+        if options.pipeline:
+            return process_gateways_pipelined(s1c_cloud, mgmt_api, auth_config, config_data,
+                                              policy_config, options, progress, journal)
+
+        stages = {
+            gateway.gw_name: deploy_stage(gateway, policy_config, inventory, progress)
+            for gateway in config_data
+        }
+        if inventory or progress:
+            log.info(f"Resuming deployment: {Inventory.describe(stages.values())}")
+        pending_onboarding = [gw for gw in config_data if stages[gw.gw_name] in (REGISTER, CONFIGURE)]
+
+        # Phase 1: Cloud Registration & Configuration
+        log.info(f"Processing {len(pending_onboarding)} gateways with {options.workers} worker(s)")
+        with log_context(phase=ONBOARDING_PHASE), metrics.timer("phase_seconds", phase=ONBOARDING_PHASE):
+            if options.publish_batch or options.bulk:
+                registration_results = register_and_configure_batched(
+                    s1c_cloud, mgmt_api, pending_onboarding, options, inventory, journal
+                )
+            else:
+                registration_results = run_parallel(
+                    pending_onboarding,
+                    lambda gateway: register_and_configure_gateway(s1c_cloud, auth_config, gateway,
+                                                                   options, inventory, journal),
+                    name_of=lambda gateway: gateway.gw_name,
+                    workers=options.workers
+                )
+        registration_results += [
+            skipped_result(gateway) for gateway in config_data
+            if stages[gateway.gw_name] not in (REGISTER, CONFIGURE)
+        ]
+        log_summary("Registration & configuration", registration_results)
+
+        pending_install = [
+            result.value for result in registration_results
+            if result.success and stages[result.name] in (REGISTER, CONFIGURE, INSTALL)
+        ]
+
+        # Phase 2: Policy Installation
+        install_results: List[TaskResult] = []
+        with log_context(phase=INSTALL_PHASE), metrics.timer("phase_seconds", phase=INSTALL_PHASE):
+            try:
+                if pending_install:
+                    log.info(f"🛡️  Installing policy package '{policy_config.policy_package}'")
+                    install_results = install_policy_journaled(
+                        mgmt_api, [gateway.gw_name for gateway in pending_install], policy_config,
+                        options, journal
+                    )
+                else:
+                    log.info(f"⏭️  Policy package '{policy_config.policy_package}' already installed on every gateway")
         
-        # Use configured delay
-        #delay = policy_config.install_delay
-        #log.info(f"🕒 Waiting {delay}s for policy activation")
-        #time.sleep(delay)
+                # Use configured delay
+                #delay = policy_config.install_delay
+                #log.info(f"🕒 Waiting {delay}s for policy activation")
+                #time.sleep(delay)
         
+            except Exception as e:
+                log.error(f"❌  Policy installation failed: {str(e)}")
+                raise
+        if install_results:
+            log_summary("Policy installation", install_results)
+
+        # Gateways whose installation failed are not bootstrapped
+        installed = {result.name for result in install_results if result.success}
+        pending_physical_config = [
+            gateway for gateway in pending_install
+            if gateway.gw_name in installed and needs_bootstrap(gateway, inventory)
+        ] + [gateway for gateway in config_data if stages[gateway.gw_name] == PHYSICAL]
+
+        # Phase 3: Physical Gateway Configuration
+        with log_context(phase=PHYSICAL_PHASE), metrics.timer("phase_seconds", phase=PHYSICAL_PHASE):
+            physical_results = create_physical_fleet(options).run(
+                pending_physical_config,
+                lambda gateway: configure_physical_gateway(auth_config, gateway, options, journal),
+                name_of=lambda gateway: gateway.gw_name,
+                site_of=lambda gateway: gateway.site
+            )
+        if physical_results:
+            log_summary("Physical configuration", physical_results)
+
+        shared_rate_limiter.log_stats()
+        log.info("✅ All gateway processing completed")
+        return registration_results + install_results + physical_results
+    finally:
+        mgmt_api.close()
+        journal.close()
+        export_metrics(options)
+
+
+def read_inventory(s1c_cloud: Smart1CloudAPI, mgmt_api: ManagementAPI, names: Set[str],
+                   policy_config: PolicyPackage, options: DeployOptions) -> Optional[Inventory]:
+    """
+    Snapshot of the given gateways' tenant state
+
+    Returns None (every stage is redone) with --force or when the tenant
+    cannot be read, so an inventory failure never stops the deployment.
+    """
+    if options.force or not names:
+        return None
+    try:
+        return Inventory.fetch(s1c_cloud, mgmt_api, names, policy_config.policy_package, options.policy_type)
     except Exception as e:
-        log.error(f"❌  Policy installation failed: {str(e)}")
-        raise
+        log.warning(f"Continuing without the tenant inventory, finished stages are redone: {str(e)}")
+        return None
+
+
+def process_gateways_pipelined(s1c_cloud: Smart1CloudAPI, mgmt_api: ManagementAPI,
+                               auth_config: AuthConfig, config_data: Iterable[GatewayConfig],
+                               policy_config: PolicyPackage, options: DeployOptions,
+                               progress: Optional[Dict[str, GatewayProgress]] = None,
+                               journal: DeploymentJournal = NO_JOURNAL) -> List[TaskResult]:
+    """
+    Stream gateways through the deployment stages without phase barriers
+
+    Onboarded gateways (registered and configured) are grouped into policy
+    install waves of up to options.wave_size gateways or options.wave_window
+    seconds, and each gateway moves on to physical configuration as soon as
+    its own wave is installed. Gateways that already finished some stages in
+    an earlier run (see the inventory and the replayed journal) enter the
+    pipeline at their next stage. The tenant inventory is read for every
+    INVENTORY_BATCH_SIZE streamed gateways rather than for the whole tenant.
+    """
+    onboarding = StageQueue("onboarding")
+    installing = StageQueue("policy install")
+    physical = StageQueue("physical config")
+    install_results: List[TaskResult] = []
+    skipped_results: List[TaskResult] = []
+    # Snapshots of the batches read so far, for the stages' per-gateway lookups
+    inventory: Optional[Inventory] = None if options.force else Inventory([])
 
-    # Phase 3: Physical Gateway Configuration
-    for gateway in pending_physical_config:
+    def log_queues() -> None:
+        log.info(f"📊  Pipeline - {onboarding.describe()} | "
+                 f"{installing.describe()} | {physical.describe()}")
+
+    def onboard() -> List[TaskResult]:
         try:
-            log.info(f"🔧 Configuring physical gateway {gateway.gw_name}")
-            configure_sparks_gateway(gateway)
-            
-            log.info(f"🕒  Waiting 10s for physical gateway initialization")
-            time.sleep(10)
-            
-        except Exception as e:
-            log.error(f"❌  Sparks Gateway config failed for {gateway.gw_name}: {str(e)}")
-            continue
+            with log_context(phase=ONBOARDING_PHASE), metrics.timer("phase_seconds", phase=ONBOARDING_PHASE):
+                return FleetExecutor(max_workers=options.workers).run_stream(
+                    onboarding,
+                    lambda gateway: register_and_configure_gateway(s1c_cloud, auth_config, gateway,
+                                                                   options, inventory, journal),
+                    name_of=lambda gateway: gateway.gw_name,
+                    on_result=lambda result: installing.push(result.value) if result.success else None
+                )
+        finally:
+            installing.close()
+
+    def install_waves() -> None:
+        try:
+            end_of_stream = False
+            while not end_of_stream:
+                wave, end_of_stream = collect_wave(installing, options.wave_size, options.wave_window)
+                if not wave:
+                    continue
+                log_queues()
+                with log_context(phase=INSTALL_PHASE), metrics.timer("phase_seconds", phase=INSTALL_PHASE):
+                    # Gateways move on as soon as their own shard is installed
+                    install_results.extend(install_policy_wave(
+                        mgmt_api, wave, policy_config, options, journal,
+                        on_result=lambda result: physical.push(result.value)
+                        if result.success and needs_bootstrap(result.value, inventory) else None
+                    ))
+        finally:
+            physical.close()
+
+    def configure_physical() -> List[TaskResult]:
+        with log_context(phase=PHYSICAL_PHASE), metrics.timer("phase_seconds", phase=PHYSICAL_PHASE):
+            return create_physical_fleet(options).run_stream(
+                physical,
+                lambda gateway: configure_physical_gateway(auth_config, gateway, options, journal),
+                name_of=lambda gateway: gateway.gw_name,
+                site_of=lambda gateway: gateway.site
+            )
+
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="stage") as stages:
+        onboarding_future = stages.submit(onboard)
+        install_future = stages.submit(install_waves)
+        physical_future = stages.submit(configure_physical)
 
+        try:
+            for batch in iter_batches(config_data, INVENTORY_BATCH_SIZE):
+                batch_inventory = read_inventory(s1c_cloud, mgmt_api, {gateway.gw_name for gateway in batch},
+                                                 policy_config, options)
+                if inventory is not None and batch_inventory is not None:
+                    inventory.merge(batch_inventory)
+                for gateway in batch:
+                    stage = deploy_stage(gateway, policy_config, batch_inventory, progress)
+                    if stage in (REGISTER, CONFIGURE):
+                        onboarding.push(gateway)
+                    elif stage == INSTALL:
+                        installing.push(gateway)
+                    elif stage == PHYSICAL:
+                        physical.push(gateway)
+                    else:
+                        skipped_results.append(skipped_result(gateway))
+        finally:
+            onboarding.close()
+
+        stage_futures = [onboarding_future, install_future, physical_future]
+        while wait(stage_futures, timeout=PIPELINE_STATUS_INTERVAL).not_done:
+            log_queues()
+
+    onboarding_results = onboarding_future.result()
+    install_future.result()
+    physical_results = physical_future.result()
+
+    if skipped_results:
+        log.info(f"⏭️  {len(skipped_results)} gateways were already fully deployed")
+    log_summary("Registration & configuration", onboarding_results)
+    log_summary("Policy installation", install_results)
+    if physical_results:
+        log_summary("Physical configuration", physical_results)
+
+    shared_rate_limiter.log_stats()
     log.info("✅ All gateway processing completed")
+    return skipped_results + onboarding_results + install_results + physical_results
+
+
+def install_policy_wave(mgmt_api: ManagementAPI, wave: List[GatewayConfig],
+                        policy_config: PolicyPackage, options: DeployOptions,
+                        journal: DeploymentJournal = NO_JOURNAL,
+                        on_result: Optional[Callable[[TaskResult], None]] = None) -> List[TaskResult]:
+    """Install the policy package on one wave of gateways (results carry the gateway as value)"""
+    gateways = {gateway.gw_name: gateway for gateway in wave}
+    log.info(f"🛡️  Installing policy package '{policy_config.policy_package}' "
+             f"on a wave of {len(gateways)} gateways")
+
+    def installed(result: TaskResult) -> None:
+        result.value = gateways[result.name]
+        if on_result:
+            on_result(result)
+
+    return install_policy_journaled(mgmt_api, list(gateways), policy_config, options, journal,
+                                    on_result=installed)
+
+
+def install_policy_journaled(mgmt_api: ManagementAPI, targets: List[str], policy_config: PolicyPackage,
+                             options: DeployOptions, journal: DeploymentJournal = NO_JOURNAL,
+                             on_result: Optional[Callable[[TaskResult], None]] = None) -> List[TaskResult]:
+    """
+    Install the policy package in shards, journaling the install task-id and
+    outcome of every target
+
+    Targets that already run the current revision of the package are
+    skipped, also with options.force.
+
+    Returns:
+        list: One TaskResult per target, in input order
+    """
+    try:
+        outdated = mgmt_api.outdated_policy_targets(targets, policy_config.policy_package, options.policy_type)
+    except Exception as e:
+        log.warning(f"Unable to read the installed policy of the targets, installing on all of them: {str(e)}")
+        outdated = targets
+    results = current_policy_results(targets, outdated, policy_config, journal, on_result)
+    task_of: Dict[str, str] = {}
+
+    def started(task_id: str, wave: List[str]) -> None:
+        task_of.update((name, task_id) for name in wave)
+        journal.record_many(wave, INSTALL, STARTED, task_id=task_id)
+
+    def finished(result: TaskResult) -> None:
+        if result.success:
+            journal.record(result.name, INSTALL, COMPLETED, task_id=task_of.get(result.name))
+        else:
+            journal.record(result.name, INSTALL, FAILED, task_id=task_of.get(result.name), error=result.error)
+        if on_result:
+            on_result(result)
+
+    if outdated:
+        results.update((result.name, result) for result in mgmt_api.install_policy_sharded(
+            policy_targets=outdated,
+            policy_package=policy_config.policy_package,
+            shard_size=options.install_shard_size,
+            parallel=options.install_parallel,
+            retries=options.install_retries,
+            on_task=started,
+            on_result=finished,
+            policy_type=options.policy_type
+        ))
+    return [results[name] for name in targets]
+
+
+def recover_install_tasks(mgmt_api: ManagementAPI, journal: DeploymentJournal,
+                          progress: Dict[str, GatewayProgress]) -> None:
+    """Settle policy installs that a previous run started but did not see finish"""
+    tasks: Dict[str, List[str]] = defaultdict(list)
+    for state in progress.values():
+        if state.install_task:
+            tasks[state.install_task].append(state.name)
+
+    for task_id, names in tasks.items():
+        log.info(f"🔎  Checking policy install task {task_id} of a previous run ({len(names)} gateways)")
+        try:
+            mgmt_api.wait_for_task(task_id)
+            status = COMPLETED
+        except Exception as e:
+            log.warning(f"Policy install task {task_id} did not succeed, it will be repeated: {str(e)}")
+            status = FAILED
+        journal.record_many(names, INSTALL, status, task_id=task_id)
+        for name in names:
+            progress[name].install_task = None
+            if status == COMPLETED:
+                progress[name].completed.append(INSTALL)
+
+
+def export_metrics(options: DeployOptions) -> None:
+    """Log where the run spent its time and write the requested metrics and trace files"""
+    metrics.log_summary()
+    try:
+        if options.metrics_file:
+            metrics.write_prometheus(options.metrics_file)
+        if options.metrics_json:
+            metrics.write_json(options.metrics_json)
+        if options.trace_file:
+            tracer.stop()
+            tracer.write(options.trace_file)
+    except OSError:
+        pass  # Already logged; a failed export does not fail the deployment
+
+
+def create_physical_fleet(options: DeployOptions) -> FleetExecutor:
+    """Executor for Phase 3 with the configured global/per-site caps and deadline"""
+    return FleetExecutor(
+        max_workers=options.physical_workers,
+        site_limit=options.site_limit,
+        timeout=options.device_timeout
+    )
+
+
+def create_mgmt_api(auth_config: AuthConfig, options: DeployOptions) -> ManagementAPI:
+    """Build a management API client from the auth configuration"""
+    return ManagementAPI(
+        instance=auth_config.instance,
+        context=auth_config.context,
+        api_key=auth_config.api_key,
+        cache_dir=options.cache_dir,
+        show_progress=options.show_progress,
+        base_url=auth_config.mgmt_url,
+        task_timeout=options.task_timeout
+    )
+
+
+def thread_mgmt_api(auth_config: AuthConfig, options: DeployOptions) -> ManagementAPI:
+    """Return the calling worker thread's management API client"""
+    mgmt_api = getattr(_thread_state, 'mgmt_api', None)
+    if mgmt_api is None:
+        mgmt_api = create_mgmt_api(auth_config, options)
+        _thread_state.mgmt_api = mgmt_api
+    return mgmt_api
+
+
+def register_gateway(s1c_cloud: Smart1CloudAPI, gateway: GatewayConfig,
+                     inventory: Optional[Inventory] = None,
+                     journal: DeploymentJournal = NO_JOURNAL) -> GatewayConfig:
+    """Register one gateway in Smart-1 Cloud and keep its MaaS token"""
+    log.info(f"🚀  Starting processing for {gateway.gw_name}")
+
+    if inventory and inventory.is_registered(gateway.gw_name):
+        log.info(f"⏭️  {gateway.gw_name} is already registered in Smart-1 Cloud")
+        gateway.maas_token = gateway.maas_token or inventory.maas_token(gateway.gw_name)
+        return gateway
+
+    with journal.step(gateway.gw_name, REGISTER) as entry:
+        registration = s1c_cloud.register_gateway(gateway.gw_name)
+        gateway.maas_token = entry['maas_token'] = registration['token']
+    log.debug("Cloud registration response: %s", LazyJSON(registration))
+    return gateway
+
+
+def register_and_configure_batched(s1c_cloud: Smart1CloudAPI, mgmt_api: ManagementAPI,
+                                   config_data: List[GatewayConfig], options: DeployOptions,
+                                   inventory: Optional[Inventory] = None,
+                                   journal: DeploymentJournal = NO_JOURNAL) -> List[TaskResult]:
+    """Register gateways concurrently, then configure them in one management session"""
+    registration_results = run_parallel(
+        config_data,
+        lambda gateway: register_gateway(s1c_cloud, gateway, inventory, journal),
+        name_of=lambda gateway: gateway.gw_name,
+        workers=options.workers
+    )
+    registered = [result.value for result in registration_results if result.success]
+
+    log.info(f"⚙️  Configuring {len(registered)} Gateway Objects, "
+             f"publishing every {options.publish_batch or len(registered)} gateways")
+    configuration_results = {
+        result.name: result for result in mgmt_api.configure_gateways(
+            registered,
+            chunk_size=options.publish_batch,
+            ready_timeout=options.ready_timeout,
+            bulk=options.bulk
+        )
+    }
+    for result in configuration_results.values():
+        if result.success:
+            journal.record(result.name, CONFIGURE)
+        else:
+            journal.record(result.name, CONFIGURE, FAILED, error=result.error)
+
+    # Registration failures keep their own result, the rest report configuration
+    return [
+        configuration_results.get(result.name, result) if result.success else result
+        for result in registration_results
+    ]
+
+
+def register_and_configure_gateway(s1c_cloud: Smart1CloudAPI, auth_config: AuthConfig,
+                                   gateway: GatewayConfig, options: DeployOptions,
+                                   inventory: Optional[Inventory] = None,
+                                   journal: DeploymentJournal = NO_JOURNAL) -> GatewayConfig:
+    """Register one gateway in Smart-1 Cloud and configure its management object"""
+    # 1. Cloud Registration (skipped when the inventory already has it)
+    register_gateway(s1c_cloud, gateway, inventory, journal)
+
+    # 2. Cloud Configuration (waits for the registration to create the object)
+    log.info(f"⚙️  Configuring Gateway Object settings for {gateway.gw_name}")
+    with journal.step(gateway.gw_name, CONFIGURE):
+        configure_gateway(thread_mgmt_api(auth_config, options), gateway, options.ready_timeout)
+
+    # Track gateways needing physical config
+    if has_physical_credentials(gateway):
+        log.info(f"⏳  Queueing {gateway.gw_name} for physical configuration")
+
+    return gateway
+
+
+def configure_physical_gateway(auth_config: AuthConfig, gateway: GatewayConfig,
+                               options: DeployOptions, journal: DeploymentJournal = NO_JOURNAL) -> None:
+    """Phase 3 step for a single physical gateway"""
+    log.info(f"🔧 Configuring physical gateway {gateway.gw_name}")
+    if not gateway.maas_token:
+        raise ValueError(f"MaaS token of {gateway.gw_name} is unknown (registered by an earlier run); "
+                         "resume from the journal or set maas_token in its configuration")
+    mgmt_api = thread_mgmt_api(auth_config, options)
+    # The management connection is up once the management reports SIC with the gateway
+    effect_checks = {"connect security-management": lambda: mgmt_api.is_sic_established(gateway.gw_name)}
+    with journal.step(gateway.gw_name, PHYSICAL):
+        configure_sparks_gateway(gateway, options.ready_timeout, options.clish_script,
+                                 options.settle_time, effect_checks)
+
+    log.info(f"🕒  Waiting for {gateway.gw_name} to establish SIC with the management")
+    try:
+        mgmt_api.wait_for_sic(gateway.gw_name, options.ready_timeout)
+    except TimeoutError as e:
+        log.warning(f"{gateway.gw_name} configured, but SIC is not communicating yet: {str(e)}")
     
       
-def configure_gateway(mgmt_api: ManagementAPI, gateway: GatewayConfig) -> None:
+def configure_gateway(mgmt_api: ManagementAPI, gateway: GatewayConfig,
+                      ready_timeout: float = DEFAULT_READY_TIMEOUT) -> None:
     """Configure gateway settings and install policy"""
     log.debug("Starting gateway configuration")
     try:
@@ -120,7 +565,8 @@ def configure_gateway(mgmt_api: ManagementAPI, gateway: GatewayConfig) -> None:
             version=gateway.version,
             net_type=gateway.net_type,
             hardware=gateway.hardware,
-            sic_key=gateway.sic_key
+            sic_key=gateway.sic_key,
+            ready_timeout=ready_timeout
         )
         log.info(f"Configured {gateway.gw_name} successfully")
         
@@ -130,7 +576,9 @@ def configure_gateway(mgmt_api: ManagementAPI, gateway: GatewayConfig) -> None:
         raise
 
 
-def configure_sparks_gateway(gateway: GatewayConfig) -> None:
+def configure_sparks_gateway(gateway: GatewayConfig, ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                             clish_script: bool = False, settle_time: Optional[float] = None,
+                             effect_checks: Optional[Dict[str, Callable[[], bool]]] = None) -> None:
     """Configure physical gateway using dedicated API client"""
     if not all([gateway.gateway_ip, gateway.gateway_username, gateway.gateway_password]):
         log.info("Skipping physical config - incomplete credentials")
@@ -141,24 +589,19 @@ def configure_sparks_gateway(gateway: GatewayConfig) -> None:
         sparks_gw = SparksGatewayAPI(
             ip_address=gateway.gateway_ip,
             username=gateway.gateway_username,
-            password=gateway.gateway_password
+            password=gateway.gateway_password,
+            settle_time=settle_time
         )
         
         sparks_gw.login()
         
         # Execute physical configuration commands
-        commands = [
-            # "add interface-loopback ipv4-address 10.0.0.1 mask-length 32",
-            # "cplic put #your_license_string",
-            f"connect maas auth-token {gateway.maas_token}",
-            "set security-management mode centrally-managed",
-            f"set sic_init password {gateway.sic_key}",
-            f"fetch certificate mgmt-ipv4-address 100.64.0.52 gateway-name {gateway.gw_name}",
-            "connect security-management mgmt-addr 100.64.0.52 use-one-time-password true local-override-mgmt-addr true send-logs-to local-override-mgmt-addr",
-            "fw fetch 100.64.0.52"
-        ]
+        commands = sparks_bootstrap_commands(gateway)
         
-        sparks_gw.execute_clish(commands)
+        if clish_script:
+            sparks_gw.execute_clish_script(commands, ready_timeout=ready_timeout, effect_checks=effect_checks)
+        else:
+            sparks_gw.execute_clish(commands, ready_timeout=ready_timeout, effect_checks=effect_checks)
         log.info(f"Sparks gateway {gateway.gw_name} configured successfully")
         #sparks_gw.logout()
         
@@ -167,5 +610,121 @@ def configure_sparks_gateway(gateway: GatewayConfig) -> None:
         raise
     
 
+def parse_args() -> DeployOptions:
+    """Build deployment options from the command line"""
+    parser = argparse.ArgumentParser(
+        description="Smart-1 Cloud Gateway Deployment Orchestrator"
+    )
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of gateways registered and configured concurrently')
+    parser.add_argument('--publish-batch', type=int, default=None,
+                        help='Configure gateways in one management session, publishing every N gateways')
+    parser.add_argument('--bulk', action='store_true',
+                        help='Use the management batch endpoints (implies a batched session)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Stream gateways through the stages instead of waiting for each phase')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Run the deployment on asyncio clients (requires aiohttp; '
+                             'not with --pipeline, --publish-batch or --bulk)')
+    parser.add_argument('--wave-size', type=int, default=50,
+                        help='Maximum gateways per policy install wave in pipeline mode')
+    parser.add_argument('--wave-window', type=float, default=60,
+                        help='Seconds a pipeline install wave waits to fill up')
+    parser.add_argument('--install-shard-size', type=int, default=None,
+                        help='Gateways per install-policy task; shards are installed and retried separately')
+    parser.add_argument('--install-parallel', type=int, default=INSTALL_PARALLEL_WAVES,
+                        help='Install-policy tasks running at the same time')
+    parser.add_argument('--install-retries', type=int, default=INSTALL_RETRIES,
+                        help='Repeated install attempts for gateways whose installation failed')
+    parser.add_argument('--policy-type', choices=list(POLICY_TYPES), default=DEFAULT_POLICY_TYPE,
+                        help='Policy layers to install: access and threat prevention, or only one of them')
+    parser.add_argument('--physical-workers', type=int, default=1,
+                        help='Number of physical gateways configured concurrently')
+    parser.add_argument('--site-limit', type=int, default=None,
+                        help='Maximum number of physical gateways of one site configured concurrently')
+    parser.add_argument('--device-timeout', type=int, default=None,
+                        help='Seconds before a physical gateway configuration is reported as failed')
+    parser.add_argument('--clish-script', action='store_true',
+                        help='Send Sparks bootstrap commands as multi-line scripts')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Directory used to persist tenant lookups, tokens and idle sessions between runs')
+    parser.add_argument('--no-progress', dest='show_progress', action='store_false', default=None,
+                        help='Disable progress bars (automatic when not attached to a terminal)')
+    parser.add_argument('--rate-limit', action='append', default=[], type=parse_limit,
+                        metavar='CLASS=RATE[:BURST]',
+                        help='Limit requests per second for an endpoint class '
+                             '(auth, gateways, web_api_read, web_api_write, show_task); repeatable. '
+                             'Unlimited by default, apart from the server\'s Retry-After')
+    parser.add_argument('--auth-file', default='./config/auth_data.json',
+                        help='Smart-1 Cloud and management credentials (JSON)')
+    parser.add_argument('--policy-file', default='./config/policy_package_data.json',
+                        help='Policy package to install (JSON)')
+    parser.add_argument('--gateways', dest='gateways_file', default='./config/config_data.json',
+                        help='Gateway inventory: JSON array, JSON-lines (.jsonl) or CSV (.csv)')
+    parser.add_argument('--reject-file', default='logs/rejected_gateways.jsonl',
+                        help='JSON-lines file receiving inventory rows that fail validation')
+    parser.add_argument('--journal', default=DEFAULT_JOURNAL_FILE,
+                        help='Append-only JSON-lines record of every deployment step')
+    parser.add_argument('--resume', action='store_true',
+                        help='Replay the journal and continue from the last completed step per gateway')
+    parser.add_argument('--force', action='store_true',
+                        help='Process every gateway instead of resuming from the tenant inventory')
+    parser.add_argument('--metrics-file', default=None,
+                        help='Write Prometheus textfile metrics (latencies, retries, waits) at the end of the run')
+    parser.add_argument('--metrics-json', default=None,
+                        help='Write a JSON summary of the run metrics at the end of the run')
+    parser.add_argument('--trace', dest='trace_file', nargs='?', const=DEFAULT_TRACE_FILE, default=None,
+                        help='Record a timeline of every gateway as Chrome trace_event JSON '
+                             f'(default {DEFAULT_TRACE_FILE}; open in ui.perfetto.dev)')
+    parser.add_argument('--log-level', default='DEBUG', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Level of the log files (the console always shows INFO)')
+    parser.add_argument('--json-logs', action='store_true',
+                        help='Also write per-gateway JSON-lines logs to logs/s1c_deploy_sparks_gw.jsonl')
+    parser.add_argument('--task-timeout', type=int, default=DEFAULT_TASK_TIMEOUT,
+                        help='Seconds a publish or install task may run before it is reported as failed')
+    parser.add_argument('--settle-time', type=float, default=None,
+                        help='Minimum seconds after a Sparks command that restarts services '
+                             '(default: per command, 10-15s)')
+    parser.add_argument('--ready-timeout', type=int, default=DEFAULT_READY_TIMEOUT,
+                        help='Seconds to wait for an object or device to become ready')
+    args = parser.parse_args()
+    if args.use_async and (args.pipeline or args.publish_batch or args.bulk):
+        parser.error("--async cannot be combined with --pipeline, --publish-batch or --bulk")
+    configure_logging(getattr(logging, args.log_level), args.json_logs)
+    return DeployOptions(
+        workers=args.workers,
+        publish_batch=args.publish_batch,
+        bulk=args.bulk,
+        pipeline=args.pipeline,
+        use_async=args.use_async,
+        wave_size=args.wave_size,
+        wave_window=args.wave_window,
+        install_shard_size=args.install_shard_size,
+        install_parallel=args.install_parallel,
+        install_retries=args.install_retries,
+        policy_type=args.policy_type,
+        physical_workers=args.physical_workers,
+        site_limit=args.site_limit,
+        device_timeout=args.device_timeout,
+        clish_script=args.clish_script,
+        cache_dir=args.cache_dir,
+        show_progress=args.show_progress,
+        rate_limits=dict(args.rate_limit),
+        ready_timeout=args.ready_timeout,
+        settle_time=args.settle_time,
+        task_timeout=args.task_timeout,
+        force=args.force,
+        journal=args.journal,
+        resume=args.resume,
+        auth_file=args.auth_file,
+        policy_file=args.policy_file,
+        gateways_file=args.gateways_file,
+        reject_file=args.reject_file,
+        metrics_file=args.metrics_file,
+        metrics_json=args.metrics_json,
+        trace_file=args.trace_file
+    )
+
+
 if __name__ == '__main__':
-    deploy_s1c_sparks_gw()
+    deploy_s1c_sparks_gw(parse_args())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Smart-1 Cloud Gateway Deployment Orchestrator (asyncio)
+Runs the same phases as s1c_deploy_sparks_gw.py on the asyncio clients, so
+thousands of in-flight API calls and device waits share one event loop.
+Selected with: s1c_deploy_sparks_gw.py --async (requires aiohttp)
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional
+from utils.logger_main import log, log_context, LazyJSON
+from utils.load_config_file import AuthConfig, GatewayConfig, PolicyPackage, DeployOptions
+from utils.smart1_cloud_api_async import AsyncSmart1CloudAPI
+from utils.smart1_cloud_mgmt_api_async import AsyncManagementAPI
+from utils.sparks_rest_api_async import AsyncSparksGatewayAPI
+from utils.fleet import TaskResult, run_task_async, log_summary
+from utils.rate_limiter import shared_rate_limiter
+from utils.metrics import metrics
+from utils.inventory import Inventory, REGISTER, CONFIGURE, INSTALL, PHYSICAL
+from utils.journal import DeploymentJournal, GatewayProgress, NO_JOURNAL, STARTED, COMPLETED, FAILED
+from utils.deploy_stages import (
+    has_physical_credentials, needs_bootstrap, sparks_bootstrap_commands, deploy_stage, skipped_result,
+    current_policy_results, ONBOARDING_PHASE, INSTALL_PHASE, PHYSICAL_PHASE
+)
+
+
+async def process_gateways_async(auth_config: AuthConfig, config_data: List[GatewayConfig],
+                                 policy_config: PolicyPackage,
+                                 options: Optional[DeployOptions] = None,
+                                 inventory: Optional[Inventory] = None,
+                                 progress: Optional[Dict[str, GatewayProgress]] = None,
+                                 journal: DeploymentJournal = NO_JOURNAL) -> List[TaskResult]:
+    """Asyncio counterpart of process_gateways (phases with barriers)"""
+    options = options or DeployOptions()
+    stages = {
+        gateway.gw_name: deploy_stage(gateway, policy_config, inventory, progress)
+        for gateway in config_data
+    }
+    if inventory or progress:
+        log.info(f"Resuming deployment: {Inventory.describe(stages.values())}")
+    pending_onboarding = [gw for gw in config_data if stages[gw.gw_name] in (REGISTER, CONFIGURE)]
+
+    async with AsyncSmart1CloudAPI(
+        client_id=auth_config.client_id,
+        access_key=auth_config.access_key,
+        portal_url=auth_config.portal_url,
+        cache_dir=options.cache_dir
+    ) as s1c_cloud, AsyncManagementAPI(
+        instance=auth_config.instance,
+        context=auth_config.context,
+        api_key=auth_config.api_key,
+        cache_dir=options.cache_dir,
+        base_url=auth_config.mgmt_url,
+        task_timeout=options.task_timeout
+    ) as mgmt_api:
+
+        # Phase 1: Cloud Registration & Configuration
+        log.info(f"Processing {len(pending_onboarding)} gateways with {options.workers} concurrent task(s)")
+        workers = asyncio.Semaphore(options.workers)
+
+        async def onboard(gateway: GatewayConfig) -> TaskResult:
+            async with workers:
+                return await run_task_async(
+                    gateway.gw_name,
+                    lambda gw: register_and_configure_gateway(s1c_cloud, mgmt_api, gw, options,
+                                                             inventory, journal),
+                    gateway
+                )
+
+        with log_context(phase=ONBOARDING_PHASE), metrics.timer("phase_seconds", phase=ONBOARDING_PHASE):
+            registration_results = list(await asyncio.gather(*(onboard(gw) for gw in pending_onboarding)))
+        registration_results += [
+            skipped_result(gateway) for gateway in config_data
+            if stages[gateway.gw_name] not in (REGISTER, CONFIGURE)
+        ]
+        log_summary("Registration & configuration", registration_results)
+
+        pending_install = [
+            result.value for result in registration_results
+            if result.success and stages[result.name] in (REGISTER, CONFIGURE, INSTALL)
+        ]
+
+        # Phase 2: Policy Installation
+        install_results: List[TaskResult] = []
+        with log_context(phase=INSTALL_PHASE), metrics.timer("phase_seconds", phase=INSTALL_PHASE):
+            try:
+                if pending_install:
+                    log.info(f"🛡️  Installing policy package '{policy_config.policy_package}'")
+                    install_results = await install_policy_journaled(
+                        mgmt_api, [gateway.gw_name for gateway in pending_install], policy_config,
+                        options, journal
+                    )
+                else:
+                    log.info(f"⏭️  Policy package '{policy_config.policy_package}' "
+                             f"already installed on every gateway")
+            except Exception as e:
+                log.error(f"❌  Policy installation failed: {str(e)}")
+                raise
+        if install_results:
+            log_summary("Policy installation", install_results)
+
+        # Gateways whose installation failed are not bootstrapped
+        installed = {result.name for result in install_results if result.success}
+        pending_physical_config = [
+            gateway for gateway in pending_install
+            if gateway.gw_name in installed and needs_bootstrap(gateway, inventory)
+        ] + [gateway for gateway in config_data if stages[gateway.gw_name] == PHYSICAL]
+
+        # Phase 3: Physical Gateway Configuration
+        with log_context(phase=PHYSICAL_PHASE), metrics.timer("phase_seconds", phase=PHYSICAL_PHASE):
+            physical_results = await configure_physical_fleet(mgmt_api, pending_physical_config,
+                                                              options, journal)
+        if physical_results:
+            log_summary("Physical configuration", physical_results)
+
+    shared_rate_limiter.log_stats()
+    log.info("✅ All gateway processing completed")
+    return registration_results + install_results + physical_results
+
+
+async def install_policy_journaled(mgmt_api: AsyncManagementAPI, targets: List[str],
+                                   policy_config: PolicyPackage, options: DeployOptions,
+                                   journal: DeploymentJournal = NO_JOURNAL) -> List[TaskResult]:
+    """
+    Install the policy package in shards, journaling the install task-id and
+    outcome of every target; targets that already run the current revision
+    of the package are skipped
+    """
+    try:
+        outdated = await mgmt_api.outdated_policy_targets(targets, policy_config.policy_package, options.policy_type)
+    except Exception as e:
+        log.warning(f"Unable to read the installed policy of the targets, installing on all of them: {str(e)}")
+        outdated = targets
+    results = current_policy_results(targets, outdated, policy_config, journal)
+    task_of: Dict[str, str] = {}
+
+    def started(task_id: str, wave: List[str]) -> None:
+        task_of.update((name, task_id) for name in wave)
+        journal.record_many(wave, INSTALL, STARTED, task_id=task_id)
+
+    def finished(result: TaskResult) -> None:
+        if result.success:
+            journal.record(result.name, INSTALL, COMPLETED, task_id=task_of.get(result.name))
+        else:
+            journal.record(result.name, INSTALL, FAILED, task_id=task_of.get(result.name), error=result.error)
+
+    if outdated:
+        results.update((result.name, result) for result in await mgmt_api.install_policy_sharded(
+            policy_targets=outdated,
+            policy_package=policy_config.policy_package,
+            shard_size=options.install_shard_size,
+            parallel=options.install_parallel,
+            retries=options.install_retries,
+            on_task=started,
+            on_result=finished,
+            policy_type=options.policy_type
+        ))
+    return [results[name] for name in targets]
+
+
+async def configure_physical_fleet(mgmt_api: AsyncManagementAPI, gateways: List[GatewayConfig],
+                                   options: DeployOptions,
+                                   journal: DeploymentJournal = NO_JOURNAL) -> List[TaskResult]:
+    """Configure physical gateways under the global/per-site caps and device deadline"""
+    fleet = asyncio.Semaphore(options.physical_workers)
+    sites: Dict[Optional[str], asyncio.Semaphore] = defaultdict(
+        lambda: asyncio.Semaphore(options.site_limit or options.physical_workers)
+    )
+
+    async def configure(gateway: GatewayConfig) -> TaskResult:
+        async with sites[gateway.site], fleet:
+            return await run_task_async(
+                gateway.gw_name,
+                lambda gw: configure_physical_gateway(mgmt_api, gw, options, journal),
+                gateway,
+                timeout=options.device_timeout,
+                site=gateway.site
+            )
+
+    return list(await asyncio.gather(*(configure(gw) for gw in gateways)))
+
+
+async def register_and_configure_gateway(s1c_cloud: AsyncSmart1CloudAPI, mgmt_api: AsyncManagementAPI,
+                                         gateway: GatewayConfig, options: DeployOptions,
+                                         inventory: Optional[Inventory] = None,
+                                         journal: DeploymentJournal = NO_JOURNAL) -> GatewayConfig:
+    """Register one gateway in Smart-1 Cloud and configure its management object"""
+    log.info(f"🚀  Starting processing for {gateway.gw_name}")
+    if inventory and inventory.is_registered(gateway.gw_name):
+        log.info(f"⏭️  {gateway.gw_name} is already registered in Smart-1 Cloud")
+        gateway.maas_token = gateway.maas_token or inventory.maas_token(gateway.gw_name)
+    else:
+        with journal.step(gateway.gw_name, REGISTER) as entry:
+            registration = await s1c_cloud.register_gateway(gateway.gw_name)
+            gateway.maas_token = entry['maas_token'] = registration['token']
+        log.debug("Cloud registration response: %s", LazyJSON(registration))
+
+    log.info(f"⚙️  Configuring Gateway Object settings for {gateway.gw_name}")
+    try:
+        with journal.step(gateway.gw_name, CONFIGURE):
+            await mgmt_api.configure_gateway(
+                gw_name=gateway.gw_name,
+                version=gateway.version,
+                net_type=gateway.net_type,
+                hardware=gateway.hardware,
+                sic_key=gateway.sic_key,
+                ready_timeout=options.ready_timeout
+            )
+        log.info(f"Configured {gateway.gw_name} successfully")
+    except Exception as e:
+        log.error(f"Configuration failed for {gateway.gw_name}: {str(e)}")
+        raise
+
+    if has_physical_credentials(gateway):
+        log.info(f"⏳  Queueing {gateway.gw_name} for physical configuration")
+    return gateway
+
+
+async def configure_physical_gateway(mgmt_api: AsyncManagementAPI, gateway: GatewayConfig,
+                                     options: DeployOptions,
+                                     journal: DeploymentJournal = NO_JOURNAL) -> None:
+    """Phase 3 step for a single physical gateway"""
+    log.info(f"🔧 Configuring physical gateway {gateway.gw_name}")
+    if not gateway.maas_token:
+        raise ValueError(f"MaaS token of {gateway.gw_name} is unknown (registered by an earlier run); "
+                         "resume from the journal or set maas_token in its configuration")
+    try:
+        with journal.step(gateway.gw_name, PHYSICAL):
+            async with AsyncSparksGatewayAPI(
+                ip_address=gateway.gateway_ip,
+                username=gateway.gateway_username,
+                password=gateway.gateway_password,
+                settle_time=options.settle_time
+            ) as sparks_gw:
+                await sparks_gw.login()
+                commands = sparks_bootstrap_commands(gateway)
+                # The management connection is up once the management reports SIC with the gateway
+                effect_checks = {"connect security-management": lambda: mgmt_api.is_sic_established(gateway.gw_name)}
+                if options.clish_script:
+                    await sparks_gw.execute_clish_script(commands, ready_timeout=options.ready_timeout,
+                                                         effect_checks=effect_checks)
+                else:
+                    await sparks_gw.execute_clish(commands, ready_timeout=options.ready_timeout,
+                                                  effect_checks=effect_checks)
+        log.info(f"Sparks gateway {gateway.gw_name} configured successfully")
+    except Exception as e:
+        log.error(f"Sparks configuration failed: {str(e)}")
+        raise
+
+    log.info(f"🕒  Waiting for {gateway.gw_name} to establish SIC with the management")
+    try:
+        await mgmt_api.wait_for_sic(gateway.gw_name, options.ready_timeout)
+    except TimeoutError as e:
+        log.warning(f"{gateway.gw_name} configured, but SIC is not communicating yet: {str(e)}")
@@ -0,0 +1,19 @@
+"""Shared test fixtures"""
+
+import pytest
+
+from utils.simulator import Simulator, SimulatorConfig
+
+
+@pytest.fixture
+def gateway_row():
+    """Valid inventory row of a gateway without device credentials"""
+    return {"gw_name": "sparks1", "version": "R81.10", "hardware": "1575/1595",
+            "net_type": "Wireless", "sic_key": "sic-key"}
+
+
+@pytest.fixture
+def sim():
+    """Running simulator with short task durations"""
+    with Simulator(SimulatorConfig(task_duration=0.1, install_duration=0.2)) as simulator:
+        yield simulator
@@ -0,0 +1,32 @@
+import threading
+import time
+from utils.credential_cache import CredentialCache
+
+
+def test_sessions_survive_a_restart(tmp_path):
+    cache_file = tmp_path / "credentials.json"
+    CredentialCache(cache_file).release_session("mgmt:a", "sid-1", 600, time.time())
+
+    assert CredentialCache(cache_file).checkout_session("mgmt:a") == ("sid-1", 600)
+    assert CredentialCache(cache_file).checkout_session("mgmt:a") is None
+
+
+def test_concurrent_runs_do_not_lose_sessions(tmp_path):
+    """Two caches on one file stand in for two processes deploying at the same time"""
+    cache_file = tmp_path / "credentials.json"
+    runs = [CredentialCache(cache_file), CredentialCache(cache_file)]
+
+    def release(run, cache):
+        for i in range(50):
+            cache.release_session("mgmt:a", f"sid-{run}-{i}", 600, time.time())
+
+    threads = [threading.Thread(target=release, args=item) for item in enumerate(runs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    checked_out = []
+    while (entry := runs[0].checkout_session("mgmt:a")) is not None:
+        checked_out.append(entry[0])
+    assert len(checked_out) == len(set(checked_out)) == 100
@@ -0,0 +1,144 @@
+"""End-to-end deployments against the local simulator"""
+
+from collections import Counter
+
+import pytest
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+import s1c_deploy_sparks_gw
+from s1c_deploy_sparks_gw import process_gateways
+from utils.load_config_file import DeployOptions, PolicyPackage
+from utils.simulator import SIM_POLICY_PACKAGE
+
+GATEWAYS = 3
+MODES = [
+    pytest.param({}, id="phased"),
+    pytest.param({"pipeline": True}, id="pipeline"),
+    pytest.param({"use_async": True}, id="async",
+                 marks=pytest.mark.skipif(aiohttp is None, reason="aiohttp not installed")),
+]
+
+
+def deploy(sim, **options):
+    """Run a deployment and return its results and the requests it sent"""
+    before = Counter(sim.stats()["requests"])
+    results = process_gateways(
+        sim.auth_config(), sim.gateway_configs(GATEWAYS),
+        PolicyPackage(policy_package=SIM_POLICY_PACKAGE, install_delay=0),
+        DeployOptions(workers=2, physical_workers=2, show_progress=False, ready_timeout=10, settle_time=0,
+                      **options)
+    )
+    return results, Counter(sim.stats()["requests"]) - before
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_rerun_skips_completed_gateways(sim, mode):
+    results, _ = deploy(sim, **mode)
+    assert all(result.success for result in results)
+
+    results, requests = deploy(sim, **mode)
+
+    assert all(result.success for result in results)
+    assert requests["gateway-register"] == 0
+    assert requests["install-policy"] == 0
+    assert requests["device-login"] == 0  # SIC already established, no bootstrap
+
+
+@pytest.mark.parametrize("mode", MODES[:2])
+def test_unreadable_inventory_does_not_stop_the_deployment(sim, mode, monkeypatch):
+    def listing_down(*args, **kwargs):
+        raise ConnectionError("gateway listing unavailable")
+
+    monkeypatch.setattr(s1c_deploy_sparks_gw.Inventory, "fetch", listing_down)
+    results, requests = deploy(sim, **mode)
+
+    assert all(result.success for result in results)
+    assert requests["gateway-register"] == GATEWAYS
+
+
+def test_pipeline_reads_the_inventory_per_batch(sim, monkeypatch):
+    fetch = s1c_deploy_sparks_gw.Inventory.fetch
+    queried = []
+
+    def record_names(s1c_cloud, mgmt_api, names, *args):
+        queried.append(names)
+        return fetch(s1c_cloud, mgmt_api, names, *args)
+
+    monkeypatch.setattr(s1c_deploy_sparks_gw, "INVENTORY_BATCH_SIZE", 2)
+    monkeypatch.setattr(s1c_deploy_sparks_gw.Inventory, "fetch", record_names)
+    deploy(sim, pipeline=True)
+    results, requests = deploy(sim, pipeline=True)
+
+    assert [len(names) for names in queried] == [2, 1, 2, 1]
+    assert all(result.success for result in results)
+    assert requests["gateway-register"] == 0
+
+
+@pytest.mark.parametrize("option", ["--pipeline", "--bulk", "--publish-batch=10"])
+def test_async_rejects_batched_modes(option, monkeypatch):
+    monkeypatch.setattr("sys.argv", ["s1c_deploy_sparks_gw.py", "--async", option])
+
+    with pytest.raises(SystemExit):
+        s1c_deploy_sparks_gw.parse_args()
+
+
+def test_package_change_reinstalls_without_bootstrap(sim):
+    deploy(sim)
+    sim.tenant.modify_package(SIM_POLICY_PACKAGE)
+
+    results, requests = deploy(sim)
+
+    assert all(result.success for result in results)
+    assert requests["install-policy"] == 1
+    assert requests["device-login"] == 0
+
+
+def test_rerun_with_policy_type(sim):
+    deploy(sim)
+
+    results, requests = deploy(sim, policy_type="threat-prevention")
+
+    assert all(result.success for result in results)
+    assert requests["install-policy"] == 0
+
+
+def test_resume_finishes_physical_stage_from_journal(sim, tmp_path, monkeypatch):
+    journal = str(tmp_path / "journal.jsonl")
+
+    def device_down(*args, **kwargs):
+        raise ConnectionError("device unreachable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(s1c_deploy_sparks_gw, "configure_sparks_gateway", device_down)
+        results, _ = deploy(sim, journal=journal)
+    assert [result.error for result in results if not result.success] == ["device unreachable"] * GATEWAYS
+
+    # The MaaS tokens of the registration are only known from the journal
+    results, requests = deploy(sim, journal=journal, resume=True)
+
+    assert all(result.success for result in results)
+    assert requests["gateway-register"] == 0
+    assert requests["install-policy"] == 0
+    assert requests["device-login"] == GATEWAYS
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_sessions_are_logged_out_without_a_cache(sim, mode):
+    _, requests = deploy(sim, **mode)
+
+    assert requests["login"] > 0
+    assert requests["logout"] == requests["login"]
+
+
+def test_persisted_sessions_are_reused(sim, tmp_path):
+    _, requests = deploy(sim, cache_dir=str(tmp_path))
+    assert requests["logout"] == 0  # Idle sessions stay pooled for the next run
+
+    _, requests = deploy(sim, cache_dir=str(tmp_path))
+
+    assert requests["login"] == 0
+    assert requests["auth"] == 0
@@ -0,0 +1,56 @@
+import threading
+import time
+from utils.fleet import FleetExecutor
+from utils.wait import DeadlineExceeded, check_deadline, deadline, remaining
+
+
+def test_results_keep_input_order_per_site():
+    executor = FleetExecutor(max_workers=2, site_limit=1)
+    items = [("a", "east"), ("b", "east"), ("c", "west")]
+
+    results = executor.run(items, lambda item: item[0].upper(), name_of=lambda item: item[0],
+                           site_of=lambda item: item[1])
+
+    assert [(result.name, result.value, result.site) for result in results] == [
+        ("a", "A", "east"), ("b", "B", "east"), ("c", "C", "west")
+    ]
+
+
+def test_failures_are_collected():
+    def fail_b(name):
+        if name == "b":
+            raise ValueError("broken")
+        return name
+
+    results = FleetExecutor(max_workers=2).run(["a", "b"], fail_b, name_of=str)
+
+    assert [(result.success, result.error) for result in results] == [(True, None), (False, "broken")]
+
+
+def test_device_past_its_deadline_stops_at_the_next_step():
+    steps = []
+    stopped = threading.Event()
+
+    def configure(_name):
+        try:
+            for step in range(50):
+                check_deadline(f"step {step}")
+                steps.append(step)
+                time.sleep(0.02)
+        except DeadlineExceeded:
+            stopped.set()
+            raise
+
+    [result] = FleetExecutor(max_workers=1, timeout=0.1).run(["slow"], configure, name_of=str)
+
+    assert not result.success and result.error == "Timed out after 0.1s"
+    assert stopped.wait(timeout=5)
+    assert len(steps) < 50
+
+
+def test_nested_deadlines_keep_the_earliest():
+    with deadline(100):
+        assert 99 < remaining(1000) <= 100
+        with deadline(1000):
+            assert remaining(1000) <= 100
+    assert remaining(1000) == 1000
@@ -0,0 +1,81 @@
+import json
+import pytest
+from utils.gateway_loader import iter_gateway_configs
+
+
+def read_rejects(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_json_array_is_streamed(tmp_path, gateway_row):
+    inventory = tmp_path / "gateways.json"
+    inventory.write_text(json.dumps([dict(gateway_row, gw_name=f"gw{i}") for i in range(3)]))
+
+    assert [gw.gw_name for gw in iter_gateway_configs(str(inventory))] == ["gw0", "gw1", "gw2"]
+
+
+def test_json_array_across_read_chunks(tmp_path, gateway_row, monkeypatch):
+    monkeypatch.setattr("utils.gateway_loader.READ_CHUNK_SIZE", 7)
+    inventory = tmp_path / "gateways.json"
+    inventory.write_text(json.dumps([dict(gateway_row, gw_name=f"gw{i}") for i in range(5)], indent=2))
+
+    assert len(list(iter_gateway_configs(str(inventory)))) == 5
+
+
+def test_jsonl_rejects_invalid_and_duplicate_rows(tmp_path, gateway_row):
+    inventory = tmp_path / "gateways.jsonl"
+    reject_file = tmp_path / "rejected.jsonl"
+    inventory.write_text("\n".join([
+        json.dumps(gateway_row),
+        "{not json",
+        json.dumps({"gw_name": "no-version"}),
+        json.dumps(gateway_row),
+        "",
+        json.dumps(dict(gateway_row, gw_name="sparks2")),
+    ]) + "\n")
+
+    gateways = list(iter_gateway_configs(str(inventory), str(reject_file)))
+
+    assert [gw.gw_name for gw in gateways] == ["sparks1", "sparks2"]
+    rejects = read_rejects(reject_file)
+    assert [reject["row"] for reject in rejects] == [2, 3, 4]
+    assert rejects[0]["error"].startswith("Invalid JSON")
+    assert "version" in rejects[1]["error"]
+    assert rejects[2]["error"] == "Duplicate gateway name sparks1"
+
+
+def test_csv_empty_cells_are_unset(tmp_path):
+    inventory = tmp_path / "gateways.csv"
+    inventory.write_text(
+        "gw_name,version,hardware,net_type,sic_key,gateway_ip,site\n"
+        "sparks1,R81.10,1575/1595,Wireless,key,203.0.113.1,branch-1\n"
+        "sparks2,R82,1800,Wireless,key,,\n"
+    )
+
+    first, second = iter_gateway_configs(str(inventory))
+
+    assert (first.gateway_ip, first.site) == ("203.0.113.1", "branch-1")
+    assert (second.gateway_ip, second.site) == (None, None)
+
+
+def test_reject_file_is_not_created_without_rejects(tmp_path, gateway_row):
+    inventory = tmp_path / "gateways.jsonl"
+    reject_file = tmp_path / "rejected.jsonl"
+    inventory.write_text(json.dumps(gateway_row) + "\n")
+
+    assert len(list(iter_gateway_configs(str(inventory), str(reject_file)))) == 1
+    assert not reject_file.exists()
+
+
+@pytest.mark.parametrize("content", ['{"gw_name": "x"}', '[{"gw_name": "x"} {"gw_name": "y"}]', '[{"gw_name": "x"},'])
+def test_malformed_json_array_raises(tmp_path, content):
+    inventory = tmp_path / "gateways.json"
+    inventory.write_text(content)
+
+    with pytest.raises(ValueError):
+        list(iter_gateway_configs(str(inventory)))
+
+
+def test_missing_inventory_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(iter_gateway_configs(str(tmp_path / "missing.json")))
@@ -0,0 +1,68 @@
+from utils.smart1_cloud_mgmt_api import InstallWaves, ManagementAPI
+
+
+def drain(waves, failures_of):
+    """Install every wave, failing the targets failures_of returns for it"""
+    installed = []
+    while waves.pending:
+        wave = waves.next_wave()
+        installed.append(wave)
+        waves.settle(wave, failures_of(wave))
+    return installed
+
+
+def test_targets_are_split_into_shards():
+    waves = InstallWaves(["a", "b", "c", "d", "e"], shard_size=2, retries=0)
+
+    assert drain(waves, lambda wave: {}) == [["a", "b"], ["c", "d"], ["e"]]
+    assert all(result.success for result in waves.ordered_results())
+
+
+def test_failed_targets_are_requeued_until_retries_are_used_up():
+    reported = []
+    waves = InstallWaves(["a", "b", "c", "d"], shard_size=2, retries=1, on_result=reported.append)
+
+    installed = drain(waves, lambda wave: {name: "failed" for name in wave if name in ("b", "d")})
+
+    # Each wave's failures are queued as a new wave, then reported as failed
+    assert installed == [["a", "b"], ["c", "d"], ["b"], ["d"]]
+    results = {result.name: result for result in waves.ordered_results()}
+    assert [name for name, result in results.items() if not result.success] == ["b", "d"]
+    assert [result.name for result in reported] == ["a", "c", "b", "d"]  # Each target reported once
+
+
+def test_retry_that_succeeds_is_reported_as_success():
+    attempts = {}
+
+    def fail_first_attempt(wave):
+        failures = {name: "failed" for name in wave if name not in attempts}
+        attempts.update((name, True) for name in wave)
+        return failures
+
+    waves = InstallWaves(["a", "b"], shard_size=None, retries=2)
+    installed = drain(waves, fail_first_attempt)
+
+    assert installed == [["a", "b"], ["a", "b"]]
+    assert all(result.success for result in waves.ordered_results())
+
+
+def test_fail_remaining_reports_unsettled_targets():
+    waves = InstallWaves(["a", "b", "c"], shard_size=1, retries=0)
+    waves.settle(waves.next_wave(), {})
+
+    waves.fail_remaining("aborted")
+
+    assert [(result.name, result.success, result.error) for result in waves.ordered_results()] == [
+        ("a", True, None), ("b", False, "aborted"), ("c", False, "aborted")
+    ]
+
+
+def test_batch_failures_names_failed_targets():
+    task = {"tasks": [{"task-details": [
+        {"gatewayName": "a", "status": "succeeded"},
+        {"gatewayName": "b", "status": "failed"},
+        {"name": "c", "errors": [{"message": "x"}]},
+        {"gatewayName": "other", "status": "failed"},
+    ]}]}
+
+    assert ManagementAPI._batch_failures(task, ["a", "b", "c"]) == {"b", "c"}
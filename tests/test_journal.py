@@ -0,0 +1,98 @@
+import os
+import pytest
+from utils.inventory import REGISTER, CONFIGURE, INSTALL, PHYSICAL, DONE
+from utils.journal import DeploymentJournal, GatewayProgress, STARTED, COMPLETED, FAILED
+
+
+@pytest.fixture(name="journal")
+def journal_fixture(tmp_path):
+    journal = DeploymentJournal(str(tmp_path / "journal.jsonl"))
+    yield journal
+    journal.close()
+
+
+def test_replay_merges_runs(journal):
+    journal.record("gw1", REGISTER, COMPLETED, maas_token="token-1")
+    journal.record("gw1", CONFIGURE, STARTED)
+    journal.record("gw1", CONFIGURE, FAILED, error="timeout")
+    journal.record("gw2", REGISTER, COMPLETED, maas_token="token-2")
+    journal.record("gw2", CONFIGURE, COMPLETED)
+    journal.close()
+    # A second run appends to the same journal
+    journal.record("gw1", CONFIGURE, COMPLETED)
+
+    progress = journal.replay()
+
+    assert progress["gw1"].completed == [REGISTER, CONFIGURE]
+    assert progress["gw1"].maas_token == "token-1"
+    assert progress["gw1"].stage(physical=False) == INSTALL
+    assert progress["gw2"].maas_token == "token-2"
+
+
+def test_new_registration_resets_progress(journal):
+    journal.record("gw1", REGISTER, COMPLETED, maas_token="old")
+    journal.record("gw1", CONFIGURE, COMPLETED)
+    journal.record("gw1", REGISTER, STARTED)
+    journal.record("gw1", REGISTER, COMPLETED, maas_token="new")
+
+    state = journal.replay()["gw1"]
+
+    assert state.completed == [REGISTER]
+    assert state.maas_token == "new"
+
+
+def test_install_task_is_pending_until_settled(journal):
+    journal.record_many(["gw1", "gw2"], INSTALL, STARTED, task_id="task-1")
+    journal.record("gw2", INSTALL, COMPLETED, task_id="task-1")
+
+    progress = journal.replay()
+
+    assert progress["gw1"].install_task == "task-1"
+    assert progress["gw2"].install_task is None
+    assert INSTALL in progress["gw2"].completed
+
+
+def test_step_records_outcome_and_details(journal):
+    with journal.step("gw1", REGISTER) as entry:
+        entry["maas_token"] = "token"
+    with pytest.raises(RuntimeError):
+        with journal.step("gw1", CONFIGURE):
+            raise RuntimeError("boom")
+
+    state = journal.replay()["gw1"]
+
+    assert state.completed == [REGISTER]
+    assert state.maas_token == "token"
+
+
+def test_unreadable_lines_are_skipped(journal):
+    journal.record("gw1", REGISTER, COMPLETED)
+    journal.close()
+    with open(journal.journal_file, "a", encoding="utf-8") as f:
+        f.write("{truncated\n")
+    journal.record("gw1", CONFIGURE, COMPLETED)
+
+    assert journal.replay()["gw1"].completed == [REGISTER, CONFIGURE]
+
+
+def test_journal_is_owner_only(journal):
+    journal.record("gw1", REGISTER, COMPLETED, maas_token="secret")
+
+    assert os.stat(journal.journal_file).st_mode & 0o077 == 0
+
+
+def test_disabled_journal_records_nothing():
+    journal = DeploymentJournal()
+    journal.record("gw1", REGISTER, COMPLETED)
+
+    assert journal.replay() == {}
+
+
+@pytest.mark.parametrize("completed, physical, stage", [
+    ([], True, REGISTER),
+    ([REGISTER, CONFIGURE, INSTALL], True, PHYSICAL),
+    ([REGISTER, CONFIGURE, INSTALL], False, DONE),
+    ([REGISTER, CONFIGURE, INSTALL, PHYSICAL], True, DONE),
+])
+def test_progress_stage(completed, physical, stage):
+    assert GatewayProgress(name="gw1", completed=completed).stage(physical) == stage
@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from utils import rate_limiter
+from utils.rate_limiter import RateLimiter, TokenBucket, parse_limit
+
+
+class Clock:
+    """Controllable time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(name="clock")
+def clock_fixture(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+@pytest.mark.usefixtures("clock")
+def test_burst_then_queue():
+    bucket = TokenBucket(rate=2, burst=3)
+
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    # Later callers queue up behind each other, half a second apart
+    assert [bucket.reserve() for _ in range(2)] == [0.5, 1.0]
+    assert (bucket.acquired, bucket.delayed, bucket.held_seconds) == (5, 2, 1.5)
+
+
+def test_tokens_refill_up_to_capacity(clock):
+    bucket = TokenBucket(rate=1, burst=2)
+    bucket.reserve()
+    bucket.reserve()
+
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(2)] == [0, 0]
+    assert bucket.reserve() == 1.0
+
+
+def test_default_capacity():
+    assert TokenBucket(rate=0.5).capacity == 1.0
+    assert TokenBucket(rate=5).capacity == 5
+
+
+@pytest.mark.usefixtures("clock")
+def test_limiter_classes():
+    limiter = RateLimiter({"auth": (1, 1), "web_api_read": (0, 0)})
+
+    assert limiter.acquire("auth") == 0
+    assert limiter.acquire("web_api_read") == 0  # A zero rate disables the class
+    assert limiter.acquire("unknown") == 0
+    assert limiter.acquire(None) == 0
+    assert set(limiter.stats()) == {"auth"}
+
+
+def test_nothing_is_limited_by_default():
+    assert not RateLimiter().buckets
+
+
+def test_back_off_pauses_the_endpoint_class(clock, monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", slept.append)
+    limiter = RateLimiter()
+
+    limiter.back_off("web_api_write", 4)
+    limiter.back_off("web_api_write", 1)  # A shorter request does not cut the pause short
+    clock.now += 1
+
+    assert limiter.acquire("web_api_read") == 0
+    assert limiter.acquire("web_api_write") == 3
+    assert slept == [3]
+    clock.now += 3
+    assert limiter.acquire("web_api_write") == 0
+
+
+@pytest.mark.usefixtures("clock")
+def test_acquire_async_waits_without_blocking(monkeypatch):
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter({"gateways": (4, 1)})
+
+    async def two_requests():
+        return [await limiter.acquire_async("gateways") for _ in range(2)]
+
+    assert asyncio.run(two_requests()) == [0, 0.25]
+    assert slept == [0.25]
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("auth=2", ("auth", (2.0, 2.0))),
+    ("web_api_write=0.5", ("web_api_write", (0.5, 1.0))),
+    ("show_task=3:10", ("show_task", (3.0, 10.0))),
+])
+def test_parse_limit(spec, expected):
+    assert parse_limit(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["auth", "auth=fast", "auth=1:x"])
+def test_parse_limit_rejects_malformed_values(spec):
+    with pytest.raises(ValueError):
+        parse_limit(spec)
@@ -0,0 +1,173 @@
+import time
+from email.utils import formatdate
+import pytest
+import requests
+from requests.exceptions import ChunkedEncodingError, ConnectionError as RequestsConnectionError
+from utils import retry_policy
+from utils.rate_limiter import RateLimiter
+from utils.retry_policy import (
+    CircuitBreaker, CircuitOpenError, RetryPolicy, retry_after_seconds, MAX_RETRY_AFTER
+)
+
+
+def response(status, headers=None):
+    result = requests.Response()
+    result.status_code = status
+    result.headers.update(headers or {})
+    return result
+
+
+class FakeSession:
+    """Answers with the given responses (exceptions are raised) and counts the calls"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, _method, _url, **_kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(retry_policy.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(retry_policy, "_breakers", {})
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5", 5.0),
+    ("0", 0.0),
+    ("-3", 0.0),
+    ("100000", MAX_RETRY_AFTER),
+    ("soon", None),
+    (None, None),
+])
+def test_retry_after_seconds(value, expected):
+    headers = {"Retry-After": value} if value is not None else {}
+    assert retry_after_seconds(response(429, headers)) == expected
+
+
+def test_retry_after_http_date():
+    value = formatdate(time.time() + 60, usegmt=True)
+    assert 55 <= retry_after_seconds(response(503, {"Retry-After": value})) <= 60
+
+
+def test_retry_delay_rules():
+    policy = RetryPolicy(max_retries=2, base_delay=1, max_delay=4)
+
+    assert policy.retry_delay(response(200), 0, idempotent=True) is None
+    assert policy.retry_delay(response(400), 0, idempotent=True) is None
+    assert 0 <= policy.retry_delay(response(502), 0, idempotent=True) <= 1
+    assert policy.retry_delay(response(502), 2, idempotent=True) is None  # Retries used up
+    # A non-idempotent call is only resent when the server refused it explicitly
+    assert policy.retry_delay(response(502), 0, idempotent=False) is None
+    assert policy.retry_delay(response(429), 0, idempotent=False) is None
+    assert policy.retry_delay(response(429, {"Retry-After": "3"}), 0, idempotent=False) == 3
+
+
+def test_request_retries_until_success():
+    session = FakeSession(response(503), response(502), response(200))
+
+    result = RetryPolicy(max_retries=3).request(session, "GET", "https://host/a")
+
+    assert result.status_code == 200
+    assert session.calls == 3
+
+
+def test_retry_after_pauses_the_rate_limit_class():
+    limiter = RateLimiter()
+    session = FakeSession(response(429, {"Retry-After": "7"}), response(200))
+
+    RetryPolicy(max_retries=1).request(session, "GET", "https://host/a",
+                                       rate_limiter=limiter, rate_class="gateways")
+
+    assert 0 < limiter._pause("gateways") <= 7
+
+
+def test_ambiguous_failure_of_non_idempotent_call_is_not_resent():
+    session = FakeSession(RequestsConnectionError("reset"))
+
+    with pytest.raises(RequestsConnectionError):
+        RetryPolicy(max_retries=3).request(session, "POST", "https://host/a", idempotent=False)
+    assert session.calls == 1
+
+
+def test_circuit_opens_and_fails_fast():
+    policy = RetryPolicy(max_retries=0)
+    session = FakeSession(response(500))
+    for _ in range(retry_policy.BREAKER_FAILURE_THRESHOLD):
+        policy.request(session, "GET", "https://dead/a")
+
+    with pytest.raises(CircuitOpenError):
+        policy.request(session, "GET", "https://dead/a")
+    assert session.calls == retry_policy.BREAKER_FAILURE_THRESHOLD
+
+
+def test_probes_do_not_open_the_circuit():
+    policy = RetryPolicy(max_retries=0)
+    session = FakeSession(RequestsConnectionError("rebooting"))
+    for _ in range(retry_policy.BREAKER_FAILURE_THRESHOLD * 2):
+        with pytest.raises(RequestsConnectionError):
+            policy.request(session, "POST", "https://device/probe", probe=True)
+
+    assert retry_policy.circuit_breaker("https://device/probe").allow()
+
+
+def test_breaker_half_open_lets_one_trial_through(monkeypatch):
+    breaker = CircuitBreaker("host", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    monkeypatch.setattr(retry_policy.time, "monotonic", lambda: breaker.opened_at + 11)
+    assert breaker.allow()
+    assert not breaker.allow()  # The trial is still in flight
+    breaker.record_success()
+    assert breaker.allow()
+
+
+def open_circuit(url, monkeypatch):
+    """Open the circuit of a host and move past its reset timeout (half-open)"""
+    breaker = retry_policy.circuit_breaker(url)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    opened_at = breaker.opened_at
+    monkeypatch.setattr(retry_policy.time, "monotonic", lambda: opened_at + breaker.reset_timeout + 1)
+    return breaker
+
+
+def test_failed_trial_with_other_transport_error_reopens_the_circuit(monkeypatch):
+    breaker = open_circuit("https://flaky/a", monkeypatch)
+    session = FakeSession(ChunkedEncodingError("truncated"))
+
+    with pytest.raises(ChunkedEncodingError):
+        RetryPolicy(max_retries=0).request(session, "GET", "https://flaky/a")
+
+    # The trial has ended as a failure, so the next reset timeout brings the next trial
+    reopened_at = breaker.opened_at
+    monkeypatch.setattr(retry_policy.time, "monotonic", lambda: reopened_at + breaker.reset_timeout + 1)
+    assert breaker.allow()
+
+
+def test_probe_does_not_close_the_circuit(monkeypatch):
+    breaker = open_circuit("https://device/a", monkeypatch)
+
+    RetryPolicy(max_retries=0).request(FakeSession(response(200)), "POST", "https://device/a", probe=True)
+
+    assert breaker.opened_at is not None
+
+
+@pytest.mark.parametrize("endpoint, idempotent", [
+    ("show-simple-gateway", True),
+    ("set-simple-gateway", True),
+    ("discard", True),
+    ("set-objects-batch", False),
+    ("publish", False),
+    ("install-policy", False),
+])
+def test_web_api_idempotency(endpoint, idempotent):
+    from utils.smart1_cloud_mgmt_api import ManagementAPI
+    assert ManagementAPI._is_idempotent(endpoint) is idempotent
@@ -0,0 +1,56 @@
+"""Gateway listing against the local simulator"""
+
+import asyncio
+
+import pytest
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from utils.smart1_cloud_api import Smart1CloudAPI
+from utils.smart1_cloud_api_async import AsyncSmart1CloudAPI
+
+GATEWAYS = 5
+
+
+def cloud_client(sim):
+    auth = sim.auth_config()
+    return Smart1CloudAPI(client_id=auth.client_id, access_key=auth.access_key, portal_url=auth.portal_url)
+
+
+@pytest.fixture(name="capped_sim")
+def capped_sim_fixture(sim):
+    """Simulator whose gateway list returns fewer rows than requested per page"""
+    for i in range(GATEWAYS):
+        sim.tenant.register(f"sim-gw{i}", "")
+    sim.tenant.config.page_limit = 2
+    return sim
+
+
+@pytest.mark.parametrize("data, expected", [
+    ({"total": 5}, False),  # Capped page, more rows reported
+    ({"total": 4}, True),
+    ({}, True),  # No total: a short page ends the listing
+])
+def test_last_page(data, expected):
+    assert Smart1CloudAPI._last_page([{}, {}], data, offset=4, page_size=10) is expected
+
+
+def test_server_page_cap_does_not_truncate_the_listing(capped_sim):
+    gateways = list(cloud_client(capped_sim).iter_gateways(page_size=4))
+
+    assert len(gateways) == GATEWAYS
+
+
+@pytest.mark.skipif(aiohttp is None, reason="aiohttp not installed")
+def test_server_page_cap_does_not_truncate_the_async_listing(capped_sim):
+    auth = capped_sim.auth_config()
+
+    async def list_gateways():
+        async with AsyncSmart1CloudAPI(client_id=auth.client_id, access_key=auth.access_key,
+                                       portal_url=auth.portal_url) as s1c_cloud:
+            return [gateway async for gateway in s1c_cloud.iter_gateways(page_size=4)]
+
+    assert len(asyncio.run(list_gateways())) == GATEWAYS
@@ -0,0 +1,121 @@
+import time
+import pytest
+from utils.sparks_rest_api import SparksGatewayAPI, SLOW_COMMANDS, redact
+
+COMMANDS = [
+    "set security-management mode centrally-managed",
+    "set sic_init password key",
+    "show hostname",
+]
+
+
+def test_split_script_ends_chunks_at_slow_commands():
+    commands = ["connect maas auth-token t", "set a", "fetch certificate x", "set b", "fw fetch 1.2.3.4", "set c"]
+
+    assert SparksGatewayAPI.split_script(commands) == [
+        ["connect maas auth-token t"],
+        ["set a", "fetch certificate x"],
+        ["set b", "fw fetch 1.2.3.4"],
+        ["set c"],
+    ]
+
+
+def test_parse_echoed_output_per_command():
+    output = "\n".join([
+        f"gw> {COMMANDS[0]}",
+        f"gw> {COMMANDS[1]}",
+        "Error: password too short",
+        f"gw> {COMMANDS[2]}",
+        "sparks1",
+    ])
+
+    results = SparksGatewayAPI.parse_script_output(COMMANDS, output)
+
+    assert [result.command for result in results] == COMMANDS
+    assert [result.success for result in results] == [True, False, True]
+    assert results[1].output == "Error: password too short"
+    assert results[2].output == "sparks1"
+
+
+def test_parse_output_without_echoes_is_shared():
+    results = SparksGatewayAPI.parse_script_output(COMMANDS, "done")
+
+    assert all(result.success for result in results)
+    assert [result.output for result in results] == ["", "", "done"]
+
+    failed = SparksGatewayAPI.parse_script_output(COMMANDS, "Invalid command: show hostnam")
+    assert not any(result.success for result in failed)
+
+
+@pytest.mark.parametrize("output", ["failed to apply", "  unknown command 'x'", "ERROR: x"])
+def test_error_lines_fail_the_command(output):
+    [result] = SparksGatewayAPI.parse_script_output(["set x"], f"> set x\n{output}")
+    assert not result.success
+
+
+@pytest.mark.parametrize("output, fetched", [
+    ("HOST      POLICY     DATE\nlocalhost Standard   16Oct2026 10:00:00 :  [>eth1]", True),
+    ("HOST      POLICY     DATE\nlocalhost InitialPolicy 16Oct2026 10:00:00 :  [>eth1]", False),
+    ("HOST      POLICY     DATE\nlocalhost -          -", False),
+    ("Invalid command: fw stat", True),  # Firmware without fw stat: the device answering is all there is
+])
+def test_policy_loaded(output, fetched):
+    assert SparksGatewayAPI.policy_loaded(output) is fetched
+
+
+@pytest.fixture(name="sleeps")
+def sleeps_fixture(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_slow_command_waits_its_minimum_then_polls_the_effect(sleeps, monkeypatch):
+    device = SparksGatewayAPI("192.0.2.1", "admin", "password")
+    outputs = iter(["HOST POLICY\nlocalhost InitialPolicy", "HOST POLICY\nlocalhost Standard"])
+    probes = []
+
+    def run_command(cmd, idempotent=False, probe=False):
+        probes.append((cmd, idempotent, probe))
+        return next(outputs)
+
+    monkeypatch.setattr(device, "_run_command", run_command)
+
+    device.wait_until_applied("fw fetch 100.64.0.52", timeout=60)
+
+    assert sleeps[0] == SLOW_COMMANDS["fw fetch"]
+    assert probes == [("fw stat", True, True)] * 2
+
+
+def test_effect_check_supplied_by_the_caller(sleeps):
+    device = SparksGatewayAPI("192.0.2.1", "admin", "password", settle_time=0)
+    answers = iter([False, True])
+
+    device.wait_until_applied("connect security-management mgmt-addr x", timeout=60,
+                              effect_checks={"connect security-management": lambda: next(answers)})
+
+    assert len(sleeps) == 1  # No minimum wait, one poll interval until SIC is up
+
+
+def test_redact_masks_tokens_and_passwords():
+    assert redact("connect maas auth-token s3cr3t==") == "connect maas auth-token ****"
+    assert redact("set sic_init password key123") == "set sic_init password ****"
+    assert redact("connect security-management use-one-time-password true") == \
+        "connect security-management use-one-time-password true"
+
+
+@pytest.mark.parametrize("script", [False, True])
+def test_secrets_are_not_logged(script, monkeypatch, caplog):
+    device = SparksGatewayAPI("192.0.2.1", "admin", "password")
+    monkeypatch.setattr(device, "_run_command", lambda cmd, idempotent=False, probe=False: "")
+    commands = ["set sic_init password key123", "connect maas auth-token s3cr3t"]
+    monkeypatch.setattr(device, "wait_until_applied", lambda *args: None)
+
+    with caplog.at_level("DEBUG", logger="Smart1CloudDeployer"):
+        if script:
+            device.execute_clish_script(commands)
+        else:
+            device.execute_clish(commands)
+
+    assert "password ****" in caplog.text
+    assert "key123" not in caplog.text and "s3cr3t" not in caplog.text
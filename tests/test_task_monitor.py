@@ -0,0 +1,49 @@
+import pytest
+from utils.task_monitor import TaskMonitor, TaskFailedError, TaskTimeoutError
+
+
+class FakeShowTask:
+    """show-task handler reporting a scripted status per task"""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = []
+
+    def __call__(self, command, payload):
+        assert command == "show-task"
+        self.calls.append(payload["task-id"])
+        return {"tasks": [{"task-id": task_id, "status": self.statuses[task_id].pop(0)}
+                          for task_id in payload["task-id"]]}
+
+
+def monitor(statuses, **kwargs):
+    return TaskMonitor(FakeShowTask(statuses), initial_interval=0.01, max_interval=0.02,
+                       show_progress=False, **kwargs)
+
+
+def test_tasks_are_polled_until_they_complete():
+    tasks = monitor({"a": ["in progress", "succeeded"], "b": ["succeeded"]})
+
+    results = tasks.wait_all(["a", "b"])
+
+    assert [result["status"] for result in results] == ["succeeded", "succeeded"]
+    assert sum(call.count("a") for call in tasks.api_call.calls) == 2
+
+
+def test_failed_task_raises():
+    tasks = monitor({"a": ["failed"]})
+
+    with pytest.raises(TaskFailedError) as error:
+        tasks.wait("a")
+    assert error.value.task_id == "a"
+
+
+def test_task_running_past_its_deadline_fails():
+    tasks = monitor({"stuck": ["in progress"] * 1000, "quick": ["succeeded"]}, task_timeout=0.1)
+    stuck, quick = tasks.submit("stuck"), tasks.submit("quick")
+
+    with pytest.raises(TaskTimeoutError) as error:
+        stuck.result(timeout=5)
+    assert error.value.status == "IN PROGRESS"
+    assert quick.result(timeout=5)["status"] == "succeeded"
+    assert not tasks._tasks  # The poller does not keep polling the expired task
@@ -0,0 +1,138 @@
+"""
+Asyncio HTTP Layer
+
+aiohttp counterpart of RetryPolicy.request used by the async clients. The
+same retry, Retry-After, idempotency, circuit breaker and rate limit rules
+apply; transport and HTTP errors are raised as the requests exceptions the
+synchronous clients already handle.
+
+aiohttp is optional and only needed for the async clients:
+    pip install aiohttp
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+from requests.exceptions import ConnectionError as RequestsConnectionError, HTTPError, Timeout
+from .logger_main import log
+from .rate_limiter import RateLimiter
+from .metrics import metrics, WAIT_RATE_LIMIT
+from .retry_policy import (
+    CircuitOpenError, RetryPolicy, circuit_breaker, record_attempt, record_retry, throttle
+)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncResponse:
+    """Buffered response exposing the attributes the sync code relies on"""
+
+    def __init__(self, status_code: int, headers: Any, body: bytes, url: str):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = body
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        """Raise requests' HTTPError for 4xx/5xx statuses"""
+        if self.status_code >= 400:
+            raise HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def create_session(headers: Optional[Dict[str, str]] = None, verify: bool = True) -> 'aiohttp.ClientSession':
+    """Create an aiohttp session; must be called from a running event loop"""
+    if aiohttp is None:
+        raise RuntimeError("The async clients require aiohttp (pip install aiohttp)")
+    connector = aiohttp.TCPConnector(limit=0, ssl=None if verify else False)
+    return aiohttp.ClientSession(headers=headers, connector=connector)
+
+
+async def async_request(policy: RetryPolicy, session: 'aiohttp.ClientSession', method: str, url: str,
+                        idempotent: bool = True, rate_limiter: Optional[RateLimiter] = None,
+                        rate_class: Optional[str] = None, endpoint: Optional[str] = None,
+                        probe: bool = False, **kwargs) -> AsyncResponse:
+    """
+    Send a request under a RetryPolicy from asyncio code
+
+    Args:
+        policy: Retry/timeout rules
+        session: aiohttp session
+        method: HTTP method
+        url: Full URL
+        idempotent: Whether resending after an ambiguous failure is safe
+        rate_limiter: Limiter consulted before every attempt
+        rate_class: Endpoint class of the request for the rate limiter
+        endpoint: Metrics label of the request (defaults to the URL path)
+        probe: Readiness probe (see RetryPolicy.request)
+        **kwargs: Passed to aiohttp.ClientSession.request
+
+    Returns:
+        AsyncResponse: The final response (status not checked)
+    """
+    timeout = aiohttp.ClientTimeout(total=kwargs.pop('timeout', policy.timeout))
+    breaker = circuit_breaker(url)
+    endpoint = endpoint or urlsplit(url).path
+
+    for attempt in range(policy.max_retries + 1):
+        if not probe and not breaker.allow():
+            metrics.inc("circuit_open_total", host=breaker.host)
+            raise CircuitOpenError(f"Circuit open for {breaker.host}, failing fast")
+        if rate_limiter:
+            metrics.record_wait(WAIT_RATE_LIMIT, await rate_limiter.acquire_async(rate_class))
+
+        started = time.monotonic()
+        try:
+            async with session.request(method, url, timeout=timeout, **kwargs) as raw:
+                body = await raw.read()
+                response = AsyncResponse(raw.status, raw.headers, body, url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            record_attempt(endpoint, method, type(e).__name__, time.monotonic() - started)
+            if not probe:
+                breaker.record_failure()
+            not_sent = isinstance(e, aiohttp.ClientConnectorError)
+            if attempt >= policy.max_retries or not (idempotent or not_sent):
+                if isinstance(e, asyncio.TimeoutError):
+                    raise Timeout(f"{method} {url} timed out") from e
+                raise RequestsConnectionError(f"{method} {url} failed: {str(e)}") from e
+            delay = policy.backoff(attempt)
+            log.warning(f"{method} {url} failed ({type(e).__name__}), "
+                        f"retrying in {delay:.1f}s ({policy.max_retries - attempt} left)")
+            record_retry(endpoint, type(e).__name__, delay)
+            await asyncio.sleep(delay)
+            continue
+        except asyncio.CancelledError:
+            # E.g. a device deadline: no outcome, so a half-open circuit lets the next trial through
+            if not probe:
+                breaker.release_trial()
+            raise
+        record_attempt(endpoint, method, response.status_code, time.monotonic() - started)
+        if rate_limiter:
+            throttle(rate_limiter, rate_class, response)
+
+        if not probe:
+            if response.status_code < 500:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+        delay = policy.retry_delay(response, attempt, idempotent)
+        if delay is None:
+            return response
+        log.warning(f"{method} {url} returned {response.status_code}, "
+                    f"retrying in {delay:.1f}s ({policy.max_retries - attempt} left)")
+        record_retry(endpoint, response.status_code, delay)
+        await asyncio.sleep(delay)
+
+    return response
@@ -0,0 +1,214 @@
+"""
+Credential Cache for Tokens and Management Sessions
+
+Keeps Smart-1 Cloud bearer tokens and idle web_api session ids (SIDs) per
+tenant so that short runs do not pay for a login every time. Entries carry
+their real expiry (the JWT "exp" claim or the session-timeout) and are
+persisted to a JSON file readable by the current user only.
+
+A management session holds unpublished changes, so a SID is checked out by
+one client at a time and only returned to the pool once that client is done.
+Without a cache file the pool ends with the process, so its sessions are
+logged out when the clients are closed. With one, every read-modify-write
+of the file happens under an exclusive lock on a sibling ".lock" file, so
+concurrent runs never check out the same SID or drop each other's entries.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .logger_main import log
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CREDENTIALS_FILE = "credentials.json"
+REFRESH_MARGIN = 300  # seconds before expiry at which a token is renewed
+MIN_REMAINING = 30  # seconds of validity a cached credential must still have
+
+
+def credential_key(kind: str, *parts: str) -> str:
+    """Cache key of a tenant credential; secrets only enter it hashed"""
+    digest = hashlib.sha256("\0".join(parts).encode()).hexdigest()[:16]
+    return f"{kind}:{digest}"
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """Read the "exp" claim of a JWT without verifying it (None if absent)"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+        return float(exp) if exp else None
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return None
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on a lock file, shared with other processes"""
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError as e:
+        log.warning(f"Unable to lock credential cache {path}: {str(e)}")
+        yield
+        return
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after 10 attempts
+                    continue
+        yield
+    finally:
+        if msvcrt:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)  # Closing the descriptor releases the flock
+
+
+class CredentialCache:
+    """Thread-safe token store and management session pool"""
+
+    _shared: Dict[Optional[str], 'CredentialCache'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        """
+        Initialize the cache
+
+        Args:
+            cache_file: Optional JSON file used to persist credentials between runs
+        """
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._tokens: Dict[str, Dict[str, Any]] = {}
+        self._sessions: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.RLock()
+        self._load()
+
+    @classmethod
+    def shared(cls, cache_dir: Optional[str] = None) -> 'CredentialCache':
+        """Return the process-wide cache of a directory (in memory when None)"""
+        with cls._shared_lock:
+            cache = cls._shared.get(cache_dir)
+            if cache is None:
+                cache = cls(Path(cache_dir) / CREDENTIALS_FILE if cache_dir else None)
+                cls._shared[cache_dir] = cache
+            return cache
+
+    def get_token(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return a cached token and its expiry while it is still usable"""
+        with self._locked():
+            entry = self._tokens.get(key)
+            if entry and entry['expires'] - time.time() > MIN_REMAINING:
+                log.debug("Credential cache hit: %s", key)
+                return entry['value'], entry['expires']
+            return None
+
+    def put_token(self, key: str, token: str, expires: float) -> None:
+        """Store a token until its expiry"""
+        with self._locked():
+            self._tokens[key] = {'value': token, 'expires': expires}
+            self._save()
+
+    @property
+    def persistent(self) -> bool:
+        """Whether pooled sessions outlive the process"""
+        return self.cache_file is not None
+
+    def checkout_session(self, key: str) -> Optional[Tuple[str, float]]:
+        """
+        Take an idle session out of the pool
+
+        Returns:
+            tuple: (sid, session timeout in seconds), or None when no
+                session with enough remaining validity is pooled
+        """
+        with self._locked():
+            now = time.time()
+            pooled = self._sessions.get(key, [])
+            pool = [entry for entry in pooled if entry['expires'] - now > MIN_REMAINING]
+            entry = pool.pop() if pool else None
+            if len(pool) != len(pooled):
+                self._sessions[key] = pool
+                self._save()
+            if entry:
+                log.debug("Reusing pooled management session: %s", key)
+                return entry['sid'], entry['timeout']
+            return None
+
+    def release_session(self, key: str, sid: str, timeout: float, last_used: float) -> None:
+        """Return an idle session to the pool; it expires timeout seconds after last use"""
+        with self._locked():
+            self._sessions.setdefault(key, []).append(
+                {'sid': sid, 'timeout': timeout, 'expires': last_used + timeout}
+            )
+            self._save()
+
+    def drain_sessions(self, key: str) -> List[str]:
+        """Take every pooled session out of the pool (to log them out)"""
+        with self._locked():
+            pool = self._sessions.pop(key, [])
+            if pool:
+                self._save()
+            return [entry['sid'] for entry in pool]
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Lock the cache against other threads and processes and load its latest state"""
+        with self._lock:
+            if not self.cache_file:
+                yield
+                return
+            with file_lock(self.cache_file.with_suffix('.lock')):
+                self._load()
+                yield
+
+    def _load(self) -> None:
+        """Re-read persisted credentials so concurrent runs see each other's changes"""
+        if not self.cache_file or not self.cache_file.exists():
+            return
+        try:
+            with self.cache_file.open('r') as f:
+                data = json.load(f)
+            now = time.time()
+            self._tokens = {
+                key: entry for key, entry in data.get('tokens', {}).items()
+                if entry.get('expires', 0) > now
+            }
+            self._sessions = {
+                key: [entry for entry in pool if entry.get('expires', 0) > now]
+                for key, pool in data.get('sessions', {}).items()
+            }
+        except (OSError, ValueError, AttributeError) as e:
+            log.warning(f"Ignoring unreadable credential cache {self.cache_file}: {str(e)}")
+
+    def _save(self) -> None:
+        """Persist credentials atomically with owner-only permissions"""
+        if not self.cache_file:
+            return
+        try:
+            self.cache_file.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'tokens': self._tokens, 'sessions': self._sessions}, f)
+            os.chmod(tmp_file, 0o600)  # O_CREAT ignores the mode for existing files
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            log.warning(f"Unable to persist credential cache {self.cache_file}: {str(e)}")
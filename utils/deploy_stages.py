@@ -0,0 +1,87 @@
+"""
+Deployment Stage Helpers
+
+Decides which stage each gateway resumes at and builds the results and
+CLISH commands shared by the threaded and the asyncio orchestrators.
+"""
+
+from typing import Callable, Dict, List, Optional
+from .logger_main import log
+from .load_config_file import GatewayConfig, PolicyPackage
+from .fleet import TaskResult
+from .inventory import Inventory, REGISTER, INSTALL, DEPLOY_STAGES
+from .journal import DeploymentJournal, GatewayProgress, NO_JOURNAL, COMPLETED
+
+# Phase tag of log records
+ONBOARDING_PHASE = "onboarding"
+INSTALL_PHASE = "install"
+PHYSICAL_PHASE = "physical"
+
+
+def has_physical_credentials(gateway: GatewayConfig) -> bool:
+    """Check whether the gateway can be configured over its local REST API"""
+    return all([gateway.gateway_ip, gateway.gateway_username, gateway.gateway_password])
+
+
+def needs_bootstrap(gateway: GatewayConfig, inventory: Optional[Inventory] = None) -> bool:
+    """Whether the appliance still has to be bootstrapped after its policy install"""
+    return has_physical_credentials(gateway) and not (inventory and inventory.sic_established(gateway.gw_name))
+
+
+def deploy_stage(gateway: GatewayConfig, policy_config: PolicyPackage,
+                 inventory: Optional[Inventory] = None,
+                 progress: Optional[Dict[str, GatewayProgress]] = None) -> str:
+    """
+    First stage the gateway still needs
+
+    The inventory tells what exists on the tenant, the replayed journal what
+    earlier runs completed; the furthest of both wins unless the gateway is
+    no longer registered. A journaled MaaS token is copied to the gateway.
+    """
+    physical = has_physical_credentials(gateway)
+    stage = REGISTER
+    if inventory is not None:
+        stage = inventory.stage(gateway, policy_config.policy_package, physical)
+
+    state = (progress or {}).get(gateway.gw_name)
+    if state is not None and (inventory is None or inventory.is_registered(gateway.gw_name)):
+        gateway.maas_token = gateway.maas_token or state.maas_token
+        stage = max(stage, state.stage(physical), key=DEPLOY_STAGES.index)
+    return stage
+
+
+def skipped_result(gateway: GatewayConfig) -> TaskResult:
+    """Result of a gateway whose stage was already completed by an earlier run"""
+    return TaskResult(name=gateway.gw_name, success=True, skipped=True, value=gateway, site=gateway.site)
+
+
+def current_policy_results(targets: List[str], outdated: List[str], policy_config: PolicyPackage,
+                           journal: DeploymentJournal = NO_JOURNAL,
+                           on_result: Optional[Callable[[TaskResult], None]] = None) -> Dict[str, TaskResult]:
+    """Journal and report the targets that are not outdated as skipped installs"""
+    outdated_names = set(outdated)
+    current = [name for name in targets if name not in outdated_names]
+    if current:
+        log.info(f"⏭️  {len(current)} of {len(targets)} gateways already run the current revision "
+                 f"of '{policy_config.policy_package}'")
+    results: Dict[str, TaskResult] = {}
+    for name in current:
+        journal.record(name, INSTALL, COMPLETED, skipped=True)
+        results[name] = TaskResult(name=name, success=True, skipped=True)
+        if on_result:
+            on_result(results[name])
+    return results
+
+
+def sparks_bootstrap_commands(gateway: GatewayConfig) -> List[str]:
+    """CLISH commands that connect a Sparks gateway to its Smart-1 Cloud management"""
+    return [
+        # "add interface-loopback ipv4-address 10.0.0.1 mask-length 32",
+        # "cplic put #your_license_string",
+        f"connect maas auth-token {gateway.maas_token}",
+        "set security-management mode centrally-managed",
+        f"set sic_init password {gateway.sic_key}",
+        f"fetch certificate mgmt-ipv4-address 100.64.0.52 gateway-name {gateway.gw_name}",
+        "connect security-management mgmt-addr 100.64.0.52 use-one-time-password true local-override-mgmt-addr true send-logs-to local-override-mgmt-addr",
+        "fw fetch 100.64.0.52"
+    ]
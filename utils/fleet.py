@@ -0,0 +1,280 @@
+"""
+Bounded Worker Pool for Per-Gateway Operations
+
+Runs independent gateway operations on a fixed-size thread pool and
+collects one result per gateway instead of aborting on the first error.
+The fleet executor adds per-site concurrency caps and per-device deadlines
+for work against physical appliances.
+"""
+
+import asyncio
+import contextvars
+import queue
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple, TypeVar
+from pydantic import BaseModel, ConfigDict
+from .logger_main import log, log_context
+from .wait import deadline
+
+T = TypeVar('T')
+
+END_OF_STREAM = object()  # Marks the end of a streamed work queue
+STREAM_POLL_INTERVAL = 0.5  # seconds
+
+
+class TaskResult(BaseModel):
+    """Outcome of a single per-gateway operation"""
+    name: str
+    success: bool
+    duration: float = 0.0
+    error: Optional[str] = None
+    value: Any = None
+    site: Optional[str] = None
+    skipped: bool = False  # Nothing to do, the work was already done by an earlier run
+
+    model_config = ConfigDict(frozen=False)
+
+
+def run_task(name: str, func: Callable[[T], Any], item: T, timeout: Optional[float] = None) -> TaskResult:
+    """Run one operation (under an optional deadline) and capture its outcome instead of raising"""
+    with log_context(gw_name=name), deadline(timeout):
+        started = time.monotonic()
+        try:
+            value = func(item)
+            return TaskResult(name=name, success=True,
+                              duration=time.monotonic() - started, value=value)
+        except Exception as e:
+            log.error(f"❌  Failed to process {name}: {str(e)}")
+            return TaskResult(name=name, success=False,
+                              duration=time.monotonic() - started, error=str(e))
+
+
+async def run_task_async(name: str, func: Callable[[T], Awaitable[Any]], item: T,
+                         timeout: Optional[float] = None, site: Optional[str] = None) -> TaskResult:
+    """Asyncio variant of run_task with an optional deadline"""
+    with log_context(gw_name=name):
+        started = time.monotonic()
+        try:
+            value = await asyncio.wait_for(func(item), timeout)
+            return TaskResult(name=name, success=True, site=site,
+                              duration=time.monotonic() - started, value=value)
+        except Exception as e:
+            # asyncio.TimeoutError is the builtin TimeoutError on Python 3.11+, so
+            # only the deadline of this call is reported as a timeout
+            if timeout is not None and isinstance(e, asyncio.TimeoutError) \
+                    and time.monotonic() - started >= timeout:
+                log.error(f"❌  {name} timed out after {timeout}s")
+                return TaskResult(name=name, success=False, site=site,
+                                  duration=time.monotonic() - started,
+                                  error=f"Timed out after {timeout}s")
+            log.error(f"❌  Failed to process {name}: {str(e)}")
+            return TaskResult(name=name, success=False, site=site,
+                              duration=time.monotonic() - started, error=str(e))
+
+
+class _Running:
+    """Bookkeeping of one submitted item"""
+
+    def __init__(self, index: int, name: str, site: Optional[str], timeout: Optional[float]):
+        self.index = index
+        self.name = name
+        self.site = site
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout if timeout else None
+        self.reported = False
+
+
+class FleetExecutor:
+    """Thread pool with a global cap, per-site caps and per-item deadlines"""
+
+    def __init__(self, max_workers: int = 1, site_limit: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        """
+        Initialize the executor
+
+        Args:
+            max_workers: Maximum number of items processed at the same time
+            site_limit: Maximum number of items of one site processed at the same time
+            timeout: Per-item deadline in seconds. An item that misses it is
+                reported as failed; its thread keeps its slot until it returns,
+                which it does at the next check_deadline() of its work
+        """
+        self.max_workers = max(1, max_workers)
+        self.site_limit = site_limit
+        self.timeout = timeout
+
+    def run(
+        self,
+        items: Iterable[T],
+        func: Callable[[T], Any],
+        name_of: Callable[[T], str],
+        site_of: Optional[Callable[[T], Optional[str]]] = None
+    ) -> List[TaskResult]:
+        """
+        Run func over items
+
+        Returns:
+            list: One TaskResult per item, in input order
+        """
+        source: queue.Queue = queue.Queue()
+        for item in items:
+            source.put(item)
+        source.put(END_OF_STREAM)
+        return self.run_stream(source, func, name_of, site_of)
+
+    def run_stream(
+        self,
+        source: queue.Queue,
+        func: Callable[[T], Any],
+        name_of: Callable[[T], str],
+        site_of: Optional[Callable[[T], Optional[str]]] = None,
+        on_result: Optional[Callable[[TaskResult], None]] = None
+    ) -> List[TaskResult]:
+        """
+        Run func over items read from a queue until END_OF_STREAM arrives
+
+        Items are dispatched as soon as they arrive, so upstream stages can
+        keep producing while this stage works.
+
+        Args:
+            source: Queue of work items, terminated by END_OF_STREAM
+            func: Operation to run for each item
+            name_of: Returns the display name of an item
+            site_of: Returns the site of an item (for per-site caps)
+            on_result: Called with every result as soon as it is known
+
+        Returns:
+            list: One TaskResult per item, in arrival order
+        """
+        queued: Dict[Optional[str], Deque[Tuple[int, T]]] = OrderedDict()
+        results: List[Optional[TaskResult]] = []
+        running: Dict[Future, _Running] = {}
+        site_running: Counter = Counter()
+        stream_open = True
+
+        def report(index: int, result: TaskResult) -> None:
+            results[index] = result
+            if on_result:
+                on_result(result)
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while stream_open or queued or any(not entry.reported for entry in running.values()):
+                # Pull new items; block briefly only when there is nothing else to do
+                while stream_open:
+                    try:
+                        idle = not queued and not running
+                        item = source.get(timeout=STREAM_POLL_INTERVAL) if idle else source.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is END_OF_STREAM:
+                        stream_open = False
+                        break
+                    site = site_of(item) if site_of else None
+                    queued.setdefault(site, deque()).append((len(results), item))
+                    results.append(None)
+
+                self._dispatch(pool, queued, running, site_running, func, name_of)
+                if not running:
+                    continue
+
+                timeout = self._next_timeout(running)
+                if stream_open:  # Keep picking up newly arrived items
+                    timeout = STREAM_POLL_INTERVAL if timeout is None else min(timeout, STREAM_POLL_INTERVAL)
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    entry = running.pop(future)
+                    site_running[entry.site] -= 1
+                    if not entry.reported:
+                        result = future.result()
+                        result.site = entry.site
+                        report(entry.index, result)
+                for index, result in self._expire(running):
+                    report(index, result)
+        finally:
+            pool.shutdown(wait=False)
+
+        return [result for result in results if result is not None]
+
+    def _dispatch(self, pool: ThreadPoolExecutor, queued: Dict, running: Dict[Future, _Running],
+                  site_running: Counter, func: Callable, name_of: Callable) -> None:
+        """Submit queued items round-robin across sites while capacity allows"""
+        progress = True
+        while progress and len(running) < self.max_workers:
+            progress = False
+            for site in list(queued):
+                if len(running) >= self.max_workers:
+                    break
+                if self.site_limit and site_running[site] >= self.site_limit:
+                    continue
+                index, item = queued[site].popleft()
+                if not queued[site]:
+                    del queued[site]
+                name = name_of(item)
+                # Workers log with the caller's context (e.g. the phase)
+                future = pool.submit(contextvars.copy_context().run, run_task, name, func, item, self.timeout)
+                running[future] = _Running(index, name, site, self.timeout)
+                site_running[site] += 1
+                progress = True
+
+    @staticmethod
+    def _next_timeout(running: Dict[Future, _Running]) -> Optional[float]:
+        """Seconds until the nearest unreported deadline"""
+        deadlines = [
+            entry.deadline for entry in running.values()
+            if entry.deadline and not entry.reported
+        ]
+        return max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+
+    def _expire(self, running: Dict[Future, _Running]) -> List[Tuple[int, TaskResult]]:
+        """Report items that missed their deadline as failed"""
+        expired = []
+        now = time.monotonic()
+        for entry in running.values():
+            if entry.reported or not entry.deadline or now < entry.deadline:
+                continue
+            entry.reported = True
+            log.error(f"❌  {entry.name} timed out after {self.timeout}s")
+            expired.append((entry.index, TaskResult(
+                name=entry.name, success=False, duration=now - entry.started,
+                error=f"Timed out after {self.timeout}s", site=entry.site
+            )))
+        return expired
+
+
+def run_parallel(
+    items: Iterable[T],
+    func: Callable[[T], Any],
+    name_of: Callable[[T], str],
+    workers: int = 1
+) -> List[TaskResult]:
+    """
+    Run func over items on a bounded thread pool
+
+    Args:
+        items: Work items (typically GatewayConfig objects)
+        func: Operation to run for each item
+        name_of: Returns the display name of an item
+        workers: Maximum number of items processed at the same time
+
+    Returns:
+        list: One TaskResult per item, in input order
+    """
+    return FleetExecutor(max_workers=workers).run(items, func, name_of)
+
+
+def log_summary(title: str, results: List[TaskResult]) -> None:
+    """Log a per-gateway result table"""
+    succeeded = sum(1 for result in results if result.success)
+    skipped = sum(1 for result in results if result.skipped)
+    log.info(f"📋  {title}: {succeeded}/{len(results)} succeeded"
+             f"{f' ({skipped} already done)' if skipped else ''}")
+    show_site = any(result.site for result in results)
+    for result in results:
+        if result.skipped:
+            continue
+        status = "OK" if result.success else f"FAILED ({result.error})"
+        site = f"{(result.site or '-'):<15} " if show_site else ""
+        log.info(f"    {result.name:<30} {site}{result.duration:8.1f}s  {status}")
@@ -0,0 +1,131 @@
+"""
+Fleet Status View
+
+Builds the state of every gateway of a tenant from the paged Smart-1 Cloud
+gateway list instead of one status request per gateway. Repeated sweeps
+(watch) report only what changed since the previous one; the detailed
+status is requested concurrently, and only for gateways whose status
+changed.
+"""
+
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict
+from .logger_main import log
+from .fleet import run_parallel
+
+if TYPE_CHECKING:
+    from .smart1_cloud_api import Smart1CloudAPI
+
+DEFAULT_WATCH_INTERVAL = 30  # seconds between sweeps
+DETAIL_WORKERS = 10  # Concurrent detail requests per sweep
+SUMMARY_FIELDS = ("name", "status", "statusDetails")  # Detail fields already shown by the listing
+
+
+class StatusChange(BaseModel):
+    """Status change of one gateway between two sweeps"""
+    name: str
+    previous: Optional[str] = None  # None: the gateway is new
+    current: Optional[str] = None  # None: the gateway was removed
+    details: Dict = {}  # Detailed status of a changed gateway
+
+    model_config = ConfigDict(frozen=False)
+
+    def describe(self) -> str:
+        """One output line: + new, - removed, ~ changed"""
+        if self.previous is None:
+            line = f"+ {self.name}: {self.current}"
+        elif self.current is None:
+            line = f"- {self.name} (was {self.previous})"
+        else:
+            line = f"~ {self.name}: {self.previous} -> {self.current}"
+        extra = {key: value for key, value in self.details.items() if key not in SUMMARY_FIELDS}
+        return f"{line} {extra}" if extra else line
+
+
+class FleetStatus:
+    """Gateway statuses of the last sweep, compared with each new sweep"""
+
+    def __init__(self, s1c_cloud: 'Smart1CloudAPI', workers: int = DETAIL_WORKERS):
+        self.s1c_cloud = s1c_cloud
+        self.workers = workers
+        self.states: Dict[str, str] = {}  # Gateway name -> status of the last sweep
+        self.sweeps = 0
+
+    @staticmethod
+    def status_of(gateway: Dict) -> str:
+        return str(gateway.get('statusDetails') or gateway.get('status') or 'unknown')
+
+    def sweep(self) -> List[StatusChange]:
+        """
+        Read the paged gateway list once
+
+        Returns:
+            list: Gateways that are new, changed or removed since the last
+            sweep (every gateway on the first sweep)
+        """
+        states: Dict[str, str] = {}
+        changes: List[StatusChange] = []
+        for gateway in self.s1c_cloud.iter_gateways():
+            name = gateway.get('name')
+            if not name:
+                continue
+            states[name] = self.status_of(gateway)
+            if self.states.get(name) != states[name]:
+                changes.append(StatusChange(name=name, previous=self.states.get(name), current=states[name]))
+        changes += [
+            StatusChange(name=name, previous=status)
+            for name, status in self.states.items() if name not in states
+        ]
+
+        if self.sweeps:
+            self._add_details([change for change in changes if change.current is not None])
+        self.states = states
+        self.sweeps += 1
+        return changes
+
+    def _add_details(self, changes: List[StatusChange]) -> None:
+        """Request the detailed status of changed gateways concurrently"""
+        if not changes:
+            return
+        results = run_parallel(
+            changes,
+            lambda change: self.s1c_cloud.get_gateway_status(change.name),
+            name_of=lambda change: change.name,
+            workers=self.workers
+        )
+        for change, result in zip(changes, results):
+            change.details = (result.value or {}) if result.success else {"error": result.error}
+
+    def describe(self) -> str:
+        """Gateway count per status"""
+        counts = Counter(self.states.values())
+        statuses = ", ".join(f"{count} {status}" for status, count in counts.most_common())
+        return f"{len(self.states)} gateways{f': {statuses}' if statuses else ''}"
+
+    def watch(self, interval: float = DEFAULT_WATCH_INTERVAL, output: Callable[[str], None] = print,
+              sweeps: Optional[int] = None) -> None:
+        """
+        Sweep repeatedly and output only the changes
+
+        The first sweep prints the status summary; later sweeps print one
+        line per changed gateway. Runs until interrupted or until `sweeps`
+        sweeps were done.
+        """
+        try:
+            while sweeps is None or self.sweeps < sweeps:
+                started = time.monotonic()
+                changes = self.sweep()
+                stamp = time.strftime("%H:%M:%S")
+                if self.sweeps == 1:
+                    output(f"[{stamp}] {self.describe()}")
+                else:
+                    for change in changes:
+                        output(f"[{stamp}] {change.describe()}")
+                    if changes:
+                        output(f"[{stamp}] {self.describe()}")
+                if sweeps is None or self.sweeps < sweeps:
+                    time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            log.info("Stopped watching the fleet status")
@@ -0,0 +1,196 @@
+"""
+Streaming Gateway Inventory Loader
+
+Reads gateway configurations from a JSON array, JSON-lines or CSV file one
+row at a time and yields validated GatewayConfig objects as they are read,
+so a deployment can start on the first gateways of a very large inventory.
+Invalid rows are written to a reject file instead of aborting the run.
+"""
+
+import csv
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+from pydantic import ValidationError
+from .logger_main import log
+from .load_config_file import GatewayConfig
+
+READ_CHUNK_SIZE = 64 * 1024  # bytes read at a time from JSON array files
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+CSV_SUFFIXES = (".csv",)
+
+
+class RejectFile:
+    """JSON-lines file collecting invalid inventory rows (disabled when no file is given)"""
+
+    def __init__(self, reject_file: Optional[str] = None):
+        self.reject_file = Path(reject_file) if reject_file else None
+        self.count = 0
+        self._handle = None
+
+    def write(self, source: str, row: int, error: str, data: Any) -> None:
+        """Record one rejected row with the reason"""
+        self.count += 1
+        log.warning(f"Rejected row {row} of {source}: {error}")
+        if not self.reject_file:
+            return
+        if self._handle is None:
+            self.reject_file.parent.mkdir(parents=True, exist_ok=True)
+            # Rows carry SIC keys and passwords
+            fd = os.open(self.reject_file, os.O_WRONLY | os.O_TRUNC | os.O_CREAT, 0o600)
+            self._handle = os.fdopen(fd, 'w')
+        self._handle.write(json.dumps({"source": source, "row": row, "error": error, "data": data}) + "\n")
+        self._handle.flush()
+
+    def close(self) -> None:
+        """Close the reject file"""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def iter_gateway_configs(file_name: str, reject_file: Optional[str] = None) -> Iterator[GatewayConfig]:
+    """
+    Yield validated gateway configurations while the file is being read
+
+    Args:
+        file_name: JSON array (.json), JSON-lines (.jsonl/.ndjson) or CSV (.csv) inventory
+        reject_file: Optional JSON-lines file receiving rows that fail validation
+
+    Raises:
+        FileNotFoundError: The inventory does not exist
+        ValueError: The file itself is malformed (e.g. a JSON array cut short)
+    """
+    config_path = Path(file_name)
+    if not config_path.exists():
+        raise FileNotFoundError(f"Config file {file_name} not found")
+
+    suffix = config_path.suffix.lower()
+    if suffix in JSONL_SUFFIXES:
+        rows = _iter_jsonl_rows(config_path)
+    elif suffix in CSV_SUFFIXES:
+        rows = _iter_csv_rows(config_path)
+    else:
+        rows = _iter_json_array_rows(config_path)
+
+    rejects = RejectFile(reject_file)
+    seen = set()
+    accepted = 0
+    try:
+        for row, data in rows:
+            if isinstance(data, ValueError):
+                rejects.write(file_name, row, str(data), None)
+                continue
+            try:
+                gateway = GatewayConfig(**data)
+            except (ValidationError, TypeError) as e:
+                rejects.write(file_name, row, _describe_error(e), data)
+                continue
+            if gateway.gw_name in seen:
+                rejects.write(file_name, row, f"Duplicate gateway name {gateway.gw_name}", data)
+                continue
+            seen.add(gateway.gw_name)
+            accepted += 1
+            yield gateway
+    finally:
+        rejects.close()
+        log.info(f"📄  Read {accepted} gateways from {file_name}"
+                 f"{f', rejected {rejects.count} rows' if rejects.count else ''}"
+                 f"{f' (see {rejects.reject_file})' if rejects.count and rejects.reject_file else ''}")
+
+
+def _describe_error(error: Exception) -> str:
+    """One line summary of a validation error"""
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+        )
+    return str(error)
+
+
+def _iter_jsonl_rows(config_path: Path) -> Iterator[Tuple[int, Any]]:
+    """One object per line; an unreadable line becomes a ValueError row"""
+    with config_path.open('r', encoding='utf-8') as f:
+        for row, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield row, json.loads(line)
+            except ValueError as e:
+                yield row, ValueError(f"Invalid JSON: {str(e)}")
+
+
+def _iter_csv_rows(config_path: Path) -> Iterator[Tuple[int, Dict[str, Optional[str]]]]:
+    """One gateway per CSV record; the header names the fields and empty cells are unset"""
+    with config_path.open('r', encoding='utf-8', newline='') as f:
+        for row, record in enumerate(csv.DictReader(f), 1):
+            yield row, {key.strip(): (value.strip() or None) if isinstance(value, str) else value
+                        for key, value in record.items() if key}
+
+
+def _iter_json_array_rows(config_path: Path) -> Iterator[Tuple[int, Any]]:
+    """Decode the elements of a top-level JSON array one at a time"""
+    decoder = json.JSONDecoder()
+    with config_path.open('r', encoding='utf-8') as f:
+        buffer = ""
+        position = 0
+        end_of_file = False
+
+        def fill() -> bool:
+            """Read the next chunk; False at the end of the file"""
+            nonlocal buffer, position, end_of_file
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                end_of_file = True
+                return False
+            buffer = buffer[position:] + chunk
+            position = 0
+            return True
+
+        def skip_whitespace() -> str:
+            """Next significant character (empty string at the end of the file)"""
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if position < len(buffer):
+                    return buffer[position]
+                if not fill():
+                    return ""
+
+        if skip_whitespace() != "[":
+            raise ValueError(f"Invalid JSON in {config_path}: expected a list of gateways")
+        position += 1
+
+        row = 0
+        expect_value = True
+        while True:
+            char = skip_whitespace()
+            if char == "]":
+                return
+            if char == "":
+                raise ValueError(f"Invalid JSON in {config_path}: unterminated list")
+            if char == ",":
+                if expect_value:
+                    raise ValueError(f"Invalid JSON in {config_path}: unexpected ','")
+                position += 1
+                expect_value = True
+                continue
+            if not expect_value:
+                raise ValueError(f"Invalid JSON in {config_path}: missing ',' after row {row}")
+
+            # Decode the next element, reading more of the file until it is complete
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                    if end == len(buffer) and not end_of_file and fill():
+                        continue  # A bare number may go on in the next chunk
+                    position = end
+                    break
+                except ValueError as e:
+                    if end_of_file or not fill():
+                        raise ValueError(f"Invalid JSON in {config_path}") from e
+            row += 1
+            expect_value = False
+            yield row, value
@@ -0,0 +1,143 @@
+"""
+Tenant Inventory Snapshot
+
+Reads the Smart-1 Cloud gateway list and the matching management objects
+once at startup and indexes them by name and status, so a re-run only
+touches the gateways that still have work left.
+"""
+
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from .logger_main import log
+from .load_config_file import GatewayConfig
+from .smart1_cloud_api import Smart1CloudAPI
+from .smart1_cloud_mgmt_api import ManagementAPI, DEFAULT_POLICY_TYPE, policy_current, sic_communicating
+
+# Deployment stages, in order; a gateway resumes at the first unfinished one
+REGISTER = "register"
+CONFIGURE = "configure"
+INSTALL = "install"
+PHYSICAL = "physical"
+DONE = "done"
+DEPLOY_STAGES = (REGISTER, CONFIGURE, INSTALL, PHYSICAL, DONE)
+
+
+class Inventory:
+    """Snapshot of a tenant's gateways, indexed by name and cloud status"""
+
+    def __init__(self, cloud_gateways: Iterable[Dict], gateway_objects: Optional[Dict[str, Dict]] = None,
+                 policy_revision: Optional[float] = None, policy_type: str = DEFAULT_POLICY_TYPE):
+        """
+        Build the indexes
+
+        Args:
+            cloud_gateways: Smart-1 Cloud gateways (list_gateways or iter_gateways)
+            gateway_objects: Management gateway objects by name (show_gateways)
+            policy_revision: Current revision of the policy package (None: unknown,
+                every gateway needs an install)
+            policy_type: Layers the deployment installs
+        """
+        self.by_name: Dict[str, Dict] = {gw['name']: gw for gw in cloud_gateways if gw.get('name')}
+        self.by_status: Dict[str, List[str]] = defaultdict(list)
+        for name, gw in self.by_name.items():
+            self.by_status[str(gw.get('status') or gw.get('statusDetails') or 'unknown').lower()].append(name)
+        self.objects: Dict[str, Dict] = gateway_objects or {}
+        self.policy_revision = policy_revision
+        self.policy_type = policy_type
+
+    @classmethod
+    def fetch(cls, s1c_cloud: Smart1CloudAPI, mgmt_api: ManagementAPI,
+              names: Optional[Set[str]] = None, policy_package: Optional[str] = None,
+              policy_type: str = DEFAULT_POLICY_TYPE) -> 'Inventory':
+        """
+        Take a snapshot with one paged cloud listing and one paged management query
+
+        Args:
+            s1c_cloud: Smart-1 Cloud client
+            mgmt_api: Management client
+            names: Only keep these gateways (None: every gateway of the tenant).
+                A single name is also filtered on the server
+            policy_package: Policy package the deployment installs; its current
+                revision decides which gateways need an install
+            policy_type: Layers the deployment installs
+        """
+        try:
+            name_filter = next(iter(names)) if names and len(names) == 1 else None
+            cloud_gateways = (
+                gateway for gateway in s1c_cloud.iter_gateways(name=name_filter)
+                if names is None or gateway.get('name') in names
+            )
+            inventory = cls(cloud_gateways, policy_type=policy_type)
+            inventory.objects = mgmt_api.show_gateways(set(inventory.by_name))
+            if policy_package and inventory.objects:
+                try:
+                    inventory.policy_revision = mgmt_api.policy_revision(policy_package, policy_type)
+                except Exception as e:
+                    log.warning(f"Unable to read the revision of '{policy_package}', "
+                                f"checking the policy of every gateway again: {str(e)}")
+            statuses = ", ".join(f"{len(gateways)} {status}" for status, gateways in inventory.by_status.items())
+            log.info(f"📦  Inventory: {len(inventory.by_name)} gateways registered"
+                     f"{f' ({statuses})' if statuses else ''}, {len(inventory.objects)} management objects")
+            return inventory
+
+        except Exception as e:
+            log.error(f"Failed to read the tenant inventory: {str(e)}")
+            raise
+
+    def merge(self, other: 'Inventory') -> None:
+        """Add the gateways of a snapshot taken for other names (pipeline batches)"""
+        self.by_name.update(other.by_name)
+        for status, names in other.by_status.items():
+            self.by_status[status].extend(names)
+        self.objects.update(other.objects)
+        if other.policy_revision is not None:
+            self.policy_revision = other.policy_revision
+
+    def is_registered(self, gw_name: str) -> bool:
+        """Whether the gateway already exists in Smart-1 Cloud"""
+        return gw_name in self.by_name
+
+    def maas_token(self, gw_name: str) -> Optional[str]:
+        """Registration token of an existing gateway, when the listing exposes it"""
+        return self.by_name.get(gw_name, {}).get('token')
+
+    def is_configured(self, gateway: GatewayConfig) -> bool:
+        """Whether the management object carries the configured settings"""
+        gateway_object = self.objects.get(gateway.gw_name)
+        return bool(gateway_object) and gateway_object.get('version') == gateway.version
+
+    def policy_installed(self, gw_name: str, policy_package: str) -> bool:
+        """Whether the gateway runs the current revision of the package's layers of the policy type"""
+        if self.policy_revision is None:
+            return False
+        return policy_current(self.objects.get(gw_name), policy_package,
+                              self.policy_revision, self.policy_type)
+
+    def sic_established(self, gw_name: str) -> bool:
+        """Whether the management server communicates with the gateway"""
+        return sic_communicating(self.objects.get(gw_name, {}))
+
+    def stage(self, gateway: GatewayConfig, policy_package: str, physical: bool) -> str:
+        """
+        First deployment stage the gateway still has to go through
+
+        Args:
+            gateway: Gateway configuration
+            policy_package: Policy package the deployment installs
+            physical: Whether the gateway is bootstrapped over its local API
+        """
+        if not self.is_registered(gateway.gw_name):
+            return REGISTER
+        if not self.is_configured(gateway):
+            return CONFIGURE
+        if not self.policy_installed(gateway.gw_name, policy_package):
+            return INSTALL
+        if physical and not self.sic_established(gateway.gw_name):
+            return PHYSICAL
+        return DONE
+
+    @staticmethod
+    def describe(stages: Iterable[str]) -> str:
+        """One line summary of how many gateways resume at each stage"""
+        counts = Counter(stages)
+        return ", ".join(f"{counts[stage]} {stage}" for stage in DEPLOY_STAGES if counts[stage])
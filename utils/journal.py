@@ -0,0 +1,153 @@
+"""
+Deployment Journal
+
+Append-only JSON-lines record of every deployment step per gateway
+(registration with its MaaS token, object configuration, policy install
+task-ids, appliance bootstrap). Replaying the journal tells a resumed run
+which steps already completed, so it continues where the last run stopped.
+
+The journal contains MaaS tokens and is only readable by the current user.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from pydantic import BaseModel, ConfigDict
+from .logger_main import log, log_context
+from .tracing import tracer
+from .inventory import REGISTER, CONFIGURE, INSTALL, PHYSICAL, DONE
+
+DEFAULT_JOURNAL_FILE = ".cache/deployment_journal.jsonl"
+
+STARTED = "started"
+COMPLETED = "done"
+FAILED = "failed"
+
+
+class GatewayProgress(BaseModel):
+    """State of one gateway rebuilt from the journal"""
+    name: str
+    completed: List[str] = []  # Steps that finished
+    maas_token: Optional[str] = None
+    install_task: Optional[str] = None  # Install started but not confirmed
+
+    model_config = ConfigDict(frozen=False)
+
+    def stage(self, physical: bool) -> str:
+        """First step that has not completed yet"""
+        for step in (REGISTER, CONFIGURE, INSTALL):
+            if step not in self.completed:
+                return step
+        if physical and PHYSICAL not in self.completed:
+            return PHYSICAL
+        return DONE
+
+
+class DeploymentJournal:
+    """Thread-safe append-only journal (disabled when no file is given)"""
+
+    def __init__(self, journal_file: Optional[str] = None):
+        self.journal_file = Path(journal_file) if journal_file else None
+        self._lock = threading.Lock()
+        self._handle = None
+
+    def record(self, gw_name: str, step: str, status: str = COMPLETED, **details: Any) -> None:
+        """
+        Append one entry
+
+        Args:
+            gw_name: Gateway the step belongs to
+            step: Deployment stage (register, configure, install, physical)
+            status: started, done or failed
+            **details: Step data such as maas_token, task_id or error
+        """
+        if not self.journal_file:
+            return
+        entry = {"ts": time.time(), "gw": gw_name, "step": step, "status": status, **details}
+        with self._lock:
+            try:
+                self._open().write(json.dumps(entry) + "\n")
+                self._handle.flush()  # Survive a killed process
+            except OSError as e:
+                log.warning(f"Unable to write deployment journal {self.journal_file}: {str(e)}")
+
+    def record_many(self, gw_names: List[str], step: str, status: str = COMPLETED, **details: Any) -> None:
+        """Append the same entry for several gateways (e.g. one install task)"""
+        for gw_name in gw_names:
+            self.record(gw_name, step, status, **details)
+
+    @contextmanager
+    def step(self, gw_name: str, step: str, **details: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Journal a step as started, then done or failed
+
+        Yields a dict; data added to it (e.g. a token) is stored with the
+        completed entry.
+        """
+        self.record(gw_name, step, STARTED, **details)
+        result: Dict[str, Any] = dict(details)
+        try:
+            with log_context(gw_name=gw_name, step=step), tracer.span(step, category="step"):
+                yield result
+        except Exception as e:
+            self.record(gw_name, step, FAILED, error=str(e), **details)
+            raise
+        self.record(gw_name, step, COMPLETED, **result)
+
+    def replay(self) -> Dict[str, GatewayProgress]:
+        """Rebuild per-gateway progress from every journaled run"""
+        progress: Dict[str, GatewayProgress] = {}
+        if not self.journal_file or not self.journal_file.exists():
+            return progress
+
+        with self.journal_file.open('r') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    log.warning(f"Skipping unreadable journal line {line_number} of {self.journal_file}")
+                    continue
+                state = progress.setdefault(entry['gw'], GatewayProgress(name=entry['gw']))
+                self._apply(state, entry)
+
+        log.info(f"📒  Replayed journal {self.journal_file}: {len(progress)} gateways")
+        return progress
+
+    @staticmethod
+    def _apply(state: GatewayProgress, entry: Dict[str, Any]) -> None:
+        """Fold one journal entry into a gateway's progress"""
+        step, status = entry.get('step'), entry.get('status')
+        if entry.get('maas_token'):
+            state.maas_token = entry['maas_token']
+
+        if step == REGISTER and status == STARTED:
+            # A new registration replaces the gateway and its earlier progress
+            state.completed = []
+            state.install_task = None
+        if step == INSTALL and entry.get('task_id'):
+            state.install_task = entry['task_id'] if status == STARTED else None
+        if status == COMPLETED and step not in state.completed:
+            state.completed.append(step)
+
+    def _open(self):
+        """Open the journal for appending with owner-only permissions"""
+        if self._handle is None:
+            self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            os.chmod(self.journal_file, 0o600)
+            self._handle = os.fdopen(fd, 'a')
+        return self._handle
+
+    def close(self) -> None:
+        """Close the journal file"""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+
+NO_JOURNAL = DeploymentJournal()  # Default for callers that do not journal
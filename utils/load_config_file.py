@@ -1,7 +1,7 @@
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, ValidationError, ConfigDict
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from pydantic import BaseModel, ValidationError, ConfigDict, Field
 
 class AuthConfig(BaseModel):
     client_id: str
@@ -10,6 +10,7 @@ class AuthConfig(BaseModel):
     instance: str
     context: str
     api_key: str
+    mgmt_url: Optional[str] = None  # web_api base URL override (e.g. a local simulator)
 
 class GatewayConfig(BaseModel):
     gw_name: str
@@ -21,6 +22,7 @@ class GatewayConfig(BaseModel):
     gateway_username: Optional[str] = None
     gateway_password: Optional[str] = None
     maas_token: Optional[str] = None
+    site: Optional[str] = None  # Branch/site grouping used for per-site concurrency caps
     
     # v2 configuration syntax
     model_config = ConfigDict(frozen=False)
@@ -30,6 +32,41 @@ class PolicyPackage(BaseModel):
     install_delay: int = 30  # Default 30 seconds if not specified
     model_config = ConfigDict(frozen=False)
 
+class DeployOptions(BaseModel):
+    """Runtime options for the deployment orchestrator"""
+    workers: int = Field(default=1, ge=1)  # Gateways processed concurrently
+    publish_batch: Optional[int] = Field(default=None, ge=1)  # Gateways per publish in batched mode
+    bulk: bool = False  # Stage gateway objects through the management batch endpoints
+    pipeline: bool = False  # Stream gateways through the stages without phase barriers
+    use_async: bool = False  # Run the deployment on asyncio clients (requires aiohttp)
+    wave_size: int = Field(default=50, ge=1)  # Gateways per policy install wave (pipeline mode)
+    wave_window: float = Field(default=60, ge=0)  # Seconds a wave waits to fill up (pipeline mode)
+    install_shard_size: Optional[int] = Field(default=None, ge=1)  # Gateways per install-policy task
+    install_parallel: int = Field(default=2, ge=1)  # Install-policy tasks running at the same time
+    install_retries: int = Field(default=1, ge=0)  # Repeated attempts for targets whose install failed
+    policy_type: Literal["all", "access", "threat-prevention"] = "all"  # Policy layers installed
+    physical_workers: int = Field(default=1, ge=1)  # Physical gateways configured concurrently
+    site_limit: Optional[int] = Field(default=None, ge=1)  # Concurrent physical gateways per site
+    device_timeout: Optional[int] = Field(default=None, gt=0)  # Per-device deadline in seconds
+    clish_script: bool = False  # Send Sparks CLISH commands as multi-line scripts
+    cache_dir: Optional[str] = None  # Persist tenant lookups between runs
+    show_progress: Optional[bool] = None  # None: progress bars only on a terminal
+    rate_limits: Dict[str, Tuple[float, float]] = {}  # Endpoint class -> (requests/s, burst); empty = unlimited
+    ready_timeout: int = Field(default=300, gt=0)  # Deadline for readiness polling in seconds
+    task_timeout: int = Field(default=3600, gt=0)  # Seconds a management task may run before it fails
+    settle_time: Optional[float] = Field(default=None, ge=0)  # Minimum wait after slow Sparks commands (None: per command)
+    force: bool = False  # Redo every stage instead of resuming from the tenant inventory
+    journal: Optional[str] = None  # JSON-lines file recording every deployment step
+    resume: bool = False  # Continue from the steps completed according to the journal
+    auth_file: str = "./config/auth_data.json"  # Smart-1 Cloud and management credentials
+    policy_file: str = "./config/policy_package_data.json"  # Policy package to install
+    gateways_file: str = "./config/config_data.json"  # Gateway inventory (JSON array, JSON-lines or CSV)
+    reject_file: Optional[str] = None  # JSON-lines file receiving invalid inventory rows
+    metrics_file: Optional[str] = None  # Prometheus textfile written at the end of the run
+    metrics_json: Optional[str] = None  # JSON metrics summary written at the end of the run
+    trace_file: Optional[str] = None  # Chrome trace_event timeline of the run (None: no tracing)
+    model_config = ConfigDict(frozen=False)
+
     
 def read_config_file(file_name: str) -> Any:
     """
@@ -57,6 +94,16 @@ def read_config_file(file_name: str) -> Any:
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in {file_name}") from e
 
+def read_auth_config(file_name: str) -> AuthConfig:
+    """Read and validate auth data from a file of any name"""
+    config = read_config_file(file_name)
+    return config if isinstance(config, AuthConfig) else validate_auth_config(config)
+
+def read_policy_package_config(file_name: str) -> PolicyPackage:
+    """Read and validate the policy package from a file of any name"""
+    config = read_config_file(file_name)
+    return config if isinstance(config, PolicyPackage) else validate_policy_package_config(config)
+
 def validate_auth_config(config: Dict) -> AuthConfig:
     """Validation wrapper for auth data"""
     try:
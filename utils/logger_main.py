@@ -1,42 +1,175 @@
+"""
+Logging Setup
+
+Every record goes through a queue to a listener thread that owns the
+rotating file, the console and the optional JSON-lines file, so worker
+threads never wait on disk or terminal I/O. Records carry the gateway,
+phase and step they were logged for (see log_context).
+"""
+
+import atexit
+import json
 import logging
+import queue
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Iterator, Optional
+
+LOG_DIR = Path("logs")
+LOG_FILE = "s1c_deploy_sparks_gw.log"
+JSON_LOG_FILE = "s1c_deploy_sparks_gw.jsonl"
+LOG_MAX_BYTES = 5 * 1024 * 1024  # 5MB
+LOG_BACKUPS = 3
+CONTEXT_FIELDS = ("gw_name", "phase", "step")
+
+_log_context: ContextVar[Dict[str, str]] = ContextVar("log_context", default={})
+_listener: Optional[QueueListener] = None
+
+
+@contextmanager
+def log_context(**fields: Optional[str]) -> Iterator[None]:
+    """Attach context fields (gw_name, phase, step) to every record logged inside the block"""
+    token = _log_context.set({
+        **_log_context.get(), **{key: value for key, value in fields.items() if value is not None}
+    })
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def current_log_context() -> Dict[str, str]:
+    """Context fields of the running thread or asyncio task"""
+    return _log_context.get()
+
+
+class LazyJSON:
+    """Log argument that is only serialised when the record is written"""
+
+    def __init__(self, data: Any, indent: Optional[int] = 2):
+        self.data = data
+        self.indent = indent
+
+    def __str__(self) -> str:
+        return json.dumps(self.data, indent=self.indent, default=str)
+
+
+class _ContextQueueHandler(QueueHandler):
+    """Enqueue records with their context; formatting happens on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        context = _log_context.get()
+        for field in CONTEXT_FIELDS:
+            setattr(record, field, context.get(field))
+        return record
 
-def configure_logging() -> logging.Logger:
-    """Configure logging system with file rotation and console output"""
-    log_dir = Path("logs")
-    log_file = log_dir / "s1c_deploy_sparks_gw.log"
-    
+    def handle(self, record: logging.LogRecord) -> bool:
+        # The queue is thread-safe, so skip the per-handler lock all workers would contend for
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return bool(rv)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record with the context fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                  + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging(level: int = logging.DEBUG, json_logs: bool = False) -> logging.Logger:
+    """
+    Configure logging system with file rotation and console output
+
+    Can be called again (e.g. from the command line options) to change the
+    file level or enable JSON-lines output.
+
+    Args:
+        level: Level of the log files (the console always shows INFO)
+        json_logs: Also write JSON-lines records to logs/s1c_deploy_sparks_gw.jsonl
+    """
+    global _listener
     try:
-        log_dir.mkdir(parents=True, exist_ok=True)
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
     except PermissionError as e:
         raise RuntimeError(f"Unable to create logs directory: {str(e)}")
 
-    logger = logging.getLogger("Smart1CloudDeployer")
-    logger.setLevel(logging.DEBUG)
-
     # File handler with rotation
     file_handler = RotatingFileHandler(
-        log_file,
-        maxBytes=5*1024*1024,  # 5MB
-        backupCount=3,
+        LOG_DIR / LOG_FILE,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUPS,
         encoding='utf-8'
     )
     file_formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     file_handler.setFormatter(file_formatter)
-    file_handler.setLevel(logging.DEBUG)
+    file_handler.setLevel(level)
 
     # Console handler
     console_handler = logging.StreamHandler()
     console_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
     console_handler.setFormatter(console_formatter)
     console_handler.setLevel(logging.INFO)
+    handlers = [file_handler, console_handler]
+
+    if json_logs:
+        json_handler = RotatingFileHandler(
+            LOG_DIR / JSON_LOG_FILE,
+            maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUPS,
+            encoding='utf-8'
+        )
+        json_handler.setFormatter(JsonFormatter())
+        json_handler.setLevel(level)
+        handlers.append(json_handler)
 
-    # Add handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+
+    logger = logging.getLogger("Smart1CloudDeployer")
+    # Disabled levels are dropped before their message or arguments are formatted
+    logger.setLevel(min(handler.level for handler in handlers))
+    previous_handlers = list(logger.handlers)
+    logger.addHandler(_ContextQueueHandler(records))
+    for handler in previous_handlers:
+        logger.removeHandler(handler)
 
+    # The previous listener drains what was queued before the switch
+    _stop_listener()
+    _listener = listener
     return logger
 
-log = configure_logging()
\ No newline at end of file
+
+def _stop_listener() -> None:
+    """Flush queued records and close the log files"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(_stop_listener)
+
+log = configure_logging()
@@ -0,0 +1,121 @@
+"""
+Lookup Cache for Tenant-Static Data
+
+Keeps values that do not change for a tenant (for example the management
+server SIC name) for a limited time, optionally persisted to a JSON file so
+repeated runs can skip the lookup entirely.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from .logger_main import log
+
+DEFAULT_CACHE_TTL = 24 * 3600  # seconds
+
+
+class LookupCache:
+    """Thread-safe key/value cache with per-entry expiry"""
+
+    _shared: Dict[str, 'LookupCache'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL, cache_file: Optional[Path] = None):
+        """
+        Initialize the cache
+
+        Args:
+            ttl: Lifetime of an entry in seconds
+            cache_file: Optional JSON file used to persist entries between runs
+        """
+        self.ttl = ttl
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._load()
+
+    @classmethod
+    def shared(cls, namespace: str, ttl: float = DEFAULT_CACHE_TTL,
+               cache_dir: Optional[str] = None) -> 'LookupCache':
+        """Return the process-wide cache of a namespace (e.g. one per tenant)"""
+        with cls._shared_lock:
+            cache = cls._shared.get(namespace)
+            if cache is None:
+                cache_file = Path(cache_dir) / f"lookups_{namespace}.json" if cache_dir else None
+                cache = cls(ttl=ttl, cache_file=cache_file)
+                cls._shared[namespace] = cache
+            return cache
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return a cached value, calling the loader on a miss or after expiry
+
+        Args:
+            key: Cache key
+            loader: Produces the value; must return JSON-serialisable data
+                when the cache is persisted
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['expires'] > time.time():
+                log.debug("Lookup cache hit: %s", key)
+                return entry['value']
+
+            log.debug("Lookup cache miss: %s", key)
+            value = loader()
+            self.put(key, value)
+            return value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Return a cached value without loading it (None on a miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['expires'] > time.time():
+                return entry['value']
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a value (used by callers that load it asynchronously)"""
+        with self._lock:
+            self._entries[key] = {'value': value, 'expires': time.time() + self.ttl}
+            self._save()
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one entry, or every entry when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._save()
+
+    def _load(self) -> None:
+        """Read persisted entries, ignoring expired ones and unreadable files"""
+        if not self.cache_file or not self.cache_file.exists():
+            return
+        try:
+            with self.cache_file.open('r') as f:
+                entries = json.load(f)
+            now = time.time()
+            self._entries = {
+                key: entry for key, entry in entries.items()
+                if entry.get('expires', 0) > now
+            }
+        except (OSError, ValueError, AttributeError) as e:
+            log.warning(f"Ignoring unreadable lookup cache {self.cache_file}: {str(e)}")
+
+    def _save(self) -> None:
+        """Persist entries atomically when a cache file is configured"""
+        if not self.cache_file:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            with tmp_file.open('w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            log.warning(f"Unable to persist lookup cache {self.cache_file}: {str(e)}")
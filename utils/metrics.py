@@ -0,0 +1,240 @@
+"""
+Deployment Metrics
+
+Counters and latency histograms shared by every client in the process,
+labelled by endpoint, status and outcome. Network time is recorded per
+HTTP attempt; deliberate waiting (retry backoff, rate limiting, readiness
+and task polling) goes to a separate wait_seconds histogram so a rollout's
+waiting can be told apart from its API time.
+
+Exported at the end of a run as a Prometheus textfile (node_exporter
+textfile collector format) and/or a JSON summary.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from .logger_main import log
+from .tracing import tracer
+
+METRIC_PREFIX = "s1c_deploy_"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# Kinds of deliberate waiting recorded in wait_seconds
+WAIT_RETRY = "retry_backoff"
+WAIT_RATE_LIMIT = "rate_limit"
+WAIT_READINESS = "readiness_poll"
+WAIT_TASK_POLL = "task_poll"
+
+# Metric names and their HELP text
+METRIC_HELP = {
+    "http_request_seconds": "Network time of one HTTP attempt",
+    "http_retries_total": "HTTP attempts that were retried",
+    "circuit_open_total": "Requests rejected by an open circuit breaker",
+    "api_call_seconds": "API call latency including retries and re-logins",
+    "task_seconds": "Management task duration from submission to completion",
+    "clish_seconds": "Sparks CLISH command or script execution time",
+    "phase_seconds": "Deployment phase duration",
+    "wait_seconds": "Time spent deliberately waiting",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Count one observation in its bucket"""
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        """Bucket upper bound below which a fraction q of the observations fall"""
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters and histograms"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    @staticmethod
+    def _labels(labels: Dict[str, Optional[object]]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+    def inc(self, name: str, value: float = 1, **labels: Optional[object]) -> None:
+        """Add to a counter"""
+        key = self._labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Optional[object]) -> None:
+        """Record one duration in a histogram"""
+        key = self._labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    def record_wait(self, kind: str, seconds: float) -> None:
+        """Record deliberate waiting (backoff, rate limiting, polling)"""
+        if seconds > 0:
+            self.observe("wait_seconds", seconds, kind=kind)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Optional[object]) -> Iterator[None]:
+        """Time a block (also traced as a span); an outcome label tells successful from failed runs"""
+        started = time.monotonic()
+        outcome = "error"
+        span_name = name[:-len("_seconds")] if name.endswith("_seconds") else name
+        with tracer.span(span_name, category="timer", **labels) as span:
+            try:
+                yield
+                outcome = "ok"
+            finally:
+                span["outcome"] = outcome
+                self.observe(name, time.monotonic() - started, outcome=outcome, **labels)
+
+    def reset(self) -> None:
+        """Drop every series (e.g. between benchmark runs)"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = time.time()
+
+    def to_prometheus(self) -> str:
+        """Render all series in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f"{METRIC_PREFIX}{name}"
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{_render_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{METRIC_PREFIX}{name}"
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_render_labels(labels + (('le', f'{bound:g}'),))} "
+                                     f"{cumulative}")
+                    lines.append(f"{metric}_bucket{_render_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{metric}_sum{_render_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{_render_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict:
+        """Counters and per-series latency statistics as plain data"""
+        with self._lock:
+            return {
+                "started": self.started,
+                "duration": round(time.time() - self.started, 3),
+                "counters": {
+                    name: [{"labels": dict(labels), "value": value} for labels, value in sorted(series.items())]
+                    for name, series in sorted(self._counters.items())
+                },
+                "histograms": {
+                    name: [
+                        {
+                            "labels": dict(labels),
+                            "count": histogram.count,
+                            "sum": round(histogram.sum, 3),
+                            "avg": round(histogram.sum / histogram.count, 3) if histogram.count else 0,
+                            "p50": round(histogram.quantile(0.5), 3),
+                            "p95": round(histogram.quantile(0.95), 3),
+                            "max": round(histogram.max, 3),
+                        }
+                        for labels, histogram in sorted(series.items())
+                    ]
+                    for name, series in sorted(self._histograms.items())
+                },
+            }
+
+    def total_seconds(self, name: str, **labels: str) -> float:
+        """Summed duration of every series of a histogram matching the labels"""
+        with self._lock:
+            return sum(
+                histogram.sum for key, histogram in self._histograms.get(name, {}).items()
+                if all(dict(key).get(label) == value for label, value in labels.items())
+            )
+
+    def write_prometheus(self, path: str) -> None:
+        """Write the textfile atomically so a collector never reads a partial file"""
+        _write_atomic(Path(path), self.to_prometheus())
+        log.info(f"📈  Metrics written to {path}")
+
+    def write_json(self, path: str) -> None:
+        """Write the JSON summary"""
+        _write_atomic(Path(path), json.dumps(self.summary(), indent=2))
+        log.info(f"📈  Metrics summary written to {path}")
+
+    def log_summary(self) -> None:
+        """Log where the run spent its time"""
+        network = self.total_seconds("http_request_seconds")
+        with self._lock:
+            waits = {
+                dict(key).get("kind"): histogram.sum
+                for key, histogram in self._histograms.get("wait_seconds", {}).items()
+            }
+        if network or waits:
+            waited = ", ".join(f"{kind} {seconds:.1f}s" for kind, seconds in sorted(waits.items()))
+            log.info(f"⏱️  Time in HTTP calls {network:.1f}s; waiting: {waited or 'none'}")
+
+
+def _render_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    """Replace a file in one step"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = path.with_suffix(path.suffix + '.tmp')
+        with tmp_file.open('w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_file, path)
+    except OSError as e:
+        log.error(f"Unable to write metrics file {path}: {str(e)}")
+        raise
+
+
+metrics = MetricsRegistry()  # Process-wide registry shared by all clients
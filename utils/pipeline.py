@@ -0,0 +1,84 @@
+"""
+Streaming Pipeline Plumbing
+
+Queues that connect deployment stages so gateways move on to the next stage
+as soon as their own work is done, plus the wave collector used to group
+gateways for policy installation.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Iterable, Iterator, List, Tuple
+from .fleet import END_OF_STREAM
+
+
+class StageQueue(queue.Queue):
+    """Work queue feeding one pipeline stage, with counters for progress logs"""
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+        self.received = 0
+        self._closed = False
+        self._counter_lock = threading.Lock()
+
+    def push(self, item: Any) -> None:
+        """Hand an item to the stage"""
+        with self._counter_lock:
+            self.received += 1
+        self.put(item)
+
+    def close(self) -> None:
+        """Signal that no more items will arrive"""
+        with self._counter_lock:
+            self._closed = True
+        self.put(END_OF_STREAM)
+
+    def describe(self) -> str:
+        """Short queue state for log lines"""
+        waiting = self.qsize() - (1 if self._closed else 0)
+        state = "closed" if self._closed else "open"
+        return f"{self.name}: {max(waiting, 0)} waiting/{self.received} received ({state})"
+
+
+def iter_batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group a stream into lists of up to `size` items without reading it ahead"""
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def collect_wave(source: queue.Queue, size: int, window: float) -> Tuple[List[Any], bool]:
+    """
+    Collect the next wave of items from a stage queue
+
+    Blocks for the first item, then gathers more until the wave holds `size`
+    items or `window` seconds have passed since the first one arrived.
+
+    Returns:
+        tuple: (wave items, True once the end of the stream was reached)
+    """
+    first = source.get()
+    if first is END_OF_STREAM:
+        return [], True
+
+    wave = [first]
+    deadline = time.monotonic() + window
+    while len(wave) < size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            item = source.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if item is END_OF_STREAM:
+            return wave, True
+        wave.append(item)
+    return wave, False
@@ -0,0 +1,170 @@
+"""
+Client-Side Rate Limiter
+
+Token buckets per endpoint class, shared by every Smart-1 Cloud and
+management client in the process. Works from worker threads and from
+asyncio code, and records how long requests were held back.
+
+No class is limited unless configured (--rate-limit): the services do not
+publish per-endpoint quotas, and guessed caps only slow parallel runs down.
+What the server does report is honoured instead: a 429/503 with
+Retry-After holds back every request of that endpoint class until the
+requested time has passed.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from .logger_main import log
+
+# Endpoint classes that can be limited with --rate-limit CLASS=RATE[:BURST]
+ENDPOINT_CLASSES = (
+    "auth",           # Portal token and web_api login/logout
+    "gateways",       # Smart-1 Cloud gateway endpoints
+    "web_api_read",   # show-* commands
+    "web_api_write",  # set-*, publish, install-policy, ...
+    "show_task",      # Task polling
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers reserve a token and wait for it"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity (defaults to max(1, rate))
+        """
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.acquired = 0
+        self.delayed = 0
+        self.held_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1  # May go negative: later callers queue up behind this one
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.acquired += 1
+            if delay > 0:
+                self.delayed += 1
+                self.held_seconds += delay
+            return delay
+
+    def acquire(self) -> float:
+        """Block the calling thread until a token is available"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        """Wait for a token without blocking the event loop"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class RateLimiter:
+    """Set of token buckets keyed by endpoint class"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Initialize the limiter
+
+        Args:
+            limits: Endpoint class -> (requests per second, burst). Classes
+                that are not listed are not limited
+        """
+        self.buckets: Dict[str, TokenBucket] = {}
+        self._resume_at: Dict[str, float] = {}  # Endpoint class -> end of a Retry-After pause
+        self._lock = threading.Lock()
+        self.configure(limits or {})
+
+    def configure(self, limits: Dict[str, Tuple[float, float]]) -> None:
+        """Create or replace the buckets of the given endpoint classes"""
+        for endpoint_class, (rate, burst) in limits.items():
+            if rate and rate > 0:
+                self.buckets[endpoint_class] = TokenBucket(rate, burst)
+            else:
+                self.buckets.pop(endpoint_class, None)
+
+    def back_off(self, endpoint_class: Optional[str], seconds: float) -> None:
+        """Hold every request of an endpoint class back for the server's Retry-After"""
+        if not endpoint_class or seconds <= 0:
+            return
+        with self._lock:
+            resume_at = time.monotonic() + seconds
+            if resume_at > self._resume_at.get(endpoint_class, 0):
+                log.debug("Retry-After: pausing %s for %.1fs", endpoint_class, seconds)
+                self._resume_at[endpoint_class] = resume_at
+
+    def _pause(self, endpoint_class: str) -> float:
+        """Seconds left of a server-requested pause of the endpoint class"""
+        with self._lock:
+            return max(self._resume_at.get(endpoint_class, 0) - time.monotonic(), 0.0)
+
+    def acquire(self, endpoint_class: Optional[str]) -> float:
+        """Wait for a request slot of an endpoint class; returns seconds held back"""
+        if not endpoint_class:
+            return 0.0
+        paused = self._pause(endpoint_class)
+        if paused > 0:
+            time.sleep(paused)
+        bucket = self.buckets.get(endpoint_class)
+        return paused + (bucket.acquire() if bucket else 0.0)
+
+    async def acquire_async(self, endpoint_class: Optional[str]) -> float:
+        """Asyncio variant of acquire()"""
+        if not endpoint_class:
+            return 0.0
+        paused = self._pause(endpoint_class)
+        if paused > 0:
+            await asyncio.sleep(paused)
+        bucket = self.buckets.get(endpoint_class)
+        return paused + (await bucket.acquire_async() if bucket else 0.0)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Requests, delayed requests and total hold-back time per endpoint class"""
+        return {
+            endpoint_class: {
+                "requests": bucket.acquired,
+                "delayed": bucket.delayed,
+                "held_seconds": round(bucket.held_seconds, 3),
+            }
+            for endpoint_class, bucket in self.buckets.items()
+        }
+
+    def log_stats(self) -> None:
+        """Log how much each endpoint class was throttled"""
+        for endpoint_class, stats in self.stats().items():
+            if stats["requests"]:
+                log.info(f"⏱️  Rate limit {endpoint_class}: {stats['requests']} requests, "
+                         f"{stats['delayed']} delayed, {stats['held_seconds']}s held back")
+
+
+def parse_limit(spec: str) -> Tuple[str, Tuple[float, float]]:
+    """Parse a CLASS=RATE[:BURST] command line value"""
+    try:
+        endpoint_class, value = spec.split('=', 1)
+        rate, _, burst = value.partition(':')
+        rate_value = float(rate)
+        return endpoint_class.strip(), (rate_value, float(burst) if burst else max(1.0, rate_value))
+    except ValueError as e:
+        raise ValueError(f"Invalid rate limit '{spec}', expected CLASS=RATE[:BURST]") from e
+
+
+# Process-wide limiter shared by all Smart-1 Cloud and management clients
+shared_rate_limiter = RateLimiter()
@@ -0,0 +1,276 @@
+"""
+Shared Retry, Timeout and Circuit Breaker Policy
+
+One request layer used by the Smart-1 Cloud, management and Sparks clients:
+- Per-request timeout
+- Exponential backoff with full jitter
+- Retry-After support on 429/503
+- No unsafe retries of non-idempotent calls
+- Per-host circuit breaker so a dead endpoint fails fast
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import requests
+import urllib3
+from requests.exceptions import ConnectTimeout, RequestException, Timeout
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from .logger_main import log
+from .rate_limiter import RateLimiter
+from .metrics import metrics, WAIT_RETRY, WAIT_RATE_LIMIT
+
+DEFAULT_TIMEOUT = 30  # seconds
+MAX_RETRIES = 3
+BASE_DELAY = 1  # seconds
+MAX_DELAY = 30  # seconds
+MAX_RETRY_AFTER = 120  # seconds, upper bound for server supplied waits
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+THROTTLE_STATUSES = frozenset({429, 503})  # Server refused the request, safe to resend
+
+BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures before the circuit opens
+BREAKER_RESET_TIMEOUT = 30  # seconds before a trial request is let through
+
+
+class CircuitOpenError(RequestException):
+    """Raised when a host's circuit breaker rejects a request"""
+
+
+class CircuitBreaker:
+    """Per-host breaker: closed -> open after repeated failures -> half-open trial"""
+
+    def __init__(self, host: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Check whether a request may be sent to the host"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True  # Half-open: let exactly one request through
+            return True
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request"""
+        with self._lock:
+            if self.opened_at is not None:
+                log.info(f"Circuit closed for {self.host}")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Let the next trial through after one that ended without an outcome (e.g. cancelled)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure and open the circuit once the threshold is reached"""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    log.warning(f"Circuit opened for {self.host} after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(url: str) -> CircuitBreaker:
+    """Return the shared circuit breaker of the URL's host"""
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(host)
+            _breakers[host] = breaker
+        return breaker
+
+
+def _not_sent(error: RequestException) -> bool:
+    """True when the request never reached the server (safe to resend)"""
+    if isinstance(error, ConnectTimeout):
+        return True
+    if isinstance(error, RequestsConnectionError) and error.args:
+        reason = getattr(error.args[0], 'reason', None)
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+    return False
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date)"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0), MAX_RETRY_AFTER)
+
+
+def throttle(rate_limiter: RateLimiter, rate_class: Optional[str],
+             response: requests.Response) -> None:
+    """Pause the endpoint class when the server refused a request with Retry-After"""
+    if response.status_code in THROTTLE_STATUSES:
+        retry_after = retry_after_seconds(response)
+        if retry_after:
+            rate_limiter.back_off(rate_class, retry_after)
+
+
+def record_attempt(endpoint: str, method: str, status: object, seconds: float) -> None:
+    """Record the network time of one HTTP attempt"""
+    metrics.observe("http_request_seconds", seconds, endpoint=endpoint, method=method, status=status)
+
+
+def record_retry(endpoint: str, reason: object, delay: float) -> None:
+    """Count a retry and the backoff slept before it"""
+    metrics.inc("http_retries_total", endpoint=endpoint, reason=reason)
+    metrics.record_wait(WAIT_RETRY, delay)
+
+
+class RetryPolicy:
+    """Timeout and retry rules applied to every request of a client"""
+
+    def __init__(
+        self,
+        max_retries: int = MAX_RETRIES,
+        base_delay: float = BASE_DELAY,
+        max_delay: float = MAX_DELAY,
+        timeout: float = DEFAULT_TIMEOUT,
+        retry_statuses: frozenset = RETRY_STATUSES
+    ):
+        """
+        Initialize the policy
+
+        Args:
+            max_retries: Retries after the first attempt
+            base_delay: Backoff base in seconds
+            max_delay: Upper bound of a single backoff in seconds
+            timeout: Default request timeout in seconds
+            retry_statuses: HTTP statuses that are retried
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.retry_statuses = retry_statuses
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for a zero-based attempt number"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def retry_delay(self, response: Optional[requests.Response], attempt: int,
+                    idempotent: bool) -> Optional[float]:
+        """
+        Decide whether a response should be retried
+
+        Returns:
+            Seconds to wait before the next attempt, or None to stop
+        """
+        if attempt >= self.max_retries or response is None:
+            return None
+        if response.status_code not in self.retry_statuses:
+            return None
+        retry_after = retry_after_seconds(response)
+        throttled = response.status_code in THROTTLE_STATUSES
+        if not idempotent and not (throttled and retry_after is not None):
+            return None  # The server may have acted on the request
+        return max(retry_after or 0, self.backoff(attempt))
+
+    def request(self, session: requests.Session, method: str, url: str,
+                idempotent: bool = True, rate_limiter: Optional[RateLimiter] = None,
+                rate_class: Optional[str] = None, endpoint: Optional[str] = None,
+                probe: bool = False, **kwargs) -> requests.Response:
+        """
+        Send a request under the policy
+
+        Args:
+            session: Session used to send the request
+            method: HTTP method
+            url: Full URL
+            idempotent: Whether resending after an ambiguous failure is safe
+            rate_limiter: Limiter consulted before every attempt
+            rate_class: Endpoint class of the request for the rate limiter
+            endpoint: Metrics label of the request (defaults to the URL path)
+            probe: Readiness probe: sent even when the circuit is open, and
+                its failures are not counted against the host
+            **kwargs: Passed to requests.Session.request
+
+        Returns:
+            requests.Response: The final response (status not checked)
+
+        Raises:
+            CircuitOpenError: If the host's circuit is open
+            RequestException: When the last attempt failed at transport level
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        breaker = circuit_breaker(url)
+        endpoint = endpoint or urlsplit(url).path
+
+        for attempt in range(self.max_retries + 1):
+            if not probe and not breaker.allow():
+                metrics.inc("circuit_open_total", host=breaker.host)
+                raise CircuitOpenError(f"Circuit open for {breaker.host}, failing fast")
+            if rate_limiter:
+                metrics.record_wait(WAIT_RATE_LIMIT, rate_limiter.acquire(rate_class))
+
+            started = time.monotonic()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (RequestsConnectionError, Timeout) as e:
+                record_attempt(endpoint, method, type(e).__name__, time.monotonic() - started)
+                if not probe:
+                    breaker.record_failure()
+                if attempt >= self.max_retries or not (idempotent or _not_sent(e)):
+                    raise
+                delay = self.backoff(attempt)
+                log.warning(f"{method} {url} failed ({type(e).__name__}), "
+                            f"retrying in {delay:.1f}s ({self.max_retries - attempt} left)")
+                record_retry(endpoint, type(e).__name__, delay)
+                time.sleep(delay)
+                continue
+            except RequestException as e:
+                # Other transport errors (broken chunked encoding, redirect loops, ...) end a trial too
+                record_attempt(endpoint, method, type(e).__name__, time.monotonic() - started)
+                if not probe:
+                    breaker.record_failure()
+                raise
+            record_attempt(endpoint, method, response.status_code, time.monotonic() - started)
+            if rate_limiter:
+                throttle(rate_limiter, rate_class, response)
+
+            # A probe neither opens nor closes the circuit, only real traffic does
+            if not probe:
+                if response.status_code < 500:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+
+            delay = self.retry_delay(response, attempt, idempotent)
+            if delay is None:
+                return response
+            log.warning(f"{method} {url} returned {response.status_code}, "
+                        f"retrying in {delay:.1f}s ({self.max_retries - attempt} left)")
+            record_retry(endpoint, response.status_code, delay)
+            time.sleep(delay)
+
+        return response
@@ -0,0 +1,728 @@
+#!/usr/bin/env python3
+"""
+Local Smart-1 Cloud / Management / Sparks Simulator
+
+Stand-in HTTP server for the three APIs the deployer talks to, so
+concurrency, retry and pipelining changes can be exercised reproducibly
+without a tenant or appliances:
+- Smart-1 Cloud: /auth/external and /app/maas/api/v1/gateways
+- Management web_api: login, show/set objects, show-package, publish, install-policy, show-task
+- Sparks devices: /devices/<gw_name>/web-api/login and run-clish-command
+
+Latency, task durations, error and throttling (429) rates are configurable
+(see SimulatorConfig). State lives in memory only.
+
+Usage:
+    python -m utils.simulator --gateways 100 --config-dir sim
+    python s1c_deploy_sparks_gw.py --auth-file sim/auth_data.json \\
+        --policy-file sim/policy_package_data.json --gateways sim/gateways.jsonl
+"""
+
+import base64
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from pydantic import BaseModel, ConfigDict, Field
+from .logger_main import log
+from .load_config_file import AuthConfig, GatewayConfig, PolicyPackage
+
+SIM_CLIENT_ID = "simulator-client"
+SIM_ACCESS_KEY = "simulator-key"
+SIM_API_KEY = "simulator-api-key"
+SIM_INSTANCE = "simulator"
+SIM_CONTEXT = "simulator-context"
+SIM_SMS_CN = "simulator-tenant"
+SIM_POLICY_PACKAGE = "Standard"
+REQUEST_QUEUE_SIZE = 1024  # Pending connections, large enough for big fleets
+
+# Task states as reported by show-task
+TASK_IN_PROGRESS = "in progress"
+TASK_SUCCEEDED = "succeeded"
+TASK_FAILED = "failed"
+TASK_PARTIALLY_SUCCEEDED = "partially succeeded"
+
+# Cloud gateway states
+CLOUD_INITIALIZING = "Initializing"
+CLOUD_CONNECTED = "Connected"
+
+
+class SimulatorConfig(BaseModel):
+    """Injected latency, durations and faults"""
+    latency: float = Field(default=0.0, ge=0)  # Seconds added to every response
+    latency_jitter: float = Field(default=0.0, ge=0)  # Random extra latency, up to this many seconds
+    error_rate: float = Field(default=0.0, ge=0, le=1)  # Fraction of requests failed with error_status
+    error_status: int = 502
+    throttle_rate: float = Field(default=0.0, ge=0, le=1)  # Fraction of requests answered with 429
+    retry_after: float = Field(default=1, ge=0)  # Retry-After of throttled requests in seconds
+    task_duration: float = Field(default=1.0, ge=0)  # publish and batch task duration in seconds
+    install_duration: float = Field(default=5.0, ge=0)  # install-policy task duration in seconds
+    install_failure_rate: float = Field(default=0.0, ge=0, le=1)  # Fraction of install targets that fail
+    clish_duration: float = Field(default=0.0, ge=0)  # run-clish-command processing time in seconds
+    page_limit: Optional[int] = Field(default=None, gt=0)  # Cap of the cloud gateway list page size
+    token_lifetime: int = Field(default=3600, gt=0)  # Cloud token lifetime in seconds
+    session_timeout: int = Field(default=600, gt=0)  # web_api session timeout in seconds
+    seed: Optional[int] = None  # Seed of the fault injection for reproducible runs
+    model_config = ConfigDict(frozen=False)
+
+
+def _timestamp() -> Dict:
+    """web_api time value"""
+    now = time.time()
+    return {"posix": int(now * 1000), "iso-8601": time.strftime("%Y-%m-%dT%H:%M%z", time.localtime(now))}
+
+
+class _Task:
+    """Management task with a fixed completion time"""
+
+    def __init__(self, name: str, duration: float, details: Optional[List[Dict]] = None,
+                 on_complete: Optional[Callable[[], None]] = None, final_status: str = TASK_SUCCEEDED):
+        self.task_id = str(uuid.uuid4())
+        self.name = name
+        self.started = time.monotonic()
+        self.done_at = self.started + duration
+        self.details = details or []
+        self.on_complete = on_complete
+        self.final_status = final_status
+        self.status = TASK_IN_PROGRESS
+
+    def report(self, full: bool) -> Dict:
+        """show-task entry of the task"""
+        duration = self.done_at - self.started
+        elapsed = time.monotonic() - self.started
+        entry = {
+            "task-id": self.task_id,
+            "task-name": self.name,
+            "status": self.status,
+            "progress-percentage": 100 if self.status != TASK_IN_PROGRESS
+            else int(100 * elapsed / duration) if duration else 0,
+        }
+        if full and self.details:
+            entry["task-details"] = self.details
+        return entry
+
+
+class SimulatedTenant:
+    """In-memory state of one tenant and its devices (all access under the lock)"""
+
+    def __init__(self, config: SimulatorConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.tokens: Dict[str, float] = {}  # Cloud bearer token -> expiry
+        self.cloud_gateways: Dict[str, Dict] = {}
+        self.objects: Dict[str, Dict] = {}  # Published management objects by name
+        self.uids: Dict[str, str] = {}  # Object uid -> name
+        self.packages: Dict[str, Dict] = {}  # Policy packages by name
+        self.modify_package(SIM_POLICY_PACKAGE)
+        self.sessions: Dict[str, Dict] = {}  # web_api sid -> {"last_used", "staged"}
+        self.tasks: Dict[str, _Task] = {}
+        self.running_tasks: Dict[str, _Task] = {}  # Tasks still in progress
+        self.device_sessions: Dict[str, str] = {}  # Sparks sid -> device name
+        self.device_policies: Dict[str, str] = {}  # Policy fetched by each device
+        self.requests: Counter = Counter()  # Requests per route
+        self.faults: Counter = Counter()  # Injected errors per kind
+        self.random = random.Random(config.seed)
+
+    # Smart-1 Cloud
+
+    def issue_token(self) -> str:
+        """Unsigned JWT carrying an exp claim"""
+        expiry = time.time() + self.config.token_lifetime
+
+        def encode(data: Dict) -> str:
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+        token = f"{encode({'alg': 'none'})}.{encode({'exp': int(expiry), 'jti': uuid.uuid4().hex})}.sim"
+        self.tokens[token] = expiry
+        return token
+
+    def token_valid(self, authorization: Optional[str]) -> bool:
+        token = (authorization or "").replace("Bearer ", "", 1)
+        return self.tokens.get(token, 0) > time.time()
+
+    def register(self, name: str, description: str) -> Dict:
+        gateway = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "description": description,
+            "token": base64.b64encode(uuid.uuid4().bytes).decode(),
+            "status": CLOUD_INITIALIZING,
+            "statusDetails": CLOUD_INITIALIZING,
+        }
+        self.cloud_gateways[name] = gateway
+        # Registration creates the management object with its SIC still uninitialised
+        uid = str(uuid.uuid4())
+        self.uids[uid] = name
+        self.objects[name] = {
+            "uid": uid,
+            "name": name,
+            "type": "simple-gateway",
+            "sic-state": "uninitialized",
+            "policy": {},
+        }
+        return gateway
+
+    # Management web_api
+
+    def modify_package(self, name: str) -> Dict:
+        """Create a policy package or record a change of it (gateways installed earlier become outdated)"""
+        package = self.packages.setdefault(name, {"uid": str(uuid.uuid4()), "name": name, "type": "package"})
+        package["meta-info"] = {"last-modify-time": _timestamp()}
+        return package
+
+    def settle_tasks(self) -> None:
+        """Complete due tasks and apply their effects"""
+        now = time.monotonic()
+        for task in [task for task in self.running_tasks.values() if task.done_at <= now]:
+            del self.running_tasks[task.task_id]
+            task.status = task.final_status
+            if task.on_complete:
+                task.on_complete()
+
+    def start_task(self, name: str, duration: float, details: Optional[List[Dict]] = None,
+                   on_complete: Optional[Callable[[], None]] = None, final_status: str = TASK_SUCCEEDED) -> Dict:
+        task = _Task(name, duration, details, on_complete, final_status)
+        self.tasks[task.task_id] = task
+        self.running_tasks[task.task_id] = task
+        return {"task-id": task.task_id}
+
+    def stage(self, sid: str, name: str, changes: Dict) -> Optional[Dict]:
+        """Record changes of an object in the session; None when the object does not exist"""
+        if name not in self.objects:
+            return None
+        staged = self.sessions[sid]["staged"].setdefault(name, {})
+        staged.update(changes)
+        return {**self.objects[name], **staged}
+
+    def publish(self, sid: str) -> Dict:
+        staged = self.sessions[sid]["staged"]
+        self.sessions[sid]["staged"] = {}
+
+        def apply() -> None:
+            for name, changes in staged.items():
+                if name in self.objects:
+                    self.objects[name].update(changes)
+
+        apply()  # Published changes are visible right away, the task only reports completion
+        return self.start_task("Publish operation", self.config.task_duration)
+
+    def install_policy(self, payload: Dict) -> Tuple[int, Dict]:
+        package = payload.get("policy-package")
+        targets = payload.get("targets") or []
+        targets = [targets] if isinstance(targets, str) else targets
+        unknown = [target for target in targets if target not in self.objects]
+        if not package or not targets or unknown:
+            return 400, {"code": "generic_err_invalid_parameter",
+                         "message": f"Invalid install-policy request (unknown targets: {unknown})"}
+
+        failed = {target for target in targets if self.random.random() < self.config.install_failure_rate}
+        if failed:
+            self.faults["install_target"] += len(failed)
+
+        def apply() -> None:
+            installed_at = _timestamp()
+            for target in targets:
+                if target in failed:
+                    continue
+                policy = self.objects[target].setdefault("policy", {})
+                if payload.get("access", True):
+                    policy.update({"access-policy-installed": True, "access-policy-name": package,
+                                   "access-policy-installation-date": installed_at})
+                if payload.get("threat-prevention", True):
+                    policy.update({"threat-policy-installed": True, "threat-policy-name": package,
+                                   "threat-policy-installation-date": installed_at})
+
+        details = [
+            {"gatewayName": target, "status": TASK_FAILED, "errors": [{"message": "Policy installation failed"}]}
+            if target in failed else {"gatewayName": target, "status": TASK_SUCCEEDED}
+            for target in targets
+        ]
+        final_status = TASK_SUCCEEDED if not failed else TASK_FAILED if len(failed) == len(targets) \
+            else TASK_PARTIALLY_SUCCEEDED
+        return 200, self.start_task(f"Install policy {package}", self.config.install_duration, details, apply,
+                                    final_status)
+
+
+class _SimulatorHandler(BaseHTTPRequestHandler):
+    """Routes one request to the cloud, web_api or device handlers"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, as the clients pool connections
+    server: '_SimulatorServer'
+
+    DEVICE_PATH = re.compile(r"^/devices/(?P<device>[^/]+)/web-api/(?P<command>[\w-]+)$")
+    WEB_API_PATH = re.compile(r"^/web_api/(?P<command>[\w-]+)$")
+    GATEWAY_PATH = re.compile(r"^/app/maas/api/v1/gateways(?:/(?P<name>[^/]+)(?P<status>/status)?)?$")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # Request counts are kept in SimulatedTenant.requests instead
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b""
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            self._reply(400, {"code": "generic_err_invalid_syntax", "message": "Invalid JSON"})
+            return
+
+        tenant = self.server.tenant
+        route, handler = self._route(method, url.path)
+        with tenant.lock:
+            tenant.requests[route] += 1
+
+        config = tenant.config
+        with tenant.lock:
+            jitter = tenant.random.uniform(0, config.latency_jitter) if config.latency_jitter else 0
+        delay = config.latency + jitter
+        if delay:
+            time.sleep(delay)
+
+        if handler is None:
+            self._reply(404, {"code": "generic_err_command_not_found", "message": f"No route for {url.path}"})
+            return
+        if route != "stats":
+            fault = self._fault()
+            if fault == "throttled":
+                self._reply(429, {"message": "Too many requests"},
+                            {"Retry-After": f"{config.retry_after:g}"})
+                return
+            if fault == "error":
+                self._reply(config.error_status, {"message": "Injected failure"})
+                return
+
+        status, response = handler(payload, parse_qs(url.query))
+        self._reply(status, response)
+
+    def _fault(self) -> Optional[str]:
+        """Draw an injected throttle or error for this request"""
+        tenant = self.server.tenant
+        with tenant.lock:
+            draw = tenant.random.random()
+            if draw < tenant.config.throttle_rate:
+                tenant.faults["throttled"] += 1
+                return "throttled"
+            if draw < tenant.config.throttle_rate + tenant.config.error_rate:
+                tenant.faults["error"] += 1
+                return "error"
+        return None
+
+    def _route(self, method: str, path: str) -> Tuple[str, Optional[Callable[[Dict, Dict], Tuple[int, Any]]]]:
+        """Route label (for the request counts) and handler of a request"""
+        if path == "/_simulator/stats" and method == "GET":
+            return "stats", lambda payload, query: (200, self.server.stats())
+        if path == "/auth/external" and method == "POST":
+            return "auth", self._auth
+        match = self.GATEWAY_PATH.match(path)
+        if match:
+            name = match.group('name')
+            if match.group('status') and method == "GET":
+                return "gateway-status", lambda payload, query: self._gateway_status(name)
+            if name and method == "DELETE":
+                return "gateway-delete", lambda payload, query: self._delete_gateway(name)
+            if not name and method == "POST":
+                return "gateway-register", lambda payload, query: self._register(payload)
+            if not name and method == "GET":
+                return "gateway-list", lambda payload, query: self._list_gateways(query)
+        match = self.WEB_API_PATH.match(path)
+        if match and method == "POST":
+            command = match.group('command')
+            return command, lambda payload, query: self._web_api(command, payload)
+        match = self.DEVICE_PATH.match(path)
+        if match and method == "POST":
+            device, command = match.group('device'), match.group('command')
+            return f"device-{command}", lambda payload, query: self._device(device, command, payload)
+        return path, None
+
+    def _reply(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Smart-1 Cloud
+
+    def _auth(self, payload: Dict, query: Dict) -> Tuple[int, Dict]:
+        if not payload.get("clientId") or not payload.get("accessKey"):
+            return 400, {"success": False, "message": "clientId and accessKey are required"}
+        with self.server.tenant.lock:
+            return 200, {"success": True, "data": {"token": self.server.tenant.issue_token()}}
+
+    def _cloud_authorized(self) -> bool:
+        with self.server.tenant.lock:
+            return self.server.tenant.token_valid(self.headers.get('Authorization'))
+
+    def _register(self, payload: Dict) -> Tuple[int, Dict]:
+        if not self._cloud_authorized():
+            return 401, {"success": False, "message": "Unauthorized"}
+        name = payload.get("name")
+        tenant = self.server.tenant
+        with tenant.lock:
+            if not name or name in tenant.cloud_gateways:
+                return 400, {"success": False, "message": f"Gateway {name} already exists or has no name"}
+            return 200, {"success": True, "data": dict(tenant.register(name, payload.get("description", "")))}
+
+    def _list_gateways(self, query: Dict) -> Tuple[int, Dict]:
+        if not self._cloud_authorized():
+            return 401, {"success": False, "message": "Unauthorized"}
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query["limit"][0]) if "limit" in query else None
+        page_limit = self.server.tenant.config.page_limit
+        if page_limit:
+            limit = min(limit, page_limit) if limit is not None else page_limit
+        name = query.get("name", [""])[0].lower()
+        status = query.get("status", [""])[0].lower()
+        with self.server.tenant.lock:
+            gateways = [
+                gateway for gateway in self.server.tenant.cloud_gateways.values()
+                if name in gateway["name"].lower()
+                and (not status or status in (gateway["status"].lower(), gateway["statusDetails"].lower()))
+            ]
+            page = gateways[offset:offset + limit] if limit is not None else gateways[offset:]
+            objects = [dict(gateway) for gateway in page]
+        return 200, {"success": True, "data": {"objects": objects, "total": len(gateways)}}
+
+    def _gateway_status(self, name: str) -> Tuple[int, Dict]:
+        if not self._cloud_authorized():
+            return 401, {"success": False, "message": "Unauthorized"}
+        with self.server.tenant.lock:
+            gateway = self.server.tenant.cloud_gateways.get(name)
+            if gateway is None:
+                return 404, {"success": False, "message": f"Gateway {name} not found"}
+            return 200, {"success": True, "data": {
+                "name": name, "status": gateway["status"], "statusDetails": gateway["statusDetails"]
+            }}
+
+    def _delete_gateway(self, name: str) -> Tuple[int, Dict]:
+        if not self._cloud_authorized():
+            return 401, {"success": False, "message": "Unauthorized"}
+        tenant = self.server.tenant
+        with tenant.lock:
+            if tenant.cloud_gateways.pop(name, None) is None:
+                return 404, {"success": False, "message": f"Gateway {name} not found"}
+            removed = tenant.objects.pop(name, None)
+            if removed:
+                tenant.uids.pop(removed["uid"], None)
+            return 200, {"success": True}
+
+    # Management web_api
+
+    def _web_api(self, command: str, payload: Dict) -> Tuple[int, Dict]:
+        tenant = self.server.tenant
+        with tenant.lock:
+            tenant.settle_tasks()
+            if command == "login":
+                if not payload.get("api-key"):
+                    return 400, {"code": "err_login_failed", "message": "api-key is required"}
+                sid = uuid.uuid4().hex
+                tenant.sessions[sid] = {"last_used": time.time(), "staged": {}}
+                return 200, {"sid": sid, "session-timeout": tenant.config.session_timeout}
+
+            sid = self.headers.get('X-chkp-sid')
+            session = tenant.sessions.get(sid)
+            if session is None or time.time() - session["last_used"] > tenant.config.session_timeout:
+                tenant.sessions.pop(sid, None)
+                return 401, {"code": "generic_err_wrong_session_id", "message": "Wrong session id"}
+            session["last_used"] = time.time()
+
+            command_handler = getattr(self, f"_cmd_{command.replace('-', '_')}", None)
+            if command_handler is None:
+                return 404, {"code": "generic_err_command_not_found", "message": f"Unknown command {command}"}
+            return command_handler(tenant, sid, payload)
+
+    def _cmd_logout(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        tenant.sessions.pop(sid, None)
+        return 200, {"message": "OK"}
+
+    def _cmd_keepalive(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        return 200, {"message": "OK"}
+
+    def _cmd_discard(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        changes = len(tenant.sessions[sid]["staged"])
+        tenant.sessions[sid]["staged"] = {}
+        return 200, {"message": "OK", "number-of-discarded-changes": changes}
+
+    def _cmd_publish(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        return 200, tenant.publish(sid)
+
+    def _cmd_show_task(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        task_ids = payload.get("task-id") or []
+        task_ids = [task_ids] if isinstance(task_ids, str) else task_ids
+        missing = [task_id for task_id in task_ids if task_id not in tenant.tasks]
+        if missing or not task_ids:
+            return 404, {"code": "generic_err_object_not_found", "message": f"Tasks not found: {missing}"}
+        full = payload.get("details-level") == "full"
+        return 200, {"tasks": [tenant.tasks[task_id].report(full) for task_id in task_ids]}
+
+    def _cmd_show_checkpoint_host(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        name = payload.get("name", "Management_Service")
+        return 200, {"name": name, "sic-name": f"cn=cp_mgmt,o={SIM_SMS_CN}"}
+
+    def _cmd_show_package(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        package = tenant.packages.get(payload.get("name"))
+        if package is None:
+            return 404, {"code": "generic_err_object_not_found", "message": "Requested object not found"}
+        return 200, dict(package)
+
+    def _cmd_show_simple_gateway(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        gateway = tenant.objects.get(payload.get("name"))
+        if gateway is None:
+            return 404, {"code": "generic_err_object_not_found", "message": "Requested object not found"}
+        return 200, dict(gateway)
+
+    def _cmd_show_simple_gateways(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        offset = int(payload.get("offset", 0))
+        limit = int(payload.get("limit", 50))
+        names = sorted(tenant.objects)
+        page = [dict(tenant.objects[name]) for name in names[offset:offset + limit]]
+        return 200, {"objects": page, "from": offset + 1, "to": offset + len(page), "total": len(names)}
+
+    def _cmd_set_simple_gateway(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        changes = {key: value for key, value in payload.items() if key not in ("name", "one-time-password")}
+        gateway = tenant.stage(sid, payload.get("name"), changes)
+        if gateway is None:
+            return 404, {"code": "generic_err_object_not_found", "message": "Requested object not found"}
+        return 200, gateway
+
+    def _cmd_set_generic_object(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        name = tenant.uids.get(payload.get("uid"))
+        changes = {key: value for key, value in payload.items() if key != "uid"}
+        if name is None or tenant.stage(sid, name, changes) is None:
+            return 404, {"code": "generic_err_object_not_found", "message": "Requested object not found"}
+        return 200, {"uid": payload.get("uid")}
+
+    def _cmd_set_objects_batch(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        details = []
+        for group in payload.get("objects", []):
+            for item in group.get("list", []):
+                name = item.get("name")
+                changes = {key: value for key, value in item.items() if key not in ("name", "one-time-password")}
+                if tenant.stage(sid, name, changes) is None:
+                    details.append({"name": name, "status": TASK_FAILED,
+                                    "errors": [{"message": "Requested object not found"}]})
+                else:
+                    details.append({"name": name, "status": TASK_SUCCEEDED})
+        return 200, tenant.start_task("set-objects-batch", tenant.config.task_duration, details)
+
+    def _cmd_install_policy(self, tenant: SimulatedTenant, sid: str, payload: Dict) -> Tuple[int, Dict]:
+        return tenant.install_policy(payload)
+
+    # Sparks devices
+
+    def _device(self, device: str, command: str, payload: Dict) -> Tuple[int, Dict]:
+        tenant = self.server.tenant
+        if command == "login":
+            if not payload.get("user") or not payload.get("password"):
+                return 400, {"message": "user and password are required"}
+            sid = uuid.uuid4().hex
+            with tenant.lock:
+                tenant.device_sessions[sid] = device
+            return 200, {"sid": sid}
+        if command != "run-clish-command":
+            return 404, {"message": f"Unknown command {command}"}
+
+        with tenant.lock:
+            if tenant.device_sessions.get(self.headers.get('X-chkp-sid')) != device:
+                return 401, {"message": "Wrong session id"}
+        try:
+            script = base64.b64decode(payload.get("script", "")).decode()
+        except ValueError:
+            return 400, {"message": "script must be base64 encoded"}
+        if tenant.config.clish_duration:
+            time.sleep(tenant.config.clish_duration)
+
+        output = []
+        with tenant.lock:
+            for line in script.splitlines():
+                output.append(self._clish(tenant, device, line.strip()))
+        return 200, {"output": base64.b64encode("\n".join(filter(None, output)).encode()).decode()}
+
+    @staticmethod
+    def _clish(tenant: SimulatedTenant, device: str, command: str) -> str:
+        """Apply the effect of one CLISH command on the tenant state and return its output"""
+        if command == "show hostname":
+            return device
+        if command.startswith("connect maas") and device in tenant.cloud_gateways:
+            tenant.cloud_gateways[device].update(status=CLOUD_CONNECTED, statusDetails=CLOUD_CONNECTED)
+        if command.startswith("connect security-management") and device in tenant.objects:
+            tenant.objects[device]["sic-state"] = "communicating"
+        if command.startswith("fw fetch"):
+            tenant.device_policies[device] = SIM_POLICY_PACKAGE
+        if command == "fw stat":
+            return f"HOST      POLICY     DATE\nlocalhost {tenant.device_policies.get(device, 'InitialPolicy')}"
+        return ""
+
+
+class _SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+    def __init__(self, address: Tuple[str, int], tenant: SimulatedTenant):
+        super().__init__(address, _SimulatorHandler)
+        self.tenant = tenant
+
+    def stats(self) -> Dict:
+        """Request and fault counts so far"""
+        with self.tenant.lock:
+            return {
+                "requests": dict(self.tenant.requests),
+                "total_requests": sum(self.tenant.requests.values()),
+                "faults": dict(self.tenant.faults),
+                "gateways": len(self.tenant.cloud_gateways),
+            }
+
+
+class Simulator:
+    """Runs the simulated APIs on a background thread"""
+
+    def __init__(self, config: Optional[SimulatorConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialize the server (port 0 picks a free port)
+
+        Args:
+            config: Injected latency, durations and faults
+            host: Address to listen on
+            port: Port to listen on
+        """
+        self.config = config or SimulatorConfig()
+        self.tenant = SimulatedTenant(self.config)
+        self._server = _SimulatorServer((host, port), self.tenant)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'Simulator':
+        """Serve requests on a daemon thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="simulator", daemon=True)
+        self._thread.start()
+        log.info(f"🧪  Simulator listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'Simulator':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self) -> Dict:
+        """Request and fault counts so far"""
+        return self._server.stats()
+
+    def auth_config(self) -> AuthConfig:
+        """Credentials pointing the cloud and management clients at the simulator"""
+        return AuthConfig(
+            client_id=SIM_CLIENT_ID,
+            access_key=SIM_ACCESS_KEY,
+            portal_url=self.url,
+            instance=SIM_INSTANCE,
+            context=SIM_CONTEXT,
+            api_key=SIM_API_KEY,
+            mgmt_url=f"{self.url}/web_api"
+        )
+
+    def gateway_configs(self, count: int, prefix: str = "sim-gw", physical: bool = True) -> List[GatewayConfig]:
+        """Inventory of simulated gateways (with device credentials when physical)"""
+        return [
+            GatewayConfig(
+                gw_name=f"{prefix}{index}",
+                version="R81.10",
+                hardware="1575/1595",
+                net_type="Wireless",
+                sic_key="sim-sic-key",
+                gateway_ip=f"{self.url}/devices/{prefix}{index}" if physical else None,
+                gateway_username="admin" if physical else None,
+                gateway_password="sim-password" if physical else None
+            )
+            for index in range(1, count + 1)
+        ]
+
+    def write_config(self, config_dir: str, count: int, physical: bool = True) -> None:
+        """Write auth, policy and gateway files for running the deployer against the simulator"""
+        directory = Path(config_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "auth_data.json").write_text(self.auth_config().model_dump_json(indent=4))
+        (directory / "policy_package_data.json").write_text(
+            PolicyPackage(policy_package=SIM_POLICY_PACKAGE, install_delay=0).model_dump_json(indent=4)
+        )
+        with (directory / "gateways.jsonl").open('w') as f:
+            for gateway in self.gateway_configs(count, physical=physical):
+                f.write(gateway.model_dump_json(exclude_none=True) + "\n")
+        log.info(f"🧪  Simulator configuration for {count} gateways written to {directory}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local Smart-1 Cloud / Management / Sparks simulator")
+    parser.add_argument('--host', default="127.0.0.1", help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='Random extra latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=502, help='HTTP status of injected failures')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After of throttled requests')
+    parser.add_argument('--task-duration', type=float, default=1.0, help='publish/batch task seconds')
+    parser.add_argument('--install-duration', type=float, default=5.0, help='install-policy task seconds')
+    parser.add_argument('--install-failure-rate', type=float, default=0.0,
+                        help='Fraction of install-policy targets that fail')
+    parser.add_argument('--clish-duration', type=float, default=0.0, help='Seconds per run-clish-command')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the fault injection')
+    parser.add_argument('--gateways', type=int, default=10, help='Gateways in the written inventory')
+    parser.add_argument('--config-dir', default=None,
+                        help='Write auth_data.json, policy_package_data.json and gateways.jsonl here')
+    args = parser.parse_args()
+
+    simulator = Simulator(SimulatorConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        task_duration=args.task_duration,
+        install_duration=args.install_duration,
+        install_failure_rate=args.install_failure_rate,
+        clish_duration=args.clish_duration,
+        seed=args.seed
+    ), host=args.host, port=args.port)
+    if args.config_dir:
+        simulator.write_config(args.config_dir, args.gateways)
+    simulator.start()
+    try:
+        while True:
+            time.sleep(60)
+            log.info(f"🧪  Simulator stats: {json.dumps(simulator.stats())}")
+    except KeyboardInterrupt:
+        simulator.stop()
@@ -6,7 +6,7 @@ Provides a robust interface for managing gateways in Check Point Smart-1 Cloud,
 including registration, deletion, and listing operations.
 
 Features:
-- Secure authentication with token management
+- Secure authentication with token caching and proactive refresh
 - Full error handling and retry logic
 - Type hints and detailed documentation
 - Configurable timeouts and retries
@@ -19,16 +19,25 @@ https://app.swaggerhub.com/apis-docs/Check-Point/smart-1_cloud_api/1.0.0
 import requests
 import json
 import time
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
 from requests.exceptions import RequestException
 from .logger_main import log
+from .metrics import metrics
+from .retry_policy import RetryPolicy
+from .rate_limiter import RateLimiter, shared_rate_limiter
+from .credential_cache import (
+    CredentialCache, credential_key, jwt_expiry, REFRESH_MARGIN, MIN_REMAINING
+)
 
 # API Constants
 AUTH_ENDPOINT = "/auth/external"
 GATEWAYS_ENDPOINT = "/app/maas/api/v1/gateways"
 DEFAULT_TIMEOUT = 30  # seconds
 MAX_RETRIES = 3
-RETRY_DELAY = 5 # seconds
+DEFAULT_TOKEN_LIFETIME = 3600  # seconds, used when the token carries no expiry
+LIST_PAGE_SIZE = 500  # Gateways per page of the paged gateway listing
 
 class Smart1CloudAPI:
     """Client for Smart-1 Cloud Gateway Management API"""
@@ -38,7 +47,10 @@ class Smart1CloudAPI:
         client_id: str,
         access_key: str,
         portal_url: str,
-        timeout: int = DEFAULT_TIMEOUT
+        timeout: int = DEFAULT_TIMEOUT,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache_dir: Optional[str] = None
     ):
         """
         Initialize API client
@@ -48,11 +60,16 @@ class Smart1CloudAPI:
             access_key: API access key from Smart-1 Cloud
             portal_url: Base URL of Smart-1 Cloud portal
             timeout: Request timeout in seconds
+            retry_policy: Retry/backoff rules (defaults to MAX_RETRIES retries)
+            rate_limiter: Request limiter (defaults to the process-wide limiter)
+            cache_dir: Directory used to persist the token between runs
         """
         self.client_id = client_id
         self.access_key = access_key
         self.base_url = portal_url.rstrip('/')
         self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=MAX_RETRIES, timeout=timeout)
+        self.rate_limiter = rate_limiter or shared_rate_limiter
         self.session = requests.Session()
         self.session.headers.update({
             'Content-Type': 'application/json',
@@ -60,35 +77,82 @@ class Smart1CloudAPI:
         })
         self._auth_token: Optional[str] = None
         self._token_expiry: Optional[float] = None
+        self._auth_lock = threading.Lock()  # Client is shared by worker threads
+        self.credentials = CredentialCache.shared(cache_dir)
+        self._token_key = credential_key("token", self.base_url, client_id, access_key)
+        self._refresh_timer: Optional[threading.Timer] = None
 
-    def _authenticate(self) -> None:
-        """Obtain and manage authentication token"""
+    def _authenticate(self, stale: Optional[str] = None) -> None:
+        """
+        Obtain and manage authentication token
+
+        Args:
+            stale: Token to replace (rejected by the server or about to expire)
+        """
         try:
-            if self._token_valid():
+            if self._token_valid() and self._auth_token != stale:
                 return
 
-            log.debug("Acquiring new authentication token")
-            auth_url = f"{self.base_url}{AUTH_ENDPOINT}"
-            payload = json.dumps({
-                "clientId": self.client_id,
-                "accessKey": self.access_key
-            })
+            with self._auth_lock:
+                if self._token_valid() and self._auth_token != stale:
+                    return  # Another thread refreshed it meanwhile
 
-            response = self._execute_request(
-                "POST", auth_url, payload=payload, auth_required=False
-            )
-            
-            self._auth_token = response['data']['token']
-            self._token_expiry = time.time() + 3600  # 1 hour expiration
-            self.session.headers.update({'Authorization': f"Bearer {self._auth_token}"})
+                cached = self.credentials.get_token(self._token_key)
+                if cached and cached[0] != stale:
+                    log.debug("Using cached authentication token")
+                    token, expiry = cached
+                else:
+                    token, expiry = self._request_token()
+                    self.credentials.put_token(self._token_key, token, expiry)
+
+                self._auth_token = token
+                self._token_expiry = expiry
+                self.session.headers.update({'Authorization': f"Bearer {token}"})
+                self._schedule_refresh()
 
         except Exception as e:
             log.error(f"Authentication failed: {str(e)}")
             raise
 
+    def _request_token(self) -> Tuple[str, float]:
+        """Log in and return a new token with its expiry"""
+        log.debug("Acquiring new authentication token")
+        auth_url = f"{self.base_url}{AUTH_ENDPOINT}"
+        payload = json.dumps({
+            "clientId": self.client_id,
+            "accessKey": self.access_key
+        })
+
+        response = self._execute_request(
+            "POST", auth_url, payload=payload, auth_required=False, idempotent=True
+        )
+
+        token = response['data']['token']
+        return token, jwt_expiry(token) or time.time() + DEFAULT_TOKEN_LIFETIME
+
+    def _schedule_refresh(self) -> None:
+        """Renew the token in the background shortly before it expires"""
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+        lifetime = self._token_expiry - time.time()
+        # Short-lived tokens are renewed at half-life instead
+        delay = max(lifetime - REFRESH_MARGIN, lifetime / 2, 0)
+        self._refresh_timer = threading.Timer(delay, self._refresh_token)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _refresh_token(self) -> None:
+        """Background token renewal; failures fall back to renewing on demand"""
+        try:
+            self._authenticate(stale=self._auth_token)
+            log.debug("Authentication token refreshed")
+        except Exception as e:
+            log.warning(f"Background token refresh failed: {str(e)}")
+
     def _token_valid(self) -> bool:
         """Check if current token is still valid"""
-        return self._auth_token and self._token_expiry and time.time() < self._token_expiry
+        return bool(self._auth_token and self._token_expiry
+                    and time.time() < self._token_expiry - MIN_REMAINING)
 
     def _execute_request(
         self,
@@ -96,17 +160,20 @@ class Smart1CloudAPI:
         url: str,
         payload: Optional[str] = None,
         auth_required: bool = True,
-        retries: int = MAX_RETRIES
+        params: Optional[Dict] = None,
+        idempotent: Optional[bool] = None
     ) -> Dict:
         """
-        Execute API request with retry logic
+        Execute API request under the shared retry policy
         
         Args:
             method: HTTP method (GET/POST/DELETE)
             url: Full API endpoint URL
             payload: Request payload
             auth_required: Whether authentication is required
-            retries: Number of remaining retry attempts
+            params: Query string parameters
+            idempotent: Whether the call may be resent after an ambiguous
+                failure. Defaults to True for everything except POST
             
         Returns:
             dict: Parsed JSON response
@@ -114,32 +181,52 @@ class Smart1CloudAPI:
         Raises:
             RequestException: On permanent failure
         """
-        try:
-            if auth_required:
-                self._authenticate()
-
-            log.debug(f"Executing {method} request to {url}")
-            response = self.session.request(
-                method=method,
-                url=url,
-                data=payload,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            return response.json()
-
-        except RequestException as e:
-            if retries > 0:
-                log.warning(f"Request failed, retrying... ({retries} left)")
-                time.sleep(RETRY_DELAY)
-                return self._execute_request(
-                    method, url, payload, auth_required, retries-1
-                )
-            log.error(f"Permanent request failure: {str(e)}")
-            raise
-        except json.JSONDecodeError:
-            log.error("Failed to parse JSON response")
-            raise
+        with metrics.timer("api_call_seconds", client="cloud", endpoint=self._endpoint_label(url),
+                           method=method):
+            if idempotent is None:
+                idempotent = method.upper() != "POST"
+            try:
+                if auth_required:
+                    self._authenticate()
+
+                log.debug("Executing %s request to %s", method, url)
+                token = self._auth_token
+                response = self._send(method, url, payload, params, idempotent, auth_required)
+                if response.status_code == 401 and auth_required:
+                    log.info("Authentication token rejected, re-authenticating")
+                    self._authenticate(stale=token)
+                    response = self._send(method, url, payload, params, idempotent, auth_required)
+                response.raise_for_status()
+                return response.json()
+
+            except RequestException as e:
+                log.error(f"Permanent request failure: {str(e)}")
+                raise
+            except json.JSONDecodeError:
+                log.error("Failed to parse JSON response")
+                raise
+
+    @staticmethod
+    def _endpoint_label(url: str) -> str:
+        """Metrics label of a portal URL, without the gateway name"""
+        path = urlsplit(url).path
+        if path.startswith(f"{GATEWAYS_ENDPOINT}/"):
+            gateway_path = path[len(GATEWAYS_ENDPOINT) + 1:].split('/', 1)
+            return f"{GATEWAYS_ENDPOINT}/{{name}}" + (f"/{gateway_path[1]}" if len(gateway_path) > 1 else "")
+        return path
+
+    def _send(self, method: str, url: str, payload: Optional[str], params: Optional[Dict],
+              idempotent: bool, auth_required: bool) -> requests.Response:
+        """Send one request under the retry policy (status not checked)"""
+        return self.retry_policy.request(
+            self.session, method, url,
+            idempotent=idempotent,
+            rate_limiter=self.rate_limiter,
+            rate_class="gateways" if auth_required else "auth",
+            endpoint=self._endpoint_label(url),
+            data=payload,
+            params=params
+        )
 
     def register_gateway(self, gw_name: str) -> Dict:
         """
@@ -199,18 +286,88 @@ class Smart1CloudAPI:
             log.error(f"Gateway deletion error: {str(e)}")
             raise
 
-    def list_gateways(self) -> List[Dict]:
+    def list_gateways(self, name: Optional[str] = None, status: Optional[str] = None) -> List[Dict]:
         """
-        Retrieve list of all configured gateways
+        Retrieve list of all configured gateways (see iter_gateways for large tenants)
         
+        Args:
+            name: Only gateways whose name contains this text
+            status: Only gateways in this status
+
         Returns:
             list: Gateway objects with status information
         """
+        return list(self.iter_gateways(name=name, status=status))
+
+    @staticmethod
+    def _list_params(offset: int, page_size: int, name: Optional[str], status: Optional[str]) -> Dict:
+        """Query string of one page of the gateway list with its server-side filters"""
+        params = {"offset": offset, "limit": page_size, "name": name, "status": status}
+        return {key: str(value) for key, value in params.items() if value is not None}
+
+    @staticmethod
+    def _matches(gateway: Dict, name: Optional[str], status: Optional[str]) -> bool:
+        """Apply the filters locally as well, for servers that ignore them"""
+        if name is not None and name.lower() not in str(gateway.get('name', '')).lower():
+            return False
+        if status is not None and status.lower() not in (
+                str(gateway.get('status', '')).lower(), str(gateway.get('statusDetails', '')).lower()):
+            return False
+        return True
+
+    @staticmethod
+    def _last_page(objects: List[Dict], data: Dict, offset: int, page_size: int) -> bool:
+        """
+        Whether a page (ending at offset) was the last one of the listing
+
+        The reported total wins: servers may cap the page size below the
+        requested one, so a short page only ends a listing without a total.
+        """
+        if not objects:
+            return True
+        total = data.get('total')
+        if total is not None:
+            return offset >= total
+        return len(objects) != page_size
+
+    def iter_gateways(self, page_size: int = LIST_PAGE_SIZE, name: Optional[str] = None,
+                      status: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Page through the gateway list, yielding each gateway as its page arrives
+
+        Only one page is held in memory. The filters are sent to the server
+        and applied locally as well. Stops at the reported total (or on a
+        short page when no total is reported); a server that ignores the
+        paging parameters is read once.
+
+        Args:
+            page_size: Gateways requested per page
+            name: Only gateways whose name contains this text
+            status: Only gateways in this status
+
+        Yields:
+            dict: Gateway objects with status information
+        """
+        url = f"{self.base_url}{GATEWAYS_ENDPOINT}"
+        offset = 0
+        first_of_page = None
         try:
-            log.debug("Fetching gateway list")
-            response = self._execute_request("GET", f"{self.base_url}{GATEWAYS_ENDPOINT}")
-            return response.get('data', {}).get('objects', [])
-            
+            while True:
+                log.debug("Fetching gateway list page at offset %d", offset)
+                params = self._list_params(offset, page_size, name, status)
+                response = self._execute_request("GET", url, params=params)
+                data = response.get('data', {})
+                objects = data.get('objects', [])
+                if objects and objects[0] == first_of_page:
+                    break  # Offset ignored: the same page again
+                for gateway in objects:
+                    if self._matches(gateway, name, status):
+                        yield gateway
+                offset += len(objects)
+                if self._last_page(objects, data, offset, page_size):
+                    break
+                first_of_page = objects[0]
+
         except Exception as e:
             log.error(f"Failed to list gateways: {str(e)}")
             raise
@@ -226,7 +383,7 @@ class Smart1CloudAPI:
             dict: Detailed status information
         """
         try:
-            log.debug(f"Fetching status for gateway: {gw_name}")
+            log.debug("Fetching status for gateway: %s", gw_name)
             url = f"{self.base_url}{GATEWAYS_ENDPOINT}/{gw_name}/status"
             response = self._execute_request("GET", url)
             return response.get('data', {})
@@ -237,6 +394,7 @@ class Smart1CloudAPI:
 
 if __name__ == '__main__':
     import argparse
+    from .fleet_status import FleetStatus, DEFAULT_WATCH_INTERVAL, DETAIL_WORKERS
     
     parser = argparse.ArgumentParser(
         description="Smart-1 Cloud Gateway Management CLI"
@@ -244,8 +402,17 @@ if __name__ == '__main__':
     parser.add_argument('-i', '--client-id', required=True, help='API Client ID')
     parser.add_argument('-k', '--access-key', required=True, help='API Access Key')
     parser.add_argument('-p', '--portal-url', required=True, help='Portal URL')
-    parser.add_argument('-n', '--gw-name', help='Gateway name')
-    parser.add_argument('command', choices=['register', 'delete', 'list', 'status'],
+    parser.add_argument('-n', '--gw-name', help='Gateway name (list: only names containing it)')
+    parser.add_argument('-s', '--status', help='list: only gateways in this status')
+    parser.add_argument('--cache-dir', default='.cache',
+                        help='Directory used to reuse the authentication token between runs')
+    parser.add_argument('-a', '--all', action='store_true',
+                        help='status: show every gateway from the paged gateway list')
+    parser.add_argument('--interval', type=float, default=DEFAULT_WATCH_INTERVAL,
+                        help='watch: seconds between refreshes')
+    parser.add_argument('-w', '--workers', type=int, default=DETAIL_WORKERS,
+                        help='watch: concurrent detail requests for gateways whose status changed')
+    parser.add_argument('command', choices=['register', 'delete', 'list', 'status', 'watch'],
                         help='Operation to perform')
     
     args = parser.parse_args()
@@ -254,7 +421,8 @@ if __name__ == '__main__':
         api = Smart1CloudAPI(
             client_id=args.client_id,
             access_key=args.access_key,
-            portal_url=args.portal_url
+            portal_url=args.portal_url,
+            cache_dir=args.cache_dir
         )
         
         if args.command == 'register':
@@ -269,16 +437,25 @@ if __name__ == '__main__':
             api.delete_gateway(args.gw_name)
             
         elif args.command == 'list':
-            gateways = api.list_gateways()
+            # Printed page by page while the listing is still being read
             print("Configured Gateways:")
-            for gw in gateways:
+            for gw in api.iter_gateways(name=args.gw_name, status=args.status):
                 print(f" - {gw['name']}: {gw['statusDetails']}")
                 
+        elif args.command == 'status' and args.all:
+            fleet = FleetStatus(api)
+            for change in fleet.sweep():
+                print(change.describe())
+            print(fleet.describe())
+
         elif args.command == 'status':
             if not args.gw_name:
-                raise ValueError("Gateway name required for status check")
+                raise ValueError("Gateway name required for status check (or --all)")
             status = api.get_gateway_status(args.gw_name)
             print(json.dumps(status, indent=2))
+
+        elif args.command == 'watch':
+            FleetStatus(api, workers=args.workers).watch(args.interval, lambda line: print(line, flush=True))
             
     except Exception as e:
         log.error(f"Operation failed: {str(e)}")
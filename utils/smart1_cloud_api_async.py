@@ -0,0 +1,253 @@
+"""
+Smart-1 Cloud Gateway Object Management Client (asyncio)
+
+Async counterpart of Smart1CloudAPI with the same method surface, built on
+aiohttp so thousands of in-flight calls share one event loop.
+
+Usage:
+    async with AsyncSmart1CloudAPI(client_id, access_key, portal_url) as api:
+        registration = await api.register_gateway("sparks1")
+"""
+
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional
+from requests.exceptions import RequestException
+from .logger_main import log
+from .metrics import metrics
+from .async_http import AsyncResponse, async_request, create_session
+from .retry_policy import RetryPolicy
+from .rate_limiter import RateLimiter, shared_rate_limiter
+from .credential_cache import CredentialCache, credential_key, jwt_expiry, MIN_REMAINING
+from .smart1_cloud_api import (
+    Smart1CloudAPI, AUTH_ENDPOINT, GATEWAYS_ENDPOINT, DEFAULT_TIMEOUT, MAX_RETRIES, DEFAULT_TOKEN_LIFETIME,
+    LIST_PAGE_SIZE
+)
+
+
+class AsyncSmart1CloudAPI:
+    """Asyncio client for Smart-1 Cloud Gateway Management API"""
+
+    def __init__(
+        self,
+        client_id: str,
+        access_key: str,
+        portal_url: str,
+        timeout: int = DEFAULT_TIMEOUT,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache_dir: Optional[str] = None
+    ):
+        """
+        Initialize API client (see Smart1CloudAPI for the arguments)
+        """
+        self.client_id = client_id
+        self.access_key = access_key
+        self.base_url = portal_url.rstrip('/')
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=MAX_RETRIES, timeout=timeout)
+        self.rate_limiter = rate_limiter or shared_rate_limiter
+        self.session = None
+        self._auth_token: Optional[str] = None
+        self._token_expiry: Optional[float] = None
+        self._auth_lock = asyncio.Lock()
+        self.credentials = CredentialCache.shared(cache_dir)
+        self._token_key = credential_key("token", self.base_url, client_id, access_key)
+
+    async def __aenter__(self) -> 'AsyncSmart1CloudAPI':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the underlying HTTP session"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _session(self):
+        """Create the aiohttp session lazily inside the running loop"""
+        if self.session is None:
+            self.session = create_session({
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            })
+        return self.session
+
+    async def _authenticate(self, stale: Optional[str] = None) -> None:
+        """Obtain and manage authentication token, replacing a stale one"""
+        try:
+            if self._token_valid() and self._auth_token != stale:
+                return
+
+            async with self._auth_lock:
+                if self._token_valid() and self._auth_token != stale:
+                    return  # Another coroutine refreshed it meanwhile
+
+                cached = self.credentials.get_token(self._token_key)
+                if cached and cached[0] != stale:
+                    log.debug("Using cached authentication token")
+                    self._auth_token, self._token_expiry = cached
+                    return
+
+                log.debug("Acquiring new authentication token")
+                payload = json.dumps({
+                    "clientId": self.client_id,
+                    "accessKey": self.access_key
+                })
+                response = await self._execute_request(
+                    "POST", f"{self.base_url}{AUTH_ENDPOINT}", payload=payload,
+                    auth_required=False, idempotent=True
+                )
+
+                self._auth_token = response['data']['token']
+                self._token_expiry = jwt_expiry(self._auth_token) or time.time() + DEFAULT_TOKEN_LIFETIME
+                self.credentials.put_token(self._token_key, self._auth_token, self._token_expiry)
+
+        except Exception as e:
+            log.error(f"Authentication failed: {str(e)}")
+            raise
+
+    def _token_valid(self) -> bool:
+        """Check if current token is still valid"""
+        return bool(self._auth_token and self._token_expiry
+                    and time.time() < self._token_expiry - MIN_REMAINING)
+
+    async def _execute_request(
+        self,
+        method: str,
+        url: str,
+        payload: Optional[str] = None,
+        auth_required: bool = True,
+        params: Optional[Dict] = None,
+        idempotent: Optional[bool] = None
+    ) -> Dict:
+        """Execute API request under the shared retry policy"""
+        with metrics.timer("api_call_seconds", client="cloud", endpoint=Smart1CloudAPI._endpoint_label(url),
+                           method=method):
+            if idempotent is None:
+                idempotent = method.upper() != "POST"
+            try:
+                if auth_required:
+                    await self._authenticate()
+
+                log.debug("Executing %s request to %s", method, url)
+                token = self._auth_token
+                response = await self._send(method, url, payload, params, idempotent, auth_required)
+                if response.status_code == 401 and auth_required:
+                    log.info("Authentication token rejected, re-authenticating")
+                    await self._authenticate(stale=token)
+                    response = await self._send(method, url, payload, params, idempotent, auth_required)
+                response.raise_for_status()
+                return response.json()
+
+            except RequestException as e:
+                log.error(f"Permanent request failure: {str(e)}")
+                raise
+            except json.JSONDecodeError:
+                log.error("Failed to parse JSON response")
+                raise
+
+    async def _send(self, method: str, url: str, payload: Optional[str], params: Optional[Dict],
+                    idempotent: bool, auth_required: bool) -> AsyncResponse:
+        """Send one request under the retry policy (status not checked)"""
+        headers = {'Authorization': f"Bearer {self._auth_token}"} if auth_required else {}
+        return await async_request(
+            self.retry_policy, self._session(), method, url,
+            idempotent=idempotent,
+            rate_limiter=self.rate_limiter,
+            rate_class="gateways" if auth_required else "auth",
+            endpoint=Smart1CloudAPI._endpoint_label(url),
+            data=payload,
+            params=params,
+            headers=headers
+        )
+
+    async def register_gateway(self, gw_name: str) -> Dict:
+        """Register a new gateway in Smart-1 Cloud"""
+        try:
+            log.info(f"Registering gateway: {gw_name}")
+            payload = json.dumps({
+                "name": gw_name,
+                "description": "Automatically registered via Python API"
+            })
+            response = await self._execute_request("POST", f"{self.base_url}{GATEWAYS_ENDPOINT}", payload)
+
+            if not response.get('success'):
+                error_msg = response.get('message', 'Unknown registration error')
+                raise ValueError(f"Registration failed: {error_msg}")
+
+            token = response['data']['token']
+            log.info(f"Registered gateway: {gw_name} successfully. Token: {token[:8]}...")
+            return {
+                'token': token,
+                'gateway_id': response['data']['id'],
+                'details': response['data']
+            }
+
+        except Exception as e:
+            log.error(f"Gateway registration error: {str(e)}")
+            raise
+
+    async def delete_gateway(self, gw_name: str) -> None:
+        """Delete an existing gateway"""
+        try:
+            log.info(f"Deleting gateway: {gw_name}")
+            response = await self._execute_request(
+                "DELETE", f"{self.base_url}{GATEWAYS_ENDPOINT}/{gw_name}",
+                params={'deleteObjectFromConfiguration': 'true'}
+            )
+            if response.get('success'):
+                log.info(f"Deleted the gateway {gw_name} Successfully")
+            else:
+                raise ValueError(response.get('message', 'Unknown deletion error'))
+
+        except Exception as e:
+            log.error(f"Gateway deletion error: {str(e)}")
+            raise
+
+    async def list_gateways(self, name: Optional[str] = None, status: Optional[str] = None) -> List[Dict]:
+        """Retrieve list of all configured gateways (see iter_gateways for large tenants)"""
+        return [gateway async for gateway in self.iter_gateways(name=name, status=status)]
+
+    async def iter_gateways(self, page_size: int = LIST_PAGE_SIZE, name: Optional[str] = None,
+                            status: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Page through the gateway list (see Smart1CloudAPI.iter_gateways)"""
+        url = f"{self.base_url}{GATEWAYS_ENDPOINT}"
+        offset = 0
+        first_of_page = None
+        try:
+            while True:
+                log.debug("Fetching gateway list page at offset %d", offset)
+                params = Smart1CloudAPI._list_params(offset, page_size, name, status)
+                response = await self._execute_request("GET", url, params=params)
+                data = response.get('data', {})
+                objects = data.get('objects', [])
+                if objects and objects[0] == first_of_page:
+                    break  # Offset ignored: the same page again
+                for gateway in objects:
+                    if Smart1CloudAPI._matches(gateway, name, status):
+                        yield gateway
+                offset += len(objects)
+                if Smart1CloudAPI._last_page(objects, data, offset, page_size):
+                    break
+                first_of_page = objects[0]
+
+        except Exception as e:
+            log.error(f"Failed to list gateways: {str(e)}")
+            raise
+
+    async def get_gateway_status(self, gw_name: str) -> Dict:
+        """Get detailed status of a specific gateway"""
+        try:
+            log.debug("Fetching status for gateway: %s", gw_name)
+            response = await self._execute_request(
+                "GET", f"{self.base_url}{GATEWAYS_ENDPOINT}/{gw_name}/status"
+            )
+            return response.get('data', {})
+
+        except Exception as e:
+            log.error(f"Failed to get gateway status: {str(e)}")
+            raise
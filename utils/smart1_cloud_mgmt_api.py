@@ -11,119 +11,577 @@ API Documentation:
 https://sc1.checkpoint.com/documents/latest/APIs/
 """
 
-from typing import Dict, Optional, List
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, List, Set, Tuple
 import requests
 import json
+import threading
 import time
 from .logger_main import log
-from tqdm import tqdm
+from .metrics import metrics
+from .tracing import tracer
+from .wait import wait_until, DEFAULT_READY_TIMEOUT
+from .fleet import TaskResult, run_task
+from .load_config_file import GatewayConfig
+from .lookup_cache import LookupCache, DEFAULT_CACHE_TTL
+from .task_monitor import TaskMonitor, TaskFailedError, DEFAULT_TASK_TIMEOUT
+from .retry_policy import RetryPolicy
+from .rate_limiter import RateLimiter, shared_rate_limiter
+from .credential_cache import CredentialCache, credential_key
+
+SIC_COMMUNICATING = "communicating"
+DEFAULT_TIMEOUT = 60  # seconds
+# Commands that only read or overwrite state and can be resent safely
+IDEMPOTENT_PREFIXES = ("show-", "set-")
+IDEMPOTENT_COMMANDS = {"logout", "discard", "keepalive"}
+NON_IDEMPOTENT_COMMANDS = {"set-objects-batch"}  # Starts a task, a resend would start another one
+SHOW_PAGE_LIMIT = 500  # Maximum page size of show-* list commands
+BULK_BATCH_SIZE = 100  # Objects per set-objects-batch request
+DEFAULT_SESSION_TIMEOUT = 600  # seconds, web_api default when login does not report it
+# Commands that never leave unpublished changes behind in the session
+SESSION_CLEAN_COMMANDS = {"login", "logout", "keepalive", "publish", "discard", "install-policy"}
+INSTALL_PARALLEL_WAVES = 2  # install-policy tasks running at the same time in sharded installs
+INSTALL_RETRIES = 1  # Repeated install attempts for targets that failed
+# Task entry keys naming the object or gateway a batch or install result belongs to
+TASK_DETAIL_NAME_KEYS = ("name", "gatewayName", "gateway-name")
+# install-policy layers of each policy type
+POLICY_TYPES: Dict[str, Tuple[str, ...]] = {
+    "all": ("access", "threat-prevention"),
+    "access": ("access",),
+    "threat-prevention": ("threat-prevention",),
+}
+DEFAULT_POLICY_TYPE = "all"
+# Per layer: prefix of the gateway's "policy" fields and the show-package list of its layers
+POLICY_LAYER_FIELDS = {
+    "access": ("access-policy", "access-layers"),
+    "threat-prevention": ("threat-policy", "threat-layers"),
+}
+
+
+def sic_communicating(gateway_info: Dict) -> bool:
+    """Whether a gateway object reports SIC trust with the management server"""
+    return gateway_info.get('sic-state', '').lower() == SIC_COMMUNICATING
+
+
+def policy_current(gateway_object: Optional[Dict], policy_package: str, revision: float,
+                   policy_type: str) -> bool:
+    """Whether every layer of the policy type was installed from the package after its last change"""
+    policy = (gateway_object or {}).get('policy') or {}
+    for layer in POLICY_TYPES[policy_type]:
+        prefix = POLICY_LAYER_FIELDS[layer][0]
+        installed_at = (policy.get(f'{prefix}-installation-date') or {}).get('posix') or 0
+        if not policy.get(f'{prefix}-installed') or policy.get(f'{prefix}-name') != policy_package \
+                or installed_at < revision:
+            return False
+    return True
+
+
+class InstallWaves:
+    """
+    Per-gateway bookkeeping of a sharded policy installation
+
+    Splits the targets into waves, queues failed targets for another attempt
+    until their retries are used up and reports every final result once.
+    """
+
+    def __init__(self, targets: List[str], shard_size: Optional[int], retries: int,
+                 on_result: Optional[Callable[[TaskResult], None]] = None):
+        self.targets = targets
+        self.shard_size = shard_size or max(1, len(targets))
+        self.retries = retries
+        self.on_result = on_result
+        self.pending: Deque[List[str]] = deque(self._split(targets))
+        self.results: Dict[str, TaskResult] = {}
+        self._attempts: Dict[str, int] = {name: 0 for name in targets}
+        self._since: Dict[str, float] = {}
+
+    def _split(self, names: List[str]) -> List[List[str]]:
+        return [names[offset:offset + self.shard_size] for offset in range(0, len(names), self.shard_size)]
+
+    def next_wave(self) -> List[str]:
+        """Take the next wave to install and start the clock of its gateways"""
+        wave = self.pending.popleft()
+        now = time.monotonic()
+        for name in wave:
+            self._since.setdefault(name, now)
+        return wave
+
+    def settle(self, wave: List[str], failures: Dict[str, str]) -> None:
+        """Report the wave's gateways, queueing failed ones for a retry while attempts are left"""
+        retry = []
+        for name in wave:
+            error = failures.get(name)
+            if error is not None and self._attempts[name] < self.retries:
+                self._attempts[name] += 1
+                retry.append(name)
+            else:
+                self._report(name, error)
+        if retry:
+            log.warning(f"Retrying policy installation on {len(retry)} gateways: {', '.join(retry)}")
+            self.pending.extend(self._split(retry))
+
+    def fail_remaining(self, error: str) -> None:
+        """Report every gateway without a result as failed"""
+        self.pending.clear()
+        for name in self.targets:
+            if name not in self.results:
+                self._report(name, error)
+
+    def _report(self, name: str, error: Optional[str]) -> None:
+        result = TaskResult(name=name, success=error is None, error=error,
+                            duration=time.monotonic() - self._since.get(name, time.monotonic()))
+        self.results[name] = result
+        if self.on_result:
+            self.on_result(result)
+
+    def ordered_results(self) -> List[TaskResult]:
+        """One result per target, in input order"""
+        return [self.results[name] for name in self.targets]
 
 class ManagementAPI:
     """Client for Check Point Gateway operations"""
     
-    def __init__(self, instance: str, context: str, api_key: str):
-        self.base_url = f"https://{instance}.maas.checkpoint.com/{context}/web_api"
+    def __init__(self, instance: str, context: str, api_key: str,
+                 cache_ttl: float = DEFAULT_CACHE_TTL, cache_dir: Optional[str] = None,
+                 show_progress: Optional[bool] = None, retry_policy: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None, base_url: Optional[str] = None,
+                 task_timeout: float = DEFAULT_TASK_TIMEOUT):
+        # base_url overrides the tenant's web_api address (e.g. a local simulator)
+        self.base_url = (base_url or f"https://{instance}.maas.checkpoint.com/{context}/web_api").rstrip('/')
         self.api_key = api_key
+        # Tenant-static lookups, shared by every client of the same tenant
+        self.lookups = LookupCache.shared(f"{instance}_{context}", cache_ttl, cache_dir)
+        # Idle sessions are pooled per tenant and reused instead of logging in again
+        self.credentials = CredentialCache.shared(cache_dir)
+        self._session_key = credential_key("sid", self.base_url, api_key)
         self.sid: Optional[str] = None
+        self._session_timeout: float = DEFAULT_SESSION_TIMEOUT
+        self._last_used = 0.0
+        self._dirty = False  # Session holds unpublished changes
+        self._staged_changes = 0  # Successful changing commands sent in this client's sessions
+        self._session_lock = threading.RLock()
+        self.retry_policy = retry_policy or RetryPolicy(timeout=DEFAULT_TIMEOUT)
+        self.rate_limiter = rate_limiter or shared_rate_limiter
         self.session = requests.Session()
         self.session.headers.update({'Content-Type': 'application/json'})
+        self.task_monitor = TaskMonitor(self._execute_api_call, show_progress=show_progress,
+                                        task_timeout=task_timeout)
 
+    @staticmethod
+    def _is_idempotent(endpoint: str) -> bool:
+        """Whether a web_api command can be resent safely after an ambiguous failure"""
+        if endpoint in NON_IDEMPOTENT_COMMANDS:
+            return False
+        return endpoint.startswith(IDEMPOTENT_PREFIXES) or endpoint in IDEMPOTENT_COMMANDS
 
-    def _login(self) -> None:
-        """Authenticate with the management server"""
+    @staticmethod
+    def _rate_class(endpoint: str) -> str:
+        """Rate limiter endpoint class of a web_api command"""
+        if endpoint in ("login", "logout"):
+            return "auth"
+        if endpoint == "show-task":
+            return "show_task"
+        return "web_api_read" if endpoint.startswith("show-") else "web_api_write"
+
+    def _send(self, endpoint: str, payload: Optional[Dict] = None,
+              sid: Optional[str] = None) -> requests.Response:
+        """Send a web_api command under the retry policy (status not checked)"""
+        return self.retry_policy.request(
+            self.session, "POST", f"{self.base_url}/{endpoint}",
+            idempotent=self._is_idempotent(endpoint),
+            rate_limiter=self.rate_limiter,
+            rate_class=self._rate_class(endpoint),
+            endpoint=endpoint,
+            json=payload if payload is not None else {},
+            headers={'X-chkp-sid': sid} if sid else None
+        )
+
+    def _post(self, endpoint: str, payload: Optional[Dict] = None) -> requests.Response:
+        """Send a web_api command, logging in again once if the session expired"""
+        sid = self.sid
+        response = self._send(endpoint, payload)
+        if response.status_code == 401 and sid and endpoint not in ("login", "logout"):
+            if self._dirty:
+                log.error("Management session expired with unpublished changes")
+                return response
+            log.info("Management session expired, logging in again")
+            with self._session_lock:
+                if self.sid == sid:
+                    self._new_session()
+            response = self._send(endpoint, payload)
+
+        if response.status_code < 400:
+            self._last_used = time.time()
+            if endpoint == "discard":
+                self._dirty = False
+            elif not endpoint.startswith("show-") and endpoint not in SESSION_CLEAN_COMMANDS:
+                self._dirty = True
+                self._staged_changes += 1
+        return response
+
+    def _attach_session(self, sid: str, timeout: float) -> None:
+        """Send subsequent commands in the given session"""
+        self.sid = sid
+        self._session_timeout = timeout
+        self._last_used = time.time()
+        self._dirty = False
+        self.session.headers.update({'X-chkp-sid': sid})
+
+    def _new_session(self) -> None:
+        """Log in and attach the new session"""
         try:
-            response = self.session.post(
-                f"{self.base_url}/login",
-                json={"api-key": self.api_key}
-            )
+            response = self._send("login", {"api-key": self.api_key})
             response.raise_for_status()
-            self.sid = response.json()['sid']
-            self.session.headers.update({'X-chkp-sid': self.sid})
+            login = response.json()
+            self._attach_session(login['sid'], login.get('session-timeout', DEFAULT_SESSION_TIMEOUT))
             log.debug("Successfully authenticated with management API")
-            
+
         except requests.exceptions.RequestException as e:
             log.error(f"Authentication failed: {str(e)}")
             raise
 
+    def _login(self) -> None:
+        """Attach a management session, reusing an idle pooled one when possible"""
+        with self._session_lock:
+            if self.sid:
+                return
+            pooled = self.credentials.checkout_session(self._session_key)
+            if pooled:
+                self._attach_session(*pooled)
+            else:
+                self._new_session()
+
     def _logout(self) -> None:
-        """Terminate management session"""
-        try:
-            self.session.post(f"{self.base_url}/logout")
-            log.debug("Successfully logged out")
-        except requests.exceptions.RequestException as e:
-            log.warning(f"Logout failed: {str(e)}")
+        """Release the management session back to the idle pool"""
+        with self._session_lock:
+            if not self.sid:
+                return
+            if self._dirty:
+                self._discard()
+            try:
+                if self._dirty:  # Never hand unpublished changes to the next user
+                    self._send("logout")
+                    log.debug("Successfully logged out")
+                else:
+                    self.credentials.release_session(
+                        self._session_key, self.sid, self._session_timeout, self._last_used
+                    )
+            except requests.exceptions.RequestException as e:
+                log.warning(f"Logout failed: {str(e)}")
+            finally:
+                self.sid = None
+                self._dirty = False
+                self.session.headers.pop('X-chkp-sid', None)
+
+    def close(self) -> None:
+        """
+        Release the session; without a persisted cache, log out every pooled session
+
+        An in-memory pool ends with the process, so its sessions would
+        otherwise stay open on the server until they time out.
+        """
+        self._logout()
+        if self.credentials.persistent:
+            return
+        for sid in self.credentials.drain_sessions(self._session_key):
+            try:
+                self._send("logout", sid=sid)
+            except requests.exceptions.RequestException as e:
+                log.warning(f"Logout failed: {str(e)}")
 
     def _execute_api_call(self, endpoint: str, payload: Dict) -> Dict:
         """Generic API call handler with error checking"""
-        try:
-            response = self.session.post(
-                f"{self.base_url}/{endpoint}",
-                json=payload
-            )
-            response.raise_for_status()
-            return response.json()
+        with metrics.timer("api_call_seconds", client="management", endpoint=endpoint):
+            try:
+                response = self._post(endpoint, payload)
+                response.raise_for_status()
+                return response.json()
             
-        except requests.exceptions.HTTPError as e:
-            log.error(f"API call failed: {e.response.text}")
-            raise
-        except json.JSONDecodeError:
-            log.error("Invalid JSON response from server")
-            raise
+            except requests.exceptions.HTTPError as e:
+                log.error(f"API call failed: {e.response.text}")
+                raise
+            except json.JSONDecodeError:
+                log.error("Invalid JSON response from server")
+                raise
 
-    def configure_gateway(self, gw_name: str, version: str, net_type: str,
-                         hardware: str, sic_key: str) -> None:
-        """Full gateway configuration workflow"""
+    def _show_gateway(self, gw_name: str) -> Optional[Dict]:
+        """Return the gateway object, or None while it does not exist yet"""
+        response = self._post("show-simple-gateway", {"name": gw_name})
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def wait_for_gateway(self, gw_name: str, ready: Optional[Callable[[Dict], bool]] = None,
+                         timeout: float = DEFAULT_READY_TIMEOUT) -> Dict:
+        """
+        Poll show-simple-gateway until the object exists and matches a condition
+
+        Args:
+            gw_name: Gateway object name
+            ready: Optional predicate over the gateway object
+            timeout: Deadline in seconds
+
+        Returns:
+            dict: The gateway object that satisfied the condition
+        """
+        def check() -> Optional[Dict]:
+            gateway_info = self._show_gateway(gw_name)
+            if gateway_info is None or (ready and not ready(gateway_info)):
+                return None
+            return gateway_info
+
+        return wait_until(check, f"gateway object {gw_name}", timeout=timeout)
+
+    def wait_for_sic(self, gw_name: str, timeout: float = DEFAULT_READY_TIMEOUT) -> None:
+        """Wait until the management server communicates with the gateway over SIC"""
         try:
             self._login()
-            # Get SMS certificate details
-            sms_info = self._execute_api_call(
+            self.wait_for_gateway(gw_name, ready=sic_communicating, timeout=timeout)
+            log.info(f"SIC trust established with {gw_name}")
+        finally:
+            self._logout()
+
+    def is_sic_established(self, gw_name: str) -> bool:
+        """Check once whether the management server communicates with the gateway over SIC"""
+        try:
+            self._login()
+            gateway_info = self._show_gateway(gw_name)
+            return gateway_info is not None and sic_communicating(gateway_info)
+        finally:
+            self._logout()
+
+    def _get_sms_cn_name(self) -> str:
+        """Organisation part of the management server SIC name (cached per tenant)"""
+        return self.lookups.get("sms_cn_name", self._load_sms_cn_name)
+
+    def _load_sms_cn_name(self) -> str:
+        """Read the organisation part of the management server SIC name"""
+        sms_info = self._execute_api_call(
             "show-checkpoint-host",
             {"name": "Management_Service"}
+        )
+        sms_cn = sms_info['sic-name'].split(',')[1]
+        return sms_cn.split('=')[1]
+
+    def invalidate_lookups(self, key: Optional[str] = None) -> None:
+        """Forget cached tenant lookups (all of them when no key is given)"""
+        self.lookups.invalidate(key)
+
+    @staticmethod
+    def _simple_gateway_settings(gw_name: str, version: str, sic_key: str, sms_cn_name: str) -> Dict:
+        """Basic gateway properties (set-simple-gateway payload)"""
+        return {
+            "name": gw_name,
+            "one-time-password": sic_key,
+            "sic-name": f"CN={gw_name},O={sms_cn_name}",
+            "version": version,
+            "os-name": "Gaia Embedded"
+        }
+
+    @staticmethod
+    def _generic_gateway_settings(gateway_uid: str, version: str, net_type: str, hardware: str) -> Dict:
+        """Advanced appliance properties (set-generic-object payload)"""
+        return {
+            "uid": gateway_uid,
+            "applianceType": "slim_fw",
+            "svnVersionName": version,
+            "slimFwType": net_type,
+            "slimFwHardwareType": hardware,
+            "securityBladesTopologyMode": "TOPOLOGY_TABLE",
+            "vpn1": True,
+            "hideInternalInterfaces": True
+        }
+
+    def _stage_gateway(self, gw_name: str, version: str, net_type: str, hardware: str,
+                       sic_key: str, sms_cn_name: str, ready_timeout: float) -> None:
+        """Apply the gateway object settings to the current (unpublished) session"""
+        # Get gateway UID once the registration has created the object
+        gateway_info = self.wait_for_gateway(gw_name, timeout=ready_timeout)
+        gateway_uid = gateway_info.get('uid')
+
+        # Set basic gateway properties
+        self._execute_api_call(
+            "set-simple-gateway",
+            self._simple_gateway_settings(gw_name, version, sic_key, sms_cn_name)
+        )
+
+        # Set advanced properties
+        self._execute_api_call(
+            "set-generic-object",
+            self._generic_gateway_settings(gateway_uid, version, net_type, hardware)
+        )
+
+    def _show_gateways_bulk(self, names: Set[str], details_level: str = "standard") -> Dict[str, Dict]:
+        """Page through show-simple-gateways and return the requested objects by name"""
+        found: Dict[str, Dict] = {}
+        offset = 0
+        while len(found) < len(names):
+            page = self._execute_api_call(
+                "show-simple-gateways",
+                {"limit": SHOW_PAGE_LIMIT, "offset": offset, "details-level": details_level}
             )
-            sms_cn = sms_info['sic-name'].split(',')[1]
-            sms_cn_name = sms_cn.split('=')[1]
-            
-            # Get gateway UID
-            gateway_info = self._execute_api_call(
-                "show-simple-gateway",
-                {"name": gw_name}
-            )
-            gateway_uid = gateway_info.get('uid')
-
-            # Set basic gateway properties
-            self._execute_api_call(
-                "set-simple-gateway",
-                {
-                    "name": gw_name,
-                    "one-time-password": sic_key,
-                    "sic-name": f"CN={gw_name},O={sms_cn_name}",
-                    "version": version,
-                    "os-name": "Gaia Embedded"
-                }
+            objects = page.get('objects', [])
+            for obj in objects:
+                if obj.get('name') in names:
+                    found[obj['name']] = obj
+            offset += len(objects)
+            if not objects or offset >= page.get('total', 0):
+                break
+        return found
+
+    @staticmethod
+    def _batch_failures(task: Dict, names: List[str]) -> Set[str]:
+        """Collect the object or gateway names reported as failed in a batch or install task"""
+        failed: Set[str] = set()
+
+        def walk(node: Any) -> None:
+            if isinstance(node, dict):
+                has_error = node.get('errors') or str(node.get('status', '')).lower() == 'failed'
+                name = next((node[key] for key in TASK_DETAIL_NAME_KEYS if node.get(key) in names), None)
+                if has_error and name:
+                    failed.add(name)
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(task.get('tasks', []))
+        return failed
+
+    def _set_gateways_batch(self, gateways: List[GatewayConfig], sms_cn_name: str) -> Set[str]:
+        """
+        Apply set-simple-gateway to many gateways with one set-objects-batch call
+
+        Returns:
+            set: Names of gateways that were not updated and need a retry
+        """
+        names = [gateway.gw_name for gateway in gateways]
+        try:
+            response = self._execute_api_call(
+                "set-objects-batch",
+                {"objects": [{
+                    "type": "simple-gateway",
+                    "list": [
+                        self._simple_gateway_settings(gw.gw_name, gw.version, gw.sic_key, sms_cn_name)
+                        for gw in gateways
+                    ]
+                }]}
             )
+            task_id = response.get('task-id')
+            log.debug("Batch Task ID: %s", task_id)
+            self._monitor_task(task_id)
+            task = self._execute_api_call("show-task", {"task-id": task_id, "details-level": "full"})
+            return self._batch_failures(task, names)
+
+        except Exception as e:
+            log.warning(f"Bulk update of {len(names)} gateways failed, retrying one by one: {str(e)}")
+            return set(names)
+
+    def _stage_each(self, gateways: List[GatewayConfig],
+                    stage: Callable[[GatewayConfig], Any]) -> Tuple[Dict[str, TaskResult], Set[str]]:
+        """
+        Stage gateways one by one into the current session
+
+        Returns:
+            tuple: Results by name, and the names of failed gateways that
+                left part of their changes in the session
+        """
+        results: Dict[str, TaskResult] = {}
+        leftovers: Set[str] = set()
+        for gateway in gateways:
+            changes = self._staged_changes
+            results[gateway.gw_name] = run_task(gateway.gw_name, stage, gateway)
+            if not results[gateway.gw_name].success and self._staged_changes != changes:
+                leftovers.add(gateway.gw_name)
+        return results, leftovers
+
+    def _stage_gateways_each(self, gateways: List[GatewayConfig], sms_cn_name: str,
+                             ready_timeout: float) -> Tuple[Dict[str, TaskResult], Set[str]]:
+        """Stage every setting of the gateways one gateway at a time (see _stage_each)"""
+        return self._stage_each(gateways, lambda gw: self._stage_gateway(
+            gw.gw_name, gw.version, gw.net_type, gw.hardware, gw.sic_key, sms_cn_name, ready_timeout
+        ))
+
+    def _stage_gateways_bulk(self, gateways: List[GatewayConfig], sms_cn_name: str,
+                             ready_timeout: float) -> Tuple[Dict[str, TaskResult], Set[str]]:
+        """
+        Stage gateway settings using bulk endpoints
 
-            # Set advanced properties
-            self._execute_api_call(
+        Gateway UIDs come from paged show-simple-gateways, simple-gateway
+        properties are set with set-objects-batch. set-generic-object has no
+        batch counterpart and is still sent per gateway. Gateways that are not
+        visible yet or fail inside a batch fall back to per-gateway staging.
+
+        Returns:
+            tuple: Results by name, and the names of failed gateways that
+                left part of their changes in the session
+        """
+        known = self._show_gateways_bulk({gateway.gw_name for gateway in gateways})
+        retry: Set[str] = {gateway.gw_name for gateway in gateways if gateway.gw_name not in known}
+
+        batchable = [gateway for gateway in gateways if gateway.gw_name in known]
+        for offset in range(0, len(batchable), BULK_BATCH_SIZE):
+            retry |= self._set_gateways_batch(batchable[offset:offset + BULK_BATCH_SIZE], sms_cn_name)
+
+        if retry:
+            log.debug("Staging %d gateways individually", len(retry))
+        results, leftovers = self._stage_gateways_each(
+            [gateway for gateway in gateways if gateway.gw_name in retry], sms_cn_name, ready_timeout
+        )
+        batched, _ = self._stage_each(
+            [gateway for gateway in gateways if gateway.gw_name not in retry],
+            lambda gw: self._execute_api_call(
                 "set-generic-object",
-                {
-                    "uid": gateway_uid,
-                    "applianceType": "slim_fw",
-                    "svnVersionName": version,
-                    "slimFwType": net_type,
-                    "slimFwHardwareType": hardware,
-                    "securityBladesTopologyMode": "TOPOLOGY_TABLE",
-                    "vpn1": True,
-                    "hideInternalInterfaces": True
-                }
+                self._generic_gateway_settings(known[gw.gw_name].get('uid'), gw.version, gw.net_type, gw.hardware)
             )
+        )
+        results.update(batched)
+        # The batch already staged their simple-gateway settings
+        leftovers |= {name for name, result in batched.items() if not result.success}
+        return results, leftovers
+
+    def _publish(self) -> None:
+        """Publish the current session and wait for the publish task"""
+        response = self._execute_api_call("publish", {})
+        task_id = response.get('task-id')
+        log.info("Publishing the session")
+        log.debug("Task ID: %s", task_id)
+        self._monitor_task(task_id)
+        self._dirty = False
+        log.info("Configuration changes published successfully")
+
+    def _discard(self) -> None:
+        """Drop all unpublished changes of the current session"""
+        try:
+            self._execute_api_call("discard", {})
+        except Exception as e:
+            log.warning(f"Discarding session changes failed: {str(e)}")
+
+    def configure_gateway(self, gw_name: str, version: str, net_type: str,
+                         hardware: str, sic_key: str,
+                         ready_timeout: float = DEFAULT_READY_TIMEOUT) -> None:
+        """Full gateway configuration workflow"""
+        try:
+            self._login()
+            # Get SMS certificate details
+            sms_cn_name = self._get_sms_cn_name()
+
+            self._stage_gateway(gw_name, version, net_type, hardware, sic_key,
+                                sms_cn_name, ready_timeout)
 
             # Publish changes
-            response = self._execute_api_call("publish", {})
-            task_id = response.get('task-id')
-            log.info("Publishing the session")
-            log.debug(f"Task ID: {task_id}")
-            self._monitor_task(task_id)
-            log.info("Configuration changes published successfully")
+            self._publish()
+
+            # Confirm the published object carries the new settings
+            self.wait_for_gateway(
+                gw_name,
+                ready=lambda gw: gw.get('version') == version,
+                timeout=ready_timeout
+            )
 
             # Install policy
             #self.install_policy(gw_name)
@@ -131,63 +589,327 @@ class ManagementAPI:
         finally:
             self._logout()
 
+    def configure_gateways(self, gateways: List[GatewayConfig], chunk_size: Optional[int] = None,
+                           ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                           bulk: bool = False) -> List[TaskResult]:
+        """
+        Configure many gateways in one management session
+
+        Changes are staged gateway by gateway and published once per chunk, so
+        the expensive publish is paid once per chunk instead of once per gateway.
+        A gateway whose staging fails is reported and skipped; when it fails
+        half-way, the chunk is discarded and its other gateways are staged
+        again, so none of its changes get published. A failed publish
+        discards its chunk and fails every gateway staged in it.
+
+        Args:
+            gateways: Gateway configurations (objects must already be registered)
+            chunk_size: Gateways per publish. None publishes everything at once
+            ready_timeout: Deadline in seconds for each gateway object to appear
+            bulk: Stage each chunk with the bulk object endpoints
+
+        Returns:
+            list: One TaskResult per gateway, in input order
+        """
+        results: Dict[str, TaskResult] = {}
+        staged: List[GatewayConfig] = []  # Staged but not yet published
+        chunk_size = chunk_size or max(1, len(gateways))
 
-    def install_policy(self, policy_targets: List[str], policy_package: str) -> None:
-        """Install security policy on gateways"""
         try:
+            self._login()
+            sms_cn_name = self._get_sms_cn_name()
+
+            for offset in range(0, len(gateways), chunk_size):
+                chunk = gateways[offset:offset + chunk_size]
+                staged = []
+                started = time.monotonic()
+
+                stage_chunk = self._stage_gateways_bulk if bulk else self._stage_gateways_each
+                chunk_results, leftovers = stage_chunk(chunk, sms_cn_name, ready_timeout)
+                while leftovers:
+                    # web_api has no per-object discard: drop the chunk and stage the others again
+                    log.warning(f"Discarding the staged chunk, {', '.join(sorted(leftovers))} "
+                                f"failed half-way through staging")
+                    self._discard()
+                    if self._dirty:
+                        raise RuntimeError("Unable to discard half-staged gateway changes")
+                    restage = [gateway for gateway in chunk if chunk_results[gateway.gw_name].success]
+                    restaged, leftovers = self._stage_gateways_each(restage, sms_cn_name, ready_timeout)
+                    chunk_results.update(restaged)
+
+                for gateway in chunk:
+                    result = chunk_results[gateway.gw_name]
+                    results[gateway.gw_name] = result
+                    if result.success:
+                        result.value = gateway
+                        staged.append(gateway)
+
+                if not staged:
+                    continue
+
+                log.info(f"Publishing {len(staged)} staged gateways "
+                         f"({offset + len(chunk)}/{len(gateways)})")
+                try:
+                    self._publish()
+                except Exception as e:
+                    log.error(f"Publish failed for {len(staged)} gateways: {str(e)}")
+                    self._discard()
+                    for gateway in staged:
+                        results[gateway.gw_name] = TaskResult(
+                            name=gateway.gw_name, success=False,
+                            duration=time.monotonic() - started,
+                            error=f"Publish failed: {str(e)}"
+                        )
+                staged = []
+
+        except Exception as e:
+            log.error(f"Batch configuration aborted: {str(e)}")
+            for gateway in staged:
+                results[gateway.gw_name] = TaskResult(
+                    name=gateway.gw_name, success=False, error=f"Not published: {str(e)}"
+                )
+            for gateway in gateways:
+                results.setdefault(gateway.gw_name, TaskResult(
+                    name=gateway.gw_name, success=False, error=str(e)
+                ))
+        finally:
+            self._logout()
+
+        return [results[gateway.gw_name] for gateway in gateways]
+
+
+    @staticmethod
+    def _install_payload(targets: List[str], policy_package: str, policy_type: str) -> Dict:
+        """install-policy request for the layers of the policy type"""
+        layers = POLICY_TYPES[policy_type]
+        return {
+            "policy-package": policy_package,
+            "access": "access" in layers,
+            "threat-prevention": "threat-prevention" in layers,
+            "targets": targets
+        }
+
+    @staticmethod
+    def _modified_at(obj: Dict) -> float:
+        """Last modification time (posix milliseconds) from an object's meta-info"""
+        return float(((obj.get('meta-info') or {}).get('last-modify-time') or {}).get('posix') or 0)
+
+    @staticmethod
+    def _policy_revision(package: Dict, policy_type: str) -> float:
+        """Last modification of the package and of its layers of the policy type (show-package)"""
+        times = [ManagementAPI._modified_at(package)]
+        for layer in POLICY_TYPES[policy_type]:
+            times += [ManagementAPI._modified_at(item) for item in package.get(POLICY_LAYER_FIELDS[layer][1], [])
+                      if isinstance(item, dict)]
+        return max(times)
+
+    def _read_policy_revision(self, policy_package: str, policy_type: str) -> float:
+        """Current revision of the package for the policy type (show-package, session attached)"""
+        package = self._execute_api_call("show-package", {"name": policy_package, "details-level": "full"})
+        return self._policy_revision(package, policy_type)
+
+    def policy_revision(self, policy_package: str, policy_type: str = DEFAULT_POLICY_TYPE) -> float:
+        """
+        Last modification of the policy package and of its layers of the policy type
+
+        Returns:
+            float: posix milliseconds; installs older than this are outdated
+        """
+        try:
+            self._login()
+            return self._read_policy_revision(policy_package, policy_type)
+        finally:
+            self._logout()
+
+    def outdated_policy_targets(self, policy_targets: List[str], policy_package: str,
+                                policy_type: str = DEFAULT_POLICY_TYPE) -> List[str]:
+        """
+        Targets that do not run the current revision of the policy package
+
+        Compares the installed policy and installation date of every target
+        with the last modification of the package and its layers.
+
+        Returns:
+            list: Targets that need an install, in input order
+        """
+        if not policy_targets:
+            return []
+        try:
+            self._login()
+            revision = self._read_policy_revision(policy_package, policy_type)
+            objects = self._show_gateways_bulk(set(policy_targets), details_level="full")
+        finally:
+            self._logout()
+        return [
+            name for name in policy_targets
+            if not policy_current(objects.get(name), policy_package, revision, policy_type)
+        ]
+
+    def show_gateways(self, names: Set[str]) -> Dict[str, Dict]:
+        """
+        Read the full gateway objects of the given names with paged queries
+
+        Returns:
+            dict: Gateway objects by name (names without an object are absent)
+        """
+        if not names:
+            return {}
+        try:
+            self._login()
+            return self._show_gateways_bulk(names, details_level="full")
+        finally:
+            self._logout()
+
+    def install_policy(self, policy_targets: List[str], policy_package: str,
+                       on_task: Optional[Callable[[str], None]] = None,
+                       policy_type: str = DEFAULT_POLICY_TYPE) -> None:
+        """
+        Install security policy on gateways
+
+        Args:
+            policy_targets: Gateway names
+            policy_package: Policy package name
+            on_task: Called with the task-id as soon as the installation started
+            policy_type: Layers to install (all, access or threat-prevention)
+        """
+        try:
+            self._login()
             log.info(f"Installing {policy_package} on {len(policy_targets)} gateways")
             response = self._execute_api_call(
-                "install-policy",
-                {
-                    "policy-package": policy_package,
-                    "access": True,
-                    "threat-prevention": True,
-                    "targets": policy_targets
-                }
+                "install-policy", self._install_payload(policy_targets, policy_package, policy_type)
             )
             
             task_id = response.get('task-id')
             log.info(f"Policy installation started. Task ID: {task_id}")
+            if on_task:
+                on_task(task_id)
             self._monitor_task(task_id)
             
         except Exception as e:
             log.error(f"Policy installation failed: {str(e)}")
             raise
+        finally:
+            self._logout()
+
+    def install_policy_sharded(self, policy_targets: List[str], policy_package: str,
+                               shard_size: Optional[int] = None,
+                               parallel: int = INSTALL_PARALLEL_WAVES,
+                               retries: int = INSTALL_RETRIES,
+                               on_task: Optional[Callable[[str, List[str]], None]] = None,
+                               on_result: Optional[Callable[[TaskResult], None]] = None,
+                               policy_type: str = DEFAULT_POLICY_TYPE) -> List[TaskResult]:
+        """
+        Install security policy in waves and report the outcome per gateway
+
+        Each wave of up to shard_size targets is one install-policy task; at
+        most `parallel` of them run at the same time, all tracked by the task
+        monitor. Targets that failed are retried in new waves, so one slow or
+        broken gateway neither holds back nor fails the others.
 
-    def _monitor_task(self, task_id: str, interval: int = 10) -> None:
-        """Monitor async task completion with spinner"""
+        Args:
+            policy_targets: Gateway names
+            policy_package: Policy package name
+            shard_size: Gateways per install-policy task (None: one task for all)
+            parallel: Install tasks running at the same time
+            retries: Repeated attempts for targets that failed
+            on_task: Called with the task-id and targets of every wave once it started
+            on_result: Called with a gateway's result as soon as it is final
+            policy_type: Layers to install (all, access or threat-prevention)
+
+        Returns:
+            list: One TaskResult per target, in input order
+        """
+        waves = InstallWaves(policy_targets, shard_size, retries, on_result)
+        running: Dict[Future, Tuple[str, List[str]]] = {}
+        # One waiter per running wave, so every install task is timed and traced
+        monitors = ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="install-wave")
         try:
-            with tqdm(
-                total=1,  # Fake total for spinner
-                bar_format="{desc}: {elapsed} {bar}",
-                ncols=80
-            ) as pbar:
-                while True:
-                    task_status = self._execute_api_call(
-                        "show-task",
-                        {"task-id": task_id}
-                    )
-                    
-                    task_data = task_status.get('tasks', [{}])[0]
-                    status = task_data.get('status', 'unknown').upper()
-                    
-                    # Update spinner description
-                    pbar.set_description(f"🔄 {status}")
-                    
-                    if status == "SUCCEEDED":
-                        pbar.set_description("✅ COMPLETED")
-                        pbar.close()
-                        return
-                    if status == "FAILED":
-                        pbar.set_description("❌ FAILED")
-                        pbar.close()
-                        raise Exception(f"Task failed: {task_data}")
-
-                    time.sleep(interval)
-                    
+            self._login()
+            while waves.pending or running:
+                while waves.pending and len(running) < parallel:
+                    wave = waves.next_wave()
+                    try:
+                        task_id = self._start_install(wave, policy_package, policy_type)
+                    except Exception as e:
+                        waves.settle(wave, {name: str(e) for name in wave})
+                        continue
+                    if on_task:
+                        on_task(task_id, wave)
+                    running[monitors.submit(contextvars.copy_context().run,
+                                            self._monitor_wave, task_id, wave)] = (task_id, wave)
+
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_id, wave = running.pop(future)
+                    waves.settle(wave, self._install_failures(future, task_id, wave))
+
         except Exception as e:
-            log.error(f"Task monitoring failed: {str(e)}")
-            raise
+            log.error(f"Policy installation failed: {str(e)}")
+            waves.fail_remaining(str(e))
+        finally:
+            monitors.shutdown(wait=False)
+            self._logout()
+
+        results = waves.ordered_results()
+        log.info(f"Policy {policy_package} installed on "
+                 f"{sum(1 for result in results if result.success)}/{len(results)} gateways")
+        return results
+
+    def _start_install(self, targets: List[str], policy_package: str, policy_type: str) -> str:
+        """Start one install-policy task and return its task-id"""
+        log.info(f"Installing {policy_package} on a wave of {len(targets)} gateways")
+        response = self._execute_api_call(
+            "install-policy", self._install_payload(targets, policy_package, policy_type)
+        )
+        task_id = response.get('task-id')
+        log.debug("Install task %s: %s", task_id, targets)
+        return task_id
+
+    def _monitor_wave(self, task_id: str, targets: List[str]) -> Dict:
+        """Wait for the install task of one wave (a trace span of its own)"""
+        with tracer.span("install_wave", category="install", task_id=task_id, targets=len(targets)):
+            return self._monitor_task(task_id)
+
+    def _install_failures(self, future: Future, task_id: str, targets: List[str]) -> Dict[str, str]:
+        """Targets of a finished install task that did not get the policy, with the reason"""
+        try:
+            future.result()
+            return {}
+        except TaskFailedError as e:
+            try:
+                task = self._execute_api_call("show-task", {"task-id": task_id, "details-level": "full"})
+                failed = self._batch_failures(task, targets)
+            except Exception as details_error:
+                log.warning(f"Unable to read the details of install task {task_id}: {str(details_error)}")
+                failed = set()
+            # Without per-gateway details the whole wave counts as failed
+            return {name: f"Install task {task_id} {e.task_data.get('status', 'failed')}"
+                    for name in (failed or targets)}
+        except Exception as e:
+            return {name: str(e) for name in targets}
+
+    def wait_for_task(self, task_id: str) -> Dict:
+        """Wait for a task started earlier (e.g. by a previous run) to complete"""
+        try:
+            self._login()
+            return self._monitor_task(task_id)
+        finally:
+            self._logout()
+
+    def submit_task(self, task_id: str) -> Future:
+        """Track a management task; the future resolves to its show-task entry"""
+        return self.task_monitor.submit(task_id)
+
+    def _monitor_task(self, task_id: str) -> Dict:
+        """Block until an async task completes and return its show-task entry"""
+        with metrics.timer("task_seconds"):
+            try:
+                return self.task_monitor.wait(task_id)
+            except Exception as e:
+                log.error(f"Task monitoring failed: {str(e)}")
+                raise
         
 if __name__ == '__main__':
     # Example usage
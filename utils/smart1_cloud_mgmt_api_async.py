@@ -0,0 +1,436 @@
+"""
+Check Point Management API Client (asyncio)
+
+Async counterpart of ManagementAPI built on aiohttp. A management session is
+bound to one SID, so every workflow checks out its own session (an idle
+pooled one when available) and passes it with each call; all workflows
+share one HTTP connection pool.
+"""
+
+import asyncio
+import json
+import time
+from typing import Callable, Dict, List, Optional, Set
+from requests.exceptions import RequestException
+from .logger_main import log
+from .metrics import metrics, WAIT_TASK_POLL
+from .tracing import tracer
+from .async_http import AsyncResponse, async_request, create_session
+from .wait import async_wait_until, DEFAULT_READY_TIMEOUT
+from .lookup_cache import LookupCache, DEFAULT_CACHE_TTL
+from .task_monitor import (
+    TaskFailedError, TaskTimeoutError, SUCCEEDED, FAILED_STATUSES,
+    INITIAL_POLL_INTERVAL, MAX_POLL_INTERVAL, POLL_BACKOFF, DEFAULT_TASK_TIMEOUT
+)
+from .retry_policy import RetryPolicy
+from .rate_limiter import RateLimiter, shared_rate_limiter
+from .credential_cache import CredentialCache, credential_key
+from .fleet import TaskResult
+from .smart1_cloud_mgmt_api import (
+    ManagementAPI, InstallWaves, policy_current, sic_communicating, DEFAULT_TIMEOUT, DEFAULT_SESSION_TIMEOUT,
+    SESSION_CLEAN_COMMANDS, INSTALL_PARALLEL_WAVES, INSTALL_RETRIES, SHOW_PAGE_LIMIT, DEFAULT_POLICY_TYPE
+)
+
+
+class _WebSession:
+    """web_api session checked out by one workflow"""
+
+    def __init__(self, sid: Optional[str], timeout: float):
+        self.sid = sid
+        self.timeout = timeout
+        self.last_used = time.time()
+        self.dirty = False  # Session holds unpublished changes
+
+
+class AsyncManagementAPI:
+    """Asyncio client for Check Point Gateway operations"""
+
+    def __init__(self, instance: str, context: str, api_key: str,
+                 cache_ttl: float = DEFAULT_CACHE_TTL, cache_dir: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None, base_url: Optional[str] = None,
+                 task_timeout: float = DEFAULT_TASK_TIMEOUT):
+        self.base_url = (base_url or f"https://{instance}.maas.checkpoint.com/{context}/web_api").rstrip('/')
+        self.api_key = api_key
+        self.lookups = LookupCache.shared(f"{instance}_{context}", cache_ttl, cache_dir)
+        self.retry_policy = retry_policy or RetryPolicy(timeout=DEFAULT_TIMEOUT)
+        self.rate_limiter = rate_limiter or shared_rate_limiter
+        self.credentials = CredentialCache.shared(cache_dir)
+        self._session_key = credential_key("sid", self.base_url, api_key)
+        self.task_timeout = task_timeout
+        self.session = None
+
+    async def __aenter__(self) -> 'AsyncManagementAPI':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Log out the pooled sessions (see ManagementAPI.close) and close the HTTP session"""
+        if not self.credentials.persistent:
+            for sid in self.credentials.drain_sessions(self._session_key):
+                try:
+                    await self._send("logout", sid=sid)
+                except RequestException as e:
+                    log.warning(f"Logout failed: {str(e)}")
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _session(self):
+        """Create the aiohttp session lazily inside the running loop"""
+        if self.session is None:
+            self.session = create_session({'Content-Type': 'application/json'})
+        return self.session
+
+    async def _send(self, endpoint: str, payload: Optional[Dict] = None,
+                    sid: Optional[str] = None) -> AsyncResponse:
+        """Send a web_api command under the retry policy (status not checked)"""
+        return await async_request(
+            self.retry_policy, self._session(), "POST", f"{self.base_url}/{endpoint}",
+            idempotent=ManagementAPI._is_idempotent(endpoint),
+            rate_limiter=self.rate_limiter,
+            rate_class=ManagementAPI._rate_class(endpoint),
+            endpoint=endpoint,
+            json=payload if payload is not None else {},
+            headers={'X-chkp-sid': sid} if sid else None
+        )
+
+    async def _post(self, endpoint: str, payload: Optional[Dict],
+                    web_session: _WebSession) -> AsyncResponse:
+        """Send a web_api command, logging in again once if the session expired"""
+        response = await self._send(endpoint, payload, web_session.sid)
+        if response.status_code == 401 and not web_session.dirty:
+            log.info("Management session expired, logging in again")
+            await self._new_session(web_session)
+            response = await self._send(endpoint, payload, web_session.sid)
+        elif response.status_code == 401:
+            log.error("Management session expired with unpublished changes")
+
+        if response.status_code < 400:
+            web_session.last_used = time.time()
+            if endpoint == "discard":
+                web_session.dirty = False
+            elif not endpoint.startswith("show-") and endpoint not in SESSION_CLEAN_COMMANDS:
+                web_session.dirty = True
+        return response
+
+    async def _new_session(self, web_session: _WebSession) -> None:
+        """Log in and point the workflow's session at the new SID"""
+        try:
+            response = await self._send("login", {"api-key": self.api_key})
+            response.raise_for_status()
+            login = response.json()
+            web_session.sid = login['sid']
+            web_session.timeout = login.get('session-timeout', DEFAULT_SESSION_TIMEOUT)
+            web_session.last_used = time.time()
+            log.debug("Successfully authenticated with management API")
+
+        except RequestException as e:
+            log.error(f"Authentication failed: {str(e)}")
+            raise
+
+    async def _login(self) -> _WebSession:
+        """Check out an idle pooled session, or log in when none is available"""
+        pooled = self.credentials.checkout_session(self._session_key)
+        if pooled:
+            return _WebSession(*pooled)
+        web_session = _WebSession(None, DEFAULT_SESSION_TIMEOUT)
+        await self._new_session(web_session)
+        return web_session
+
+    async def _logout(self, web_session: _WebSession) -> None:
+        """Release the session back to the idle pool"""
+        try:
+            if web_session.dirty:
+                await self._discard(web_session)
+            if web_session.dirty:  # Never hand unpublished changes to the next user
+                await self._send("logout", sid=web_session.sid)
+                log.debug("Successfully logged out")
+            else:
+                self.credentials.release_session(
+                    self._session_key, web_session.sid, web_session.timeout, web_session.last_used
+                )
+        except RequestException as e:
+            log.warning(f"Logout failed: {str(e)}")
+
+    async def _discard(self, web_session: _WebSession) -> None:
+        """Drop all unpublished changes of the session"""
+        try:
+            await self._execute_api_call("discard", {}, web_session)
+        except Exception as e:
+            log.warning(f"Discarding session changes failed: {str(e)}")
+
+    async def _execute_api_call(self, endpoint: str, payload: Dict, web_session: _WebSession) -> Dict:
+        """Generic API call handler with error checking"""
+        with metrics.timer("api_call_seconds", client="management", endpoint=endpoint):
+            try:
+                response = await self._post(endpoint, payload, web_session)
+                response.raise_for_status()
+                return response.json()
+
+            except RequestException as e:
+                response = getattr(e, 'response', None)
+                log.error(f"API call failed: {response.text if response is not None else str(e)}")
+                raise
+            except json.JSONDecodeError:
+                log.error("Invalid JSON response from server")
+                raise
+
+    async def _show_gateway(self, gw_name: str, web_session: _WebSession) -> Optional[Dict]:
+        """Return the gateway object, or None while it does not exist yet"""
+        response = await self._post("show-simple-gateway", {"name": gw_name}, web_session)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def wait_for_gateway(self, gw_name: str, web_session: _WebSession,
+                               ready: Optional[Callable[[Dict], bool]] = None,
+                               timeout: float = DEFAULT_READY_TIMEOUT) -> Dict:
+        """Poll show-simple-gateway until the object exists and matches a condition"""
+        async def check() -> Optional[Dict]:
+            gateway_info = await self._show_gateway(gw_name, web_session)
+            if gateway_info is None or (ready and not ready(gateway_info)):
+                return None
+            return gateway_info
+
+        return await async_wait_until(check, f"gateway object {gw_name}", timeout=timeout)
+
+    async def wait_for_sic(self, gw_name: str, timeout: float = DEFAULT_READY_TIMEOUT) -> None:
+        """Wait until the management server communicates with the gateway over SIC"""
+        web_session = await self._login()
+        try:
+            await self.wait_for_gateway(gw_name, web_session, ready=sic_communicating, timeout=timeout)
+            log.info(f"SIC trust established with {gw_name}")
+        finally:
+            await self._logout(web_session)
+
+    async def is_sic_established(self, gw_name: str) -> bool:
+        """Check once whether the management server communicates with the gateway over SIC"""
+        web_session = await self._login()
+        try:
+            gateway_info = await self._show_gateway(gw_name, web_session)
+            return gateway_info is not None and sic_communicating(gateway_info)
+        finally:
+            await self._logout(web_session)
+
+    async def _get_sms_cn_name(self, web_session: _WebSession) -> str:
+        """Organisation part of the management server SIC name (cached per tenant)"""
+        sms_cn_name = self.lookups.peek("sms_cn_name")
+        if sms_cn_name is None:
+            sms_info = await self._execute_api_call(
+                "show-checkpoint-host", {"name": "Management_Service"}, web_session
+            )
+            sms_cn = sms_info['sic-name'].split(',')[1]
+            sms_cn_name = sms_cn.split('=')[1]
+            self.lookups.put("sms_cn_name", sms_cn_name)
+        return sms_cn_name
+
+    async def _publish(self, web_session: _WebSession) -> None:
+        """Publish the session and wait for the publish task"""
+        response = await self._execute_api_call("publish", {}, web_session)
+        task_id = response.get('task-id')
+        log.info("Publishing the session")
+        log.debug("Task ID: %s", task_id)
+        await self._monitor_task(task_id, web_session)
+        web_session.dirty = False
+        log.info("Configuration changes published successfully")
+
+    async def configure_gateway(self, gw_name: str, version: str, net_type: str,
+                                hardware: str, sic_key: str,
+                                ready_timeout: float = DEFAULT_READY_TIMEOUT) -> None:
+        """Full gateway configuration workflow"""
+        web_session = await self._login()
+        try:
+            sms_cn_name = await self._get_sms_cn_name(web_session)
+
+            gateway_info = await self.wait_for_gateway(gw_name, web_session, timeout=ready_timeout)
+            await self._execute_api_call(
+                "set-simple-gateway",
+                ManagementAPI._simple_gateway_settings(gw_name, version, sic_key, sms_cn_name),
+                web_session
+            )
+            await self._execute_api_call(
+                "set-generic-object",
+                ManagementAPI._generic_gateway_settings(gateway_info.get('uid'), version,
+                                                        net_type, hardware),
+                web_session
+            )
+
+            await self._publish(web_session)
+
+            # Confirm the published object carries the new settings
+            await self.wait_for_gateway(
+                gw_name, web_session,
+                ready=lambda gw: gw.get('version') == version,
+                timeout=ready_timeout
+            )
+
+        finally:
+            await self._logout(web_session)
+
+    async def _show_gateways_bulk(self, names: Set[str], web_session: _WebSession,
+                                  details_level: str = "standard") -> Dict[str, Dict]:
+        """Page through show-simple-gateways and return the requested objects by name"""
+        found: Dict[str, Dict] = {}
+        offset = 0
+        while len(found) < len(names):
+            page = await self._execute_api_call(
+                "show-simple-gateways",
+                {"limit": SHOW_PAGE_LIMIT, "offset": offset, "details-level": details_level},
+                web_session
+            )
+            objects = page.get('objects', [])
+            for obj in objects:
+                if obj.get('name') in names:
+                    found[obj['name']] = obj
+            offset += len(objects)
+            if not objects or offset >= page.get('total', 0):
+                break
+        return found
+
+    async def outdated_policy_targets(self, policy_targets: List[str], policy_package: str,
+                                      policy_type: str = DEFAULT_POLICY_TYPE) -> List[str]:
+        """Targets that do not run the current revision of the package (see ManagementAPI.outdated_policy_targets)"""
+        if not policy_targets:
+            return []
+        web_session = await self._login()
+        try:
+            package = await self._execute_api_call(
+                "show-package", {"name": policy_package, "details-level": "full"}, web_session
+            )
+            revision = ManagementAPI._policy_revision(package, policy_type)
+            objects = await self._show_gateways_bulk(set(policy_targets), web_session, details_level="full")
+        finally:
+            await self._logout(web_session)
+        return [
+            name for name in policy_targets
+            if not policy_current(objects.get(name), policy_package, revision, policy_type)
+        ]
+
+    async def install_policy(self, policy_targets: List[str], policy_package: str,
+                             on_task: Optional[Callable[[str], None]] = None,
+                             policy_type: str = DEFAULT_POLICY_TYPE) -> None:
+        """Install security policy on gateways (on_task receives the install task-id)"""
+        web_session = await self._login()
+        try:
+            log.info(f"Installing {policy_package} on {len(policy_targets)} gateways")
+            response = await self._execute_api_call(
+                "install-policy",
+                ManagementAPI._install_payload(policy_targets, policy_package, policy_type),
+                web_session
+            )
+
+            task_id = response.get('task-id')
+            log.info(f"Policy installation started. Task ID: {task_id}")
+            if on_task:
+                on_task(task_id)
+            await self._monitor_task(task_id, web_session)
+
+        except Exception as e:
+            log.error(f"Policy installation failed: {str(e)}")
+            raise
+        finally:
+            await self._logout(web_session)
+
+    async def install_policy_sharded(self, policy_targets: List[str], policy_package: str,
+                                     shard_size: Optional[int] = None,
+                                     parallel: int = INSTALL_PARALLEL_WAVES,
+                                     retries: int = INSTALL_RETRIES,
+                                     on_task: Optional[Callable[[str, List[str]], None]] = None,
+                                     on_result: Optional[Callable[[TaskResult], None]] = None,
+                                     policy_type: str = DEFAULT_POLICY_TYPE) -> List[TaskResult]:
+        """Install security policy in waves with per-gateway results (see ManagementAPI.install_policy_sharded)"""
+        waves = InstallWaves(policy_targets, shard_size, retries, on_result)
+        running: Dict[asyncio.Task, List[str]] = {}
+        web_session = await self._login()
+        try:
+            while waves.pending or running:
+                while waves.pending and len(running) < parallel:
+                    wave = waves.next_wave()
+                    running[asyncio.ensure_future(
+                        self._install_wave(wave, policy_package, policy_type, web_session, on_task)
+                    )] = wave
+
+                done, _ = await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    waves.settle(running.pop(finished), finished.result())
+
+        except Exception as e:
+            log.error(f"Policy installation failed: {str(e)}")
+            for pending in running:
+                pending.cancel()
+            waves.fail_remaining(str(e))
+        finally:
+            await self._logout(web_session)
+
+        results = waves.ordered_results()
+        log.info(f"Policy {policy_package} installed on "
+                 f"{sum(1 for result in results if result.success)}/{len(results)} gateways")
+        return results
+
+    async def _install_wave(self, targets: List[str], policy_package: str, policy_type: str,
+                            web_session: _WebSession,
+                            on_task: Optional[Callable[[str, List[str]], None]]) -> Dict[str, str]:
+        """Install one wave; returns the targets that did not get the policy, with the reason"""
+        try:
+            log.info(f"Installing {policy_package} on a wave of {len(targets)} gateways")
+            response = await self._execute_api_call(
+                "install-policy",
+                ManagementAPI._install_payload(targets, policy_package, policy_type),
+                web_session
+            )
+            task_id = response.get('task-id')
+            if on_task:
+                on_task(task_id, targets)
+            with tracer.span("install_wave", category="install", task_id=task_id, targets=len(targets)):
+                await self._monitor_task(task_id, web_session)
+            return {}
+        except TaskFailedError as e:
+            try:
+                task = await self._execute_api_call(
+                    "show-task", {"task-id": e.task_id, "details-level": "full"}, web_session
+                )
+                failed = ManagementAPI._batch_failures(task, targets)
+            except Exception as details_error:
+                log.warning(f"Unable to read the details of install task {e.task_id}: {str(details_error)}")
+                failed = set()
+            return {name: f"Install task {e.task_id} {e.task_data.get('status', 'failed')}"
+                    for name in (failed or targets)}
+        except Exception as e:
+            return {name: str(e) for name in targets}
+
+    async def _monitor_task(self, task_id: str, web_session: _WebSession) -> Dict:
+        """Poll show-task with a growing interval until the task completes"""
+        with metrics.timer("task_seconds"):
+            return await self._poll_task(task_id, web_session)
+
+    async def _poll_task(self, task_id: str, web_session: _WebSession) -> Dict:
+        """show-task polling loop of _monitor_task"""
+        started = time.monotonic()
+        deadline = started + self.task_timeout
+        interval = INITIAL_POLL_INTERVAL
+        status = "SUBMITTED"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                log.error(f"❌ Task {task_id} still {status} after {self.task_timeout:.0f}s, giving up")
+                raise TaskTimeoutError(task_id, status, self.task_timeout)
+            await asyncio.sleep(min(interval, remaining))
+            metrics.record_wait(WAIT_TASK_POLL, min(interval, remaining))
+            response = await self._execute_api_call("show-task", {"task-id": task_id}, web_session)
+            task_data = (response.get('tasks') or [{}])[0]
+            new_status = task_data.get('status', 'unknown').upper()
+            if new_status != status:
+                status = new_status
+                log.debug("Task %s: %s", task_id, status)
+
+            if status == SUCCEEDED:
+                log.debug("Task %s succeeded after %.1fs", task_id, time.monotonic() - started)
+                return task_data
+            if status in FAILED_STATUSES:
+                log.error(f"❌ Task {task_id} {status} after {time.monotonic() - started:.1f}s")
+                raise TaskFailedError(task_id, task_data)
+            interval = min(interval * POLL_BACKOFF, MAX_POLL_INTERVAL)
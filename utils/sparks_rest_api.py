@@ -3,19 +3,79 @@
 Sparks Gateway REST API Client
 Handles direct device configuration via local REST API
 """
+import re
 import time
 import base64
 import requests
-from typing import List
+from typing import Callable, Dict, List, Optional
+from pydantic import BaseModel
 from .logger_main import log
+from .metrics import metrics, WAIT_READINESS
+from .tracing import tracer
+from .wait import wait_until, check_deadline, remaining, DEFAULT_READY_TIMEOUT
+from .retry_policy import RetryPolicy
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+DEFAULT_TIMEOUT = 120  # seconds, CLISH commands can take a while to return
+
+# Commands that keep working in the background after the API call returns, with the
+# minimum seconds the services they restart need before their effect is polled
+SLOW_COMMANDS = {
+    "connect maas": 10,
+    "fetch certificate": 10,
+    "connect security-management": 15,
+    "fw fetch": 10,
+}
+SLOW_COMMAND_PREFIXES = tuple(SLOW_COMMANDS)
+READY_PROBE_COMMAND = "show hostname"
+POLICY_PROBE_COMMAND = "fw stat"
+INITIAL_POLICIES = ("InitialPolicy", "defaultfilter", "-")  # fw stat before a policy is fetched
+PROBE_TIMEOUT = 10  # seconds per readiness probe
+# Single short attempt per probe; probes never open the device's circuit breaker
+PROBE_POLICY = RetryPolicy(max_retries=0, timeout=PROBE_TIMEOUT)
+# Arguments whose value is a secret (MaaS auth token, SIC one-time password)
+SECRET_ARGUMENT_PATTERN = re.compile(r"(?<![\w-])(auth-token|password)(\s+)\S+")
+CLISH_ERROR_PATTERN = re.compile(
+    r"^\s*(error|failed|invalid|unknown command|command not found)\b",
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def slow_command(cmd: str) -> Optional[str]:
+    """Prefix of a command that keeps working in the background (None for other commands)"""
+    return next((prefix for prefix in SLOW_COMMAND_PREFIXES if cmd.startswith(prefix)), None)
+
+
+def redact(cmd: str) -> str:
+    """Command with the values of secret arguments masked, for logs and error messages"""
+    return SECRET_ARGUMENT_PATTERN.sub(r"\1\2****", cmd)
+
+
+def device_base_url(address: str) -> str:
+    """web-api URL of a device; an address with a scheme (e.g. a simulator) is used as given"""
+    base = address.rstrip('/') if "://" in address else f"https://{address}"
+    return f"{base}/web-api"
+
+
+class ClishResult(BaseModel):
+    """Output and status of one CLISH command"""
+    command: str
+    output: str = ""
+    success: bool = True
+
+
 class SparksGatewayAPI:
     """Client for configuring sparks gateways via their local API"""
     
-    def __init__(self, ip_address: str, username: str, password: str):
-        self.base_url = f"https://{ip_address}/web-api"
+    def __init__(self, ip_address: str, username: str, password: str,
+                 timeout: int = DEFAULT_TIMEOUT, retry_policy: Optional[RetryPolicy] = None,
+                 settle_time: Optional[float] = None):
+        self.base_url = device_base_url(ip_address)
+        self.timeout = timeout
+        # Minimum wait after a slow command; None uses the per-command SLOW_COMMANDS values
+        self.settle_time = settle_time
+        self.retry_policy = retry_policy or RetryPolicy(timeout=timeout)
         self.username = username
         self.password = password
         self.session = requests.Session()
@@ -26,8 +86,8 @@ class SparksGatewayAPI:
     def login(self):
         """Authenticate with the sparks gateway"""
         try:
-            response = self.session.post(
-                f"{self.base_url}/login",
+            response = self.retry_policy.request(
+                self.session, "POST", f"{self.base_url}/login",
                 json={"user": self.username, "password": self.password}
             )
             response.raise_for_status()
@@ -38,28 +98,217 @@ class SparksGatewayAPI:
             log.error(f"Sparks gateway login failed: {str(e)}")
             raise
 
-    def execute_clish(self, commands: List[str], delay: int = 20):
-        """Execute CLISH commands on sparks gateway"""
+    def _run_command(self, cmd: str, idempotent: bool = False, probe: bool = False) -> str:
+        """Send one CLISH command (or a readiness probe) and return its decoded output"""
+        encoded_cmd = base64.b64encode(cmd.encode()).decode()
+
+        # Only the command keyword is traced; arguments may carry tokens or passwords
+        with tracer.span("clish", category="device", command=" ".join(cmd.split()[:2]),
+                         lines=cmd.count("\n") + 1):
+            # Configuration commands are not resent after an ambiguous failure
+            # Probes fail fast on a rebooting device, the poll loop does the retrying
+            response = (PROBE_POLICY if probe else self.retry_policy).request(
+                self.session, "POST", f"{self.base_url}/run-clish-command",
+                idempotent=idempotent, probe=probe,
+                json={"script": encoded_cmd}
+            )
+
+        response.raise_for_status()
+        return base64.b64decode(response.json()['output']).decode()
+
+    def is_ready(self) -> bool:
+        """Check whether the device answers a lightweight CLISH probe"""
         try:
-            for cmd in commands:
-                log.info(f"Running the command: {cmd}")
-                
-                encoded_cmd = base64.b64encode(cmd.encode()).decode()
-                
-                response = self.session.post(
-                    f"{self.base_url}/run-clish-command",
-                    json={"script": encoded_cmd}
-                )
-                
-                response.raise_for_status()
-                
-                # Decode and log output
-                output = base64.b64decode(response.json()['output']).decode()
-                if output: # not all clish command return an output
-                    log.debug(f"CLISH command response: {output}")
-                log.info(f"🕒 Waiting for {delay} seconds between commands")
-                time.sleep(delay)
-                
+            self._run_command(READY_PROBE_COMMAND, idempotent=True, probe=True)
+            return True
         except Exception as e:
-            log.error(f"CLISH command failed: {str(e)}")
-            raise
\ No newline at end of file
+            log.debug("Sparks gateway not ready yet: %s", e)
+            return False
+
+    def wait_until_ready(self, timeout: float = DEFAULT_READY_TIMEOUT) -> None:
+        """Poll the device until it accepts commands again"""
+        wait_until(self.is_ready, f"Sparks gateway {self.base_url}", timeout=timeout)
+
+    @staticmethod
+    def policy_loaded(output: str) -> bool:
+        """
+        Check fw stat output for a fetched security policy
+
+        Output the firmware does not understand as fw stat (an error) only
+        tells that the device answers, which is all that can be checked then.
+        """
+        if CLISH_ERROR_PATTERN.search(output):
+            return True
+        rows = [line.split() for line in output.splitlines()[1:]]
+        return any(len(row) > 1 and row[1] not in INITIAL_POLICIES for row in rows)
+
+    def is_policy_fetched(self) -> bool:
+        """Check whether the device runs a security policy fetched from its management"""
+        try:
+            return self.policy_loaded(self._run_command(POLICY_PROBE_COMMAND, idempotent=True, probe=True))
+        except Exception as e:
+            log.debug("Sparks gateway policy not fetched yet: %s", e)
+            return False
+
+    def settle_seconds(self, cmd: str) -> float:
+        """Minimum wait after a slow command before its effect is polled"""
+        return self.settle_time if self.settle_time is not None else SLOW_COMMANDS[slow_command(cmd)]
+
+    def wait_until_applied(self, cmd: str, timeout: float = DEFAULT_READY_TIMEOUT,
+                           effect_checks: Optional[Dict[str, Callable[[], bool]]] = None) -> None:
+        """
+        Wait until a slow command has taken effect
+
+        The services the command restarts get their minimum time first, then
+        the command's effect is polled: a check supplied by the caller (e.g.
+        SIC state from the management), the fetched policy after fw fetch,
+        or otherwise the device answering again.
+        """
+        prefix = slow_command(cmd)
+        settle = remaining(self.settle_seconds(cmd))
+        if settle:
+            log.info(f"🕒 Giving the gateway {settle:.0f}s to apply '{prefix}'")
+            time.sleep(settle)
+            metrics.record_wait(WAIT_READINESS, settle)
+        check_deadline(f"checking '{prefix}'")
+        check = (effect_checks or {}).get(prefix) or (
+            self.is_policy_fetched if prefix == "fw fetch" else self.is_ready
+        )
+        wait_until(check, f"'{prefix}' on Sparks gateway {self.base_url}", timeout=timeout)
+
+    def execute_clish(self, commands: List[str], delay: Optional[int] = None,
+                      ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                      effect_checks: Optional[Dict[str, Callable[[], bool]]] = None):
+        """
+        Execute CLISH commands on sparks gateway
+
+        Args:
+            commands: CLISH commands, executed in order
+            delay: Fixed wait between commands in seconds. When omitted, the
+                client only waits after commands that trigger background work,
+                until they have taken effect
+            ready_timeout: Deadline in seconds for each readiness wait
+            effect_checks: Checks of a slow command's effect by command prefix
+        """
+        with metrics.timer("clish_seconds", mode="command"):
+            try:
+                for cmd in commands:
+                    # A device past --device-timeout is reported as failed, stop configuring it
+                    check_deadline(f"'{redact(cmd)}'")
+                    log.info(f"Running the command: {redact(cmd)}")
+
+                    # Decode and log output
+                    output = self._run_command(cmd)
+                    if output: # not all clish command return an output
+                        log.debug("CLISH command response: %s", output)
+
+                    if delay is not None:
+                        log.info(f"🕒 Waiting for {delay} seconds between commands")
+                        time.sleep(remaining(delay))
+                    elif slow_command(cmd):
+                        log.info("🕒 Waiting for the gateway to finish applying the command")
+                        self.wait_until_applied(cmd, ready_timeout, effect_checks)
+                
+            except Exception as e:
+                log.error(f"CLISH command failed: {str(e)}")
+                raise
+
+    @staticmethod
+    def split_script(commands: List[str]) -> List[List[str]]:
+        """
+        Split commands into dependency-ordered chunks
+
+        Each chunk ends with a command that keeps working in the background,
+        so the next chunk only starts once the device has caught up.
+        """
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        for cmd in commands:
+            current.append(cmd)
+            if slow_command(cmd):
+                chunks.append(current)
+                current = []
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def parse_script_output(commands: List[str], output: str) -> List[ClishResult]:
+        """
+        Attribute the combined output of a script to its commands
+
+        CLISH echoes each command before its output; lines that end with the
+        next expected command start that command's section. Without echoes the
+        whole output belongs to the chunk and every command shares its status.
+        """
+        sections: List[List[str]] = [[] for _ in commands]
+        position = -1
+        for line in output.splitlines():
+            stripped = line.strip()
+            echoed = next(
+                (i for i in range(position + 1, len(commands))
+                 if stripped and stripped.endswith(commands[i])),
+                None
+            )
+            if echoed is not None:
+                position = echoed
+            elif position >= 0:
+                sections[position].append(line)
+
+        if position < 0:  # No echoed commands to split on
+            failed = bool(CLISH_ERROR_PATTERN.search(output))
+            return [
+                ClishResult(command=cmd, output=output if i == len(commands) - 1 else "",
+                            success=not failed)
+                for i, cmd in enumerate(commands)
+            ]
+
+        results = []
+        for cmd, lines in zip(commands, sections):
+            cmd_output = "\n".join(lines).strip()
+            results.append(ClishResult(
+                command=cmd, output=cmd_output,
+                success=not CLISH_ERROR_PATTERN.search(cmd_output)
+            ))
+        return results
+
+    def execute_clish_script(self, commands: List[str],
+                             ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                             effect_checks: Optional[Dict[str, Callable[[], bool]]] = None) -> List[ClishResult]:
+        """
+        Execute CLISH commands as a few multi-line scripts
+
+        Commands are submitted as one base64 script per dependency-ordered
+        chunk, and the client only waits after chunks ending in a command that
+        keeps working in the background, until it has taken effect.
+
+        Returns:
+            list: Per-command results, up to and including the first failure
+
+        Raises:
+            RuntimeError: If a command in the script reports an error
+        """
+        with metrics.timer("clish_seconds", mode="script"):
+            results: List[ClishResult] = []
+            try:
+                for chunk in self.split_script(commands):
+                    check_deadline(f"'{redact(chunk[0])}'")
+                    log.info(f"Running {len(chunk)} commands as one script: {redact('; '.join(chunk))}")
+                    output = self._run_command("\n".join(chunk))
+
+                    for result in self.parse_script_output(chunk, output):
+                        results.append(result)
+                        if result.output:
+                            log.debug("CLISH command response (%s): %s", redact(result.command), result.output)
+                        if not result.success:
+                            raise RuntimeError(f"'{redact(result.command)}' failed: {result.output}")
+
+                    if slow_command(chunk[-1]):
+                        log.info("🕒 Waiting for the gateway to finish applying the script")
+                        self.wait_until_applied(chunk[-1], ready_timeout, effect_checks)
+
+                return results
+
+            except Exception as e:
+                log.error(f"CLISH script failed: {str(e)}")
+                raise
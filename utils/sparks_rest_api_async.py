@@ -0,0 +1,178 @@
+"""
+Sparks Gateway REST API Client (asyncio)
+
+Async counterpart of SparksGatewayAPI built on aiohttp, so a large fleet of
+devices can be configured from one event loop.
+"""
+import asyncio
+import base64
+from typing import Awaitable, Callable, Dict, List, Optional
+from .logger_main import log
+from .metrics import metrics, WAIT_READINESS
+from .tracing import tracer
+from .async_http import async_request, create_session
+from .wait import async_wait_until, DEFAULT_READY_TIMEOUT
+from .retry_policy import RetryPolicy
+from .sparks_rest_api import (
+    SparksGatewayAPI, ClishResult, DEFAULT_TIMEOUT, SLOW_COMMANDS, READY_PROBE_COMMAND, POLICY_PROBE_COMMAND,
+    PROBE_POLICY, device_base_url, slow_command, redact
+)
+
+AsyncEffectChecks = Dict[str, Callable[[], Awaitable[bool]]]
+
+
+class AsyncSparksGatewayAPI:
+    """Asyncio client for configuring sparks gateways via their local API"""
+
+    def __init__(self, ip_address: str, username: str, password: str,
+                 timeout: int = DEFAULT_TIMEOUT, retry_policy: Optional[RetryPolicy] = None,
+                 settle_time: Optional[float] = None):
+        self.base_url = device_base_url(ip_address)
+        self.timeout = timeout
+        self.settle_time = settle_time
+        self.retry_policy = retry_policy or RetryPolicy(timeout=timeout)
+        self.username = username
+        self.password = password
+        self.session = None
+        self.sid = None
+
+    async def __aenter__(self) -> 'AsyncSparksGatewayAPI':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the underlying HTTP session"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _session(self):
+        """Create the aiohttp session lazily inside the running loop"""
+        if self.session is None:
+            # Devices use self-signed certificates (lab environments only)
+            self.session = create_session({'Content-Type': 'application/json'}, verify=False)
+        return self.session
+
+    async def login(self) -> None:
+        """Authenticate with the sparks gateway"""
+        try:
+            response = await async_request(
+                self.retry_policy, self._session(), "POST", f"{self.base_url}/login",
+                json={"user": self.username, "password": self.password}
+            )
+            response.raise_for_status()
+            self.sid = response.json()['sid']
+            self.session.headers.update({'X-chkp-sid': self.sid})
+            log.info("Sparks gateway login successful")
+        except Exception as e:
+            log.error(f"Sparks gateway login failed: {str(e)}")
+            raise
+
+    async def _run_command(self, cmd: str, idempotent: bool = False, probe: bool = False) -> str:
+        """Send one CLISH command (or a readiness probe) and return its decoded output"""
+        encoded_cmd = base64.b64encode(cmd.encode()).decode()
+
+        # Only the command keyword is traced; arguments may carry tokens or passwords
+        with tracer.span("clish", category="device", command=" ".join(cmd.split()[:2]),
+                         lines=cmd.count("\n") + 1):
+            # Configuration commands are not resent after an ambiguous failure
+            # Probes fail fast on a rebooting device, the poll loop does the retrying
+            response = await async_request(
+                PROBE_POLICY if probe else self.retry_policy, self._session(), "POST",
+                f"{self.base_url}/run-clish-command",
+                idempotent=idempotent, probe=probe,
+                json={"script": encoded_cmd}
+            )
+
+        response.raise_for_status()
+        return base64.b64decode(response.json()['output']).decode()
+
+    async def is_ready(self) -> bool:
+        """Check whether the device answers a lightweight CLISH probe"""
+        try:
+            await self._run_command(READY_PROBE_COMMAND, idempotent=True, probe=True)
+            return True
+        except Exception as e:
+            log.debug("Sparks gateway not ready yet: %s", e)
+            return False
+
+    async def wait_until_ready(self, timeout: float = DEFAULT_READY_TIMEOUT) -> None:
+        """Poll the device until it accepts commands again"""
+        await async_wait_until(self.is_ready, f"Sparks gateway {self.base_url}", timeout=timeout)
+
+    async def is_policy_fetched(self) -> bool:
+        """Check whether the device runs a security policy fetched from its management"""
+        try:
+            output = await self._run_command(POLICY_PROBE_COMMAND, idempotent=True, probe=True)
+            return SparksGatewayAPI.policy_loaded(output)
+        except Exception as e:
+            log.debug("Sparks gateway policy not fetched yet: %s", e)
+            return False
+
+    async def wait_until_applied(self, cmd: str, timeout: float = DEFAULT_READY_TIMEOUT,
+                                 effect_checks: Optional[AsyncEffectChecks] = None) -> None:
+        """Wait until a slow command has taken effect (see SparksGatewayAPI.wait_until_applied)"""
+        prefix = slow_command(cmd)
+        settle = self.settle_time if self.settle_time is not None else SLOW_COMMANDS[prefix]
+        if settle:
+            log.info(f"🕒 Giving the gateway {settle}s to apply '{prefix}'")
+            await asyncio.sleep(settle)
+            metrics.record_wait(WAIT_READINESS, settle)
+        check = (effect_checks or {}).get(prefix) or (
+            self.is_policy_fetched if prefix == "fw fetch" else self.is_ready
+        )
+        await async_wait_until(check, f"'{prefix}' on Sparks gateway {self.base_url}", timeout=timeout)
+
+    async def execute_clish(self, commands: List[str], delay: Optional[int] = None,
+                            ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                            effect_checks: Optional[AsyncEffectChecks] = None) -> None:
+        """Execute CLISH commands on sparks gateway (see SparksGatewayAPI.execute_clish)"""
+        with metrics.timer("clish_seconds", mode="command"):
+            try:
+                for cmd in commands:
+                    log.info(f"Running the command: {redact(cmd)}")
+
+                    output = await self._run_command(cmd)
+                    if output:  # not all clish command return an output
+                        log.debug("CLISH command response: %s", output)
+
+                    if delay is not None:
+                        log.info(f"🕒 Waiting for {delay} seconds between commands")
+                        await asyncio.sleep(delay)
+                    elif slow_command(cmd):
+                        log.info("🕒 Waiting for the gateway to finish applying the command")
+                        await self.wait_until_applied(cmd, ready_timeout, effect_checks)
+
+            except Exception as e:
+                log.error(f"CLISH command failed: {str(e)}")
+                raise
+
+    async def execute_clish_script(self, commands: List[str],
+                                   ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                                   effect_checks: Optional[AsyncEffectChecks] = None) -> List[ClishResult]:
+        """Execute CLISH commands as a few multi-line scripts (see SparksGatewayAPI)"""
+        with metrics.timer("clish_seconds", mode="script"):
+            results: List[ClishResult] = []
+            try:
+                for chunk in SparksGatewayAPI.split_script(commands):
+                    log.info(f"Running {len(chunk)} commands as one script: {redact('; '.join(chunk))}")
+                    output = await self._run_command("\n".join(chunk))
+
+                    for result in SparksGatewayAPI.parse_script_output(chunk, output):
+                        results.append(result)
+                        if result.output:
+                            log.debug("CLISH command response (%s): %s", redact(result.command), result.output)
+                        if not result.success:
+                            raise RuntimeError(f"'{redact(result.command)}' failed: {result.output}")
+
+                    if slow_command(chunk[-1]):
+                        log.info("🕒 Waiting for the gateway to finish applying the script")
+                        await self.wait_until_applied(chunk[-1], ready_timeout, effect_checks)
+
+                return results
+
+            except Exception as e:
+                log.error(f"CLISH script failed: {str(e)}")
+                raise
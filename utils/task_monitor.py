@@ -0,0 +1,268 @@
+"""
+Management Task Monitor
+
+Tracks asynchronous management tasks (publish, install-policy, batch
+operations) with one background poller. All pending task-ids are queried in
+a single show-task call; each task starts with a short poll interval that
+grows the longer it runs, and its future resolves as soon as it completes,
+or fails once the task is still running at its deadline.
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+from .logger_main import log
+from .metrics import metrics, WAIT_TASK_POLL
+
+try:
+    from tqdm import tqdm
+except ImportError:  # Progress bar is optional (e.g. headless CI runners)
+    tqdm = None
+
+INITIAL_POLL_INTERVAL = 1  # seconds
+MAX_POLL_INTERVAL = 10  # seconds
+POLL_BACKOFF = 1.5
+MAX_POLL_ERRORS = 3  # Consecutive failed show-task calls before giving up
+DEFAULT_TASK_TIMEOUT = 3600  # seconds a task may run before it is reported as failed
+
+SUCCEEDED = "SUCCEEDED"
+FAILED_STATUSES = ("FAILED", "PARTIALLY SUCCEEDED")
+
+
+class TaskFailedError(Exception):
+    """Raised through a task future when the management task did not succeed"""
+
+    def __init__(self, task_id: str, task_data: Dict):
+        super().__init__(f"Task {task_id} {task_data.get('status', 'failed')}: {task_data}")
+        self.task_id = task_id
+        self.task_data = task_data
+
+
+class TaskTimeoutError(TimeoutError):
+    """Raised through a task future when the task is still running at its deadline"""
+
+    def __init__(self, task_id: str, status: str, timeout: float):
+        super().__init__(f"Task {task_id} still {status} after {timeout:.0f}s")
+        self.task_id = task_id
+        self.status = status
+
+
+class _TrackedTask:
+    """Polling state of one task"""
+
+    def __init__(self, task_id: str, initial_interval: float, timeout: float):
+        self.task_id = task_id
+        self.future: Future = Future()
+        self.status = "SUBMITTED"
+        self.interval = initial_interval
+        self.started = time.monotonic()
+        self.timeout = timeout
+        self.deadline = self.started + timeout
+        self.next_poll = min(self.started + initial_interval, self.deadline)
+
+
+class TaskMonitor:
+    """Polls many management tasks with one show-task call per round"""
+
+    def __init__(
+        self,
+        api_call: Callable[[str, Dict], Dict],
+        initial_interval: float = INITIAL_POLL_INTERVAL,
+        max_interval: float = MAX_POLL_INTERVAL,
+        backoff: float = POLL_BACKOFF,
+        show_progress: Optional[bool] = None,
+        task_timeout: float = DEFAULT_TASK_TIMEOUT
+    ):
+        """
+        Initialize the monitor
+
+        Args:
+            api_call: Management API call handler, e.g. ManagementAPI._execute_api_call
+            initial_interval: First poll delay of a new task in seconds
+            max_interval: Upper bound of the poll delay in seconds
+            backoff: Multiplier applied to a task's delay after every poll
+            show_progress: Draw a tqdm progress bar. Defaults to True only when
+                tqdm is installed and stderr is a terminal
+            task_timeout: Seconds a task may run before its future fails
+                with TaskTimeoutError
+        """
+        self.api_call = api_call
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.task_timeout = task_timeout
+        if show_progress is None:
+            show_progress = sys.stderr.isatty()
+        self.show_progress = bool(show_progress and tqdm)
+        self._tasks: Dict[str, _TrackedTask] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._progress = None
+        self._completed = 0
+
+    def submit(self, task_id: str) -> Future:
+        """
+        Start tracking a task
+
+        Returns:
+            Future: Resolves to the final show-task entry of the task, or
+            raises TaskFailedError if the task did not succeed and
+            TaskTimeoutError if it is still running at its deadline
+        """
+        with self._lock:
+            tracked = self._tasks.get(task_id)
+            if tracked is None:
+                tracked = _TrackedTask(task_id, self.initial_interval, self.task_timeout)
+                self._tasks[task_id] = tracked
+                self._update_progress_total()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="task-monitor", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+        return tracked.future
+
+    def wait(self, task_id: str) -> Dict:
+        """Block until a task completes and return its show-task entry"""
+        return self.submit(task_id).result()
+
+    def wait_all(self, task_ids: List[str]) -> List[Dict]:
+        """Block until every task completes; raises on the first failed task"""
+        futures = [self.submit(task_id) for task_id in task_ids]
+        return [future.result() for future in futures]
+
+    def _run(self) -> None:
+        """Poller loop; exits once no task is pending"""
+        errors = 0
+        while True:
+            with self._lock:
+                if not self._tasks:
+                    self._thread = None
+                    self._close_progress()
+                    return
+                now = time.monotonic()
+                expired = [t for t in self._tasks.values() if t.deadline <= now]
+                due = [t for t in self._tasks.values() if t.next_poll <= now and t.deadline > now]
+                delay = min(t.next_poll for t in self._tasks.values()) - now
+
+            for tracked in expired:
+                self._expire(tracked)
+            if expired:
+                continue
+            if not due:
+                waited = time.monotonic()
+                self._wakeup.wait(timeout=max(delay, 0))
+                self._wakeup.clear()
+                metrics.record_wait(WAIT_TASK_POLL, time.monotonic() - waited)
+                continue
+
+            try:
+                response = self.api_call(
+                    "show-task", {"task-id": [t.task_id for t in due]}
+                )
+                errors = 0
+            except Exception as e:
+                errors += 1
+                log.warning(f"Task status poll failed ({errors}/{MAX_POLL_ERRORS}): {str(e)}")
+                if errors >= MAX_POLL_ERRORS:
+                    self._fail_all(e)
+                    errors = 0
+                else:
+                    self._reschedule(due)
+                continue
+
+            self._handle_response(due, response)
+
+    def _handle_response(self, due: List[_TrackedTask], response: Dict) -> None:
+        """Resolve finished tasks and reschedule the rest"""
+        reported = {
+            task.get('task-id'): task for task in response.get('tasks', [])
+        }
+        pending = []
+        for tracked in due:
+            task_data = reported.get(tracked.task_id)
+            if task_data is None and len(due) == 1 and len(reported) == 1:
+                task_data = next(iter(reported.values()))  # Server omitted the id
+            status = (task_data or {}).get('status', 'unknown').upper()
+            if status != tracked.status:
+                tracked.status = status
+                log.debug("Task %s: %s", tracked.task_id, status)
+                self._describe_progress(status)
+
+            if status == SUCCEEDED:
+                self._finish(tracked, task_data)
+            elif status in FAILED_STATUSES:
+                self._finish(tracked, task_data, failed=True)
+            else:
+                pending.append(tracked)
+        self._reschedule(pending)
+
+    def _reschedule(self, tasks: List[_TrackedTask]) -> None:
+        """Back off the poll interval of tasks that are still running"""
+        now = time.monotonic()
+        for tracked in tasks:
+            tracked.interval = min(tracked.interval * self.backoff, self.max_interval)
+            tracked.next_poll = min(now + tracked.interval, tracked.deadline)
+
+    def _finish(self, tracked: _TrackedTask, task_data: Dict, failed: bool = False) -> None:
+        """Remove a task from tracking and resolve its future"""
+        with self._lock:
+            self._tasks.pop(tracked.task_id, None)
+            self._completed += 1
+            if self._progress is not None:
+                self._progress.update(1)
+        elapsed = time.monotonic() - tracked.started
+        if failed:
+            log.error(f"❌ Task {tracked.task_id} {tracked.status} after {elapsed:.1f}s")
+            tracked.future.set_exception(TaskFailedError(tracked.task_id, task_data))
+        else:
+            log.info(f"✅ Task {tracked.task_id} completed in {elapsed:.1f}s")
+            tracked.future.set_result(task_data)
+
+    def _expire(self, tracked: _TrackedTask) -> None:
+        """Fail a task that is still running at its deadline"""
+        with self._lock:
+            self._tasks.pop(tracked.task_id, None)
+            self._completed += 1
+            if self._progress is not None:
+                self._progress.update(1)
+        log.error(f"❌ Task {tracked.task_id} still {tracked.status} after {tracked.timeout:.0f}s, giving up")
+        tracked.future.set_exception(TaskTimeoutError(tracked.task_id, tracked.status, tracked.timeout))
+
+    def _fail_all(self, error: Exception) -> None:
+        """Fail every pending task after repeated polling errors"""
+        with self._lock:
+            tasks = list(self._tasks.values())
+            self._tasks.clear()
+        for tracked in tasks:
+            tracked.future.set_exception(error)
+
+    def _update_progress_total(self) -> None:
+        """Grow the progress bar as tasks are submitted (caller holds the lock)"""
+        if not self.show_progress:
+            return
+        if self._progress is None:
+            self._completed = 0
+            self._progress = tqdm(
+                total=0,
+                bar_format="{desc}: {n_fmt}/{total_fmt} {elapsed} {bar}",
+                ncols=80
+            )
+        self._progress.total = self._completed + len(self._tasks)
+        self._progress.refresh()
+
+    def _describe_progress(self, status: str) -> None:
+        """Show the latest task status next to the progress bar"""
+        with self._lock:
+            if self._progress is not None:
+                self._progress.set_description(f"🔄 {status}")
+
+    def _close_progress(self) -> None:
+        """Close the progress bar once nothing is pending (caller holds the lock)"""
+        if self._progress is not None:
+            self._progress.close()
+            self._progress = None
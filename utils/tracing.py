@@ -0,0 +1,112 @@
+"""
+Rollout Timeline Tracing
+
+Records spans (registration, management calls, tasks, policy install
+waves, CLISH commands, ...) and writes them as a Chrome trace_event JSON
+file that Perfetto (https://ui.perfetto.dev) or chrome://tracing open
+directly. Spans logged for a gateway are drawn on that gateway's own
+lane, so stragglers and serialisation points stand out.
+
+Tracing is off unless started; a disabled span costs one attribute check.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from .logger_main import log, current_log_context
+
+TRACE_PROCESS_NAME = "s1c_deploy_sparks_gw"
+
+
+class Tracer:
+    """Collects complete ("X") trace events from threads and asyncio tasks"""
+
+    def __init__(self):
+        self.enabled = False
+        self._events: List[Dict[str, Any]] = []
+        self._lanes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def start(self) -> None:
+        """Drop earlier events and start recording"""
+        with self._lock:
+            self._events = []
+            self._lanes = {}
+            self._origin = time.perf_counter()
+            self.enabled = True
+
+    def stop(self) -> None:
+        """Stop recording (events are kept until the next start)"""
+        self.enabled = False
+
+    @contextmanager
+    def span(self, name: str, category: str = "deploy", **args: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Record the block as one span
+
+        Yields a dict of span arguments; values added to it (e.g. an
+        outcome) are stored with the span.
+        """
+        if not self.enabled:
+            yield {}
+            return
+        context = current_log_context()
+        span_args = {**context, **{key: value for key, value in args.items() if value is not None}}
+        started = time.perf_counter()
+        try:
+            yield span_args
+        except BaseException as e:
+            span_args.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            self._add(name, category, started, time.perf_counter(), context.get("gw_name"), span_args)
+
+    def _add(self, name: str, category: str, started: float, ended: float,
+             gw_name: Optional[str], args: Dict[str, Any]) -> None:
+        """Store one complete event on the gateway's lane (or the thread's)"""
+        lane_name = gw_name or threading.current_thread().name
+        with self._lock:
+            lane = self._lanes.get(lane_name)
+            if lane is None:
+                lane = self._lanes[lane_name] = len(self._lanes) + 1
+            self._events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round((started - self._origin) * 1e6, 1),
+                "dur": round((ended - started) * 1e6, 1),
+                "pid": 1,
+                "tid": lane,
+                "args": {key: str(value) for key, value in args.items()},
+            })
+
+    def write(self, trace_file: str) -> None:
+        """Write the recorded spans as Chrome trace_event JSON"""
+        with self._lock:
+            metadata = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": TRACE_PROCESS_NAME}}]
+            metadata += [
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": lane, "args": {"name": lane_name}}
+                for lane_name, lane in self._lanes.items()
+            ]
+            trace = {"traceEvents": metadata + self._events, "displayTimeUnit": "ms"}
+            span_count = len(self._events)
+
+        path = Path(trace_file)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = path.with_suffix(path.suffix + '.tmp')
+            with tmp_file.open('w', encoding='utf-8') as f:
+                json.dump(trace, f)
+            os.replace(tmp_file, path)
+            log.info(f"🧭  Trace with {span_count} spans written to {trace_file} (open in ui.perfetto.dev)")
+        except OSError as e:
+            log.error(f"Unable to write trace file {trace_file}: {str(e)}")
+            raise
+
+
+tracer = Tracer()  # Process-wide tracer shared by all clients
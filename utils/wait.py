@@ -0,0 +1,133 @@
+"""
+Condition-Based Waiting
+
+Polls a readiness check with exponential backoff until it succeeds or a
+deadline expires, instead of sleeping for a fixed amount of time. Work with
+an overall deadline (e.g. one device under --device-timeout) runs inside
+deadline(); its waits end at that deadline and check_deadline() stops it
+between steps.
+"""
+
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, Optional
+from .logger_main import log
+from .metrics import metrics, WAIT_READINESS
+
+DEFAULT_READY_TIMEOUT = 300  # seconds
+INITIAL_POLL_DELAY = 1  # seconds
+MAX_POLL_DELAY = 15  # seconds
+BACKOFF_FACTOR = 2
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised between steps of work that has run past its overall deadline"""
+
+
+@contextmanager
+def deadline(timeout: Optional[float]) -> Iterator[None]:
+    """Run the enclosed work under an overall deadline (None: no deadline)"""
+    if timeout is None:
+        yield
+        return
+    outer = _deadline.get()
+    token = _deadline.set(min(time.monotonic() + timeout, outer or float('inf')))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(timeout: float) -> float:
+    """Timeout shortened to what is left of the current deadline"""
+    current = _deadline.get()
+    return timeout if current is None else min(timeout, max(current - time.monotonic(), 0))
+
+
+def check_deadline(description: str) -> None:
+    """Stop work that has run past the current deadline before its next step"""
+    current = _deadline.get()
+    if current is not None and time.monotonic() >= current:
+        raise DeadlineExceeded(f"Deadline passed before {description}")
+
+
+def wait_until(
+    condition: Callable[[], Any],
+    description: str,
+    timeout: float = DEFAULT_READY_TIMEOUT,
+    initial_delay: float = INITIAL_POLL_DELAY,
+    max_delay: float = MAX_POLL_DELAY,
+    backoff: float = BACKOFF_FACTOR
+) -> Any:
+    """
+    Poll a condition until it returns a truthy value
+
+    Args:
+        condition: Readiness check; a falsy return value means "not yet"
+        description: Human readable name of what is awaited (for logs)
+        timeout: Deadline in seconds
+        initial_delay: First delay between polls in seconds
+        max_delay: Upper bound for the delay between polls
+        backoff: Multiplier applied to the delay after every poll
+
+    Returns:
+        The first truthy value returned by the condition
+
+    Raises:
+        TimeoutError: If the condition is not met before the deadline, or
+            before the deadline of the enclosing work
+    """
+    started = time.monotonic()
+    timeout = remaining(timeout)
+    deadline_at = started + timeout
+    delay = initial_delay
+    attempts = 0
+
+    while True:
+        attempts += 1
+        result = condition()
+        if result:
+            log.debug("%s ready after %.1fs (%s checks)", description, time.monotonic() - started, attempts)
+            return result
+
+        left = deadline_at - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"Timed out after {timeout:.0f}s waiting for {description}")
+
+        time.sleep(min(delay, left))
+        metrics.record_wait(WAIT_READINESS, min(delay, left))
+        delay = min(delay * backoff, max_delay)
+
+
+async def async_wait_until(
+    condition: Callable[[], Awaitable[Any]],
+    description: str,
+    timeout: float = DEFAULT_READY_TIMEOUT,
+    initial_delay: float = INITIAL_POLL_DELAY,
+    max_delay: float = MAX_POLL_DELAY,
+    backoff: float = BACKOFF_FACTOR
+) -> Any:
+    """Asyncio variant of wait_until; the condition is a coroutine function"""
+    started = time.monotonic()
+    deadline_at = started + timeout
+    delay = initial_delay
+    attempts = 0
+
+    while True:
+        attempts += 1
+        result = await condition()
+        if result:
+            log.debug("%s ready after %.1fs (%s checks)", description, time.monotonic() - started, attempts)
+            return result
+
+        left = deadline_at - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for {description}")
+
+        await asyncio.sleep(min(delay, left))
+        metrics.record_wait(WAIT_READINESS, min(delay, left))
+        delay = min(delay * backoff, max_delay)